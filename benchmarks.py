@@ -0,0 +1,719 @@
+"""Benchmarks de la simulación.
+
+Se ejecutan como módulo del paquete con una base configurada en DATABASE (los
+escenarios usan su propia base SQLite en memoria), por ejemplo:
+
+    DATABASE=sqlite:// python -m ecosistemsimulator.benchmarks step-cost
+
+Cada medición se imprime como una línea JSON, salvo `suite`, que escribe un único
+documento JSON con el entorno de ejecución para comparar entre versiones:
+
+    DATABASE=sqlite:// python -m ecosistemsimulator.benchmarks suite --output bench.json
+    DATABASE=sqlite:// python -m ecosistemsimulator.benchmarks suite --baseline bench.json
+"""
+import argparse
+import asyncio
+import logging
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import sqlalchemy
+from sqlalchemy import bindparam, create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from .database import Base
+from .models import Environment, Interactions, Lifecycle, Organisms, PopulationHistory, PopulationRollup, SimulationRun
+from .ecosystem_simulation import EcosystemSimulation
+from .foodweb import FoodWeb, load_interactions
+from .result_cache import ResultCache, run_cached
+from .time_advance import TIME_ADVANCE_MODES
+from .event_sink import BufferedLifecycleSink, NullLifecycleSink
+from .rng import PopulationStream
+from .logs import PACKAGE_LOGGER, JsonFormatter, configure_logging, dropped_records
+from .state import load_organism_states
+
+# Especies de referencia (las mismas de test_organisms.py) y su proporción en los escenarios
+REFERENCE_SPECIES = {
+    "Helecho": dict(organism_type="Plant", birth_rate=1.0, death_rate=0.2, initial_energy=50.0, quantity=100,
+                    growth_rate=1.10, energy_consumption_rate=5.0, reproduction_season="Verano", lifespan=5.0,
+                    reproduction_energy_threshold=10.0, min_energy_for_health=10.0),
+    "Ciervo": dict(organism_type="Herbivore", birth_rate=0.3, death_rate=0.1, initial_energy=100.0, quantity=50,
+                   growth_rate=1.05, energy_consumption_rate=10.0, reproduction_season="Primavera", lifespan=15.0,
+                   reproduction_energy_threshold=20.0, min_energy_for_health=15.0),
+    "Lobo": dict(organism_type="Carnivore", birth_rate=0.1, death_rate=0.05, initial_energy=200.0, quantity=15,
+                 growth_rate=1.02, energy_consumption_rate=20.0, reproduction_season="Invierno", lifespan=12.0,
+                 reproduction_energy_threshold=30.0, min_energy_for_health=25.0),
+}
+SPECIES_RATIO = {"Helecho": 0.6, "Ciervo": 0.3, "Lobo": 0.1}
+# Escenarios de la suite: (poblaciones, días simulados)
+SUITE_SCENARIOS = ((10, 365), (1000, 30), (100000, 3))
+# Tablas que escribe una corrida y cuyas filas nuevas se cuentan
+WRITTEN_TABLES = (Lifecycle, PopulationHistory, PopulationRollup, SimulationRun)
+
+
+def memory_session_factory(path=None):
+    """Fábrica de sesiones sobre SQLite en memoria o en el archivo `path`, con todas las tablas."""
+    if path:
+        engine = create_engine(f"sqlite:///{path}")
+    else:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def memory_session():
+    """Crea una sesión sobre una base SQLite en memoria con todas las tablas."""
+    return memory_session_factory()()
+
+
+def build_reference_environment(db_session, populations, resources=500.0):
+    """Crea un entorno con `populations` poblaciones repartidas según SPECIES_RATIO."""
+    environment = Environment(name=f"Referencia {populations}", temperature=18.0, humidity=0.6,
+                              resources=resources, surface_area=10.0)
+    db_session.add(environment)
+    db_session.commit()
+    rows = []
+    for name, share in SPECIES_RATIO.items():
+        count = max(1, round(populations * share))
+        rows.extend(dict(REFERENCE_SPECIES[name], name=name, environment_id=environment.id) for _ in range(count))
+    db_session.execute(Organisms.__table__.insert(), rows[:max(populations, len(SPECIES_RATIO))])
+    db_session.commit()
+    return environment
+
+
+def bench_step_cost(sizes, days, engine="simpy"):
+    """Costo por día simulado y por evento a medida que crece el número de poblaciones."""
+    results = []
+    for size in sizes:
+        db_session = memory_session()
+        environment = build_reference_environment(db_session, size)
+        simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(),
+                                         engine=engine, seed=0)
+        start = time.perf_counter()
+        summary = simulation.run(days)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "benchmark": "step_cost",
+            "engine": engine,
+            "populations": size,
+            "days": days,
+            "events": summary["events"],
+            "seconds_per_day": round(elapsed / days, 6),
+            "microseconds_per_event": round(elapsed / summary["events"] * 1e6, 3) if summary["events"] else None,
+        })
+        db_session.close()
+    return results
+
+
+def bench_time_advance(sizes, days, sample_every=(1, 10)):
+    """Costo por día simulado del motor simpy en cada modo de avance del tiempo y muestreo."""
+    results = []
+    for size in sizes:
+        for mode in TIME_ADVANCE_MODES:
+            for every in sample_every:
+                db_session = memory_session()
+                environment = build_reference_environment(db_session, size)
+                simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(),
+                                                 seed=0, time_advance=mode, sample_every=every)
+                start = time.perf_counter()
+                summary = simulation.run(days)
+                elapsed = time.perf_counter() - start
+                results.append({
+                    "benchmark": "time_advance",
+                    "time_advance": mode,
+                    "sample_every": every,
+                    "populations": size,
+                    "days": days,
+                    "events": summary["events"],
+                    "digest": summary["digest"],
+                    "microseconds_per_day": round(elapsed / days * 1e6, 3),
+                })
+                db_session.close()
+    return results
+
+
+def _apply_events(organisms, events, commit=None, commit_every=None):
+    """Repite el patrón de un evento del motor: leer y modificar energía y cantidad."""
+    count = len(organisms)
+    for i in range(events):
+        organism = organisms[i % count]
+        organism.initial_energy += 1.5
+        organism.initial_energy -= 0.55
+        if organism.initial_energy <= 0:
+            organism.quantity -= 1
+        if commit is not None and (i + 1) % commit_every == 0:
+            commit()
+
+
+def bench_state_records(populations, events, commit_every=1000):
+    """Costo por evento al trabajar con objetos del ORM frente a registros OrganismState."""
+    db_session = memory_session()
+    environment = build_reference_environment(db_session, populations)
+    cases = {
+        "orm": lambda: (db_session.query(Organisms).filter(Organisms.environment_id == environment.id).all(), None),
+        "orm_with_commits": lambda: (
+            db_session.query(Organisms).filter(Organisms.environment_id == environment.id).all(), db_session.commit
+        ),
+        "records": lambda: (load_organism_states(db_session, environment.id), None),
+    }
+    results = []
+    for name, load in cases.items():
+        organisms, commit = load()
+        start = time.perf_counter()
+        _apply_events(organisms, events, commit, commit_every)
+        elapsed = time.perf_counter() - start
+        db_session.rollback()
+        results.append({
+            "benchmark": "state_records",
+            "case": name,
+            "populations": populations,
+            "events": events,
+            "microseconds_per_event": round(elapsed / events * 1e6, 3),
+        })
+    db_session.close()
+    return results
+
+
+def _count_rows(db_session):
+    return {model.__tablename__: db_session.scalar(select(func.count()).select_from(model)) for model in WRITTEN_TABLES}
+
+
+def _run_scenario(populations, days, engine, sqlite_file, trace_memory):
+    """Corre un escenario de referencia con el destino de eventos por defecto (en bloque)."""
+    with tempfile.TemporaryDirectory() as directory:
+        sessions = memory_session_factory(os.path.join(directory, "suite.db") if sqlite_file else None)
+        db_session = sessions()
+        environment = build_reference_environment(db_session, populations)
+        rows_before = _count_rows(db_session)
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            simulation = EcosystemSimulation(db_session, environment.id, engine=engine, seed=0)
+            start = time.perf_counter()
+            summary = simulation.run(days)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        rows_after = _count_rows(db_session)
+        db_session.close()
+        sessions.kw["bind"].dispose()
+    return summary, elapsed, peak, {table: rows_after[table] - rows_before[table] for table in rows_after}
+
+
+def bench_suite(scenarios=SUITE_SCENARIOS, engines=("simpy", "vectorized"), sqlite_file=False, memory=True):
+    """Escenarios de referencia de tamaño creciente: días/s, eventos/s, memoria pico y filas escritas.
+
+    Los tiempos se miden en una corrida sin tracemalloc (que la hace varias veces más
+    lenta) y la memoria pico en una segunda corrida con la misma semilla.
+    """
+    results = []
+    for populations, days in scenarios:
+        for engine in engines:
+            summary, elapsed, _, rows_written = _run_scenario(populations, days, engine, sqlite_file, False)
+            peak = _run_scenario(populations, days, engine, sqlite_file, True)[2] if memory else None
+            results.append({
+                "benchmark": "suite",
+                "engine": engine,
+                "populations": populations,
+                "days": days,
+                "events": summary["events"],
+                "elapsed_seconds": round(elapsed, 6),
+                "sim_days_per_second": round(days / elapsed, 3),
+                "events_per_second": round(summary["events"] / elapsed, 2),
+                "peak_memory_bytes": peak,
+                "rows_written": rows_written,
+                "digest": summary["digest"],
+            })
+    return {
+        "suite": "reference",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "database": "sqlite_file" if sqlite_file else "sqlite_memory",
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+            "numpy": np.__version__,
+            "sqlalchemy": sqlalchemy.__version__,
+        },
+        "results": results,
+    }
+
+
+def compare_suites(baseline, current):
+    """Agrega a cada resultado la razón frente al mismo escenario de `baseline` (>1 es más rápido)."""
+    previous = {(r["engine"], r["populations"], r["days"]): r for r in baseline["results"]}
+    for result in current["results"]:
+        before = previous.get((result["engine"], result["populations"], result["days"]))
+        if before is None:
+            continue
+        result["baseline"] = {
+            "sim_days_per_second_ratio": round(result["sim_days_per_second"] / before["sim_days_per_second"], 4),
+            "peak_memory_ratio": round(result["peak_memory_bytes"] / before["peak_memory_bytes"], 4)
+            if result["peak_memory_bytes"] and before["peak_memory_bytes"] else None,
+            "same_digest": result["digest"] == before["digest"],
+        }
+    return current
+
+
+def bench_logging(days=1000, populations=30, engine="simpy"):
+    """Corrida de `days` días con los mensajes por evento apagados y encendidos.
+
+    Los registros se escriben en os.devnull: se mide lo que cuesta en el hilo de la
+    simulación, con la cola o con un handler síncrono.
+    """
+    cases = {
+        "events_off": dict(event_level="WARNING"),
+        "events_on_queue": dict(event_level="DEBUG"),
+        "events_on_blocking": dict(event_level="DEBUG", blocking=True),
+    }
+    results = []
+    with open(os.devnull, "w") as devnull:
+        for name, case in cases.items():
+            configure_logging(event_level=case["event_level"], stream=devnull, queue_size=1_000_000)
+            package = logging.getLogger(PACKAGE_LOGGER)
+            if case.get("blocking"):
+                # Mismo formato, pero escribiendo en el hilo de la simulación
+                blocking = logging.StreamHandler(devnull)
+                blocking.setFormatter(JsonFormatter())
+                package.handlers = [blocking]
+            db_session = memory_session()
+            environment = build_reference_environment(db_session, populations)
+            simulation = EcosystemSimulation(db_session, environment.id, engine=engine, seed=0)
+            start = time.perf_counter()
+            summary = simulation.run(days)
+            elapsed = time.perf_counter() - start
+            dropped = dropped_records()
+            db_session.close()
+            results.append({
+                "benchmark": "logging",
+                "case": name,
+                "engine": engine,
+                "populations": populations,
+                "days": days,
+                "events": summary["events"],
+                "elapsed_seconds": round(elapsed, 6),
+                "microseconds_per_event": round(elapsed / summary["events"] * 1e6, 3) if summary["events"] else None,
+                "dropped_records": dropped,
+            })
+    configure_logging()
+    return results
+
+
+def _add_food_web(db_session, environment, degree, seed=0):
+    """Da a cada carnívoro `degree` herbívoros al azar como presas; devuelve las filas creadas."""
+    rows = db_session.execute(select(Organisms.id, Organisms.organism_type)
+                              .where(Organisms.environment_id == environment.id)).all()
+    herbivores = np.array([row.id for row in rows if row.organism_type == "Herbivore"])
+    carnivores = [row.id for row in rows if row.organism_type == "Carnivore"]
+    rng = np.random.default_rng(seed)
+    interactions = [
+        dict(predator_id=predator, prey_id=int(prey), interaction_type="Depredacion", interaction_rate=float(rate))
+        for predator in carnivores
+        for prey, rate in zip(rng.choice(herbivores, min(degree, herbivores.size), replace=False),
+                              rng.uniform(0.1, 1.0, degree))
+    ]
+    db_session.execute(Interactions.__table__.insert(), interactions)
+    db_session.commit()
+    return len(interactions)
+
+
+def bench_food_web(populations=10000, degree=5, days=30, engine="vectorized"):
+    """Caza por tipo (todos los herbívoros) frente a la red trófica de Interactions.
+
+    Mide el tiempo de la fase de caza con el perfilador, lo que cuesta compilar la red
+    completa y lo que cuesta agregarle un 1% de aristas nuevas sin recompilarla.
+    """
+    results = []
+    for case in ("type_rule", "food_web"):
+        db_session = memory_session()
+        environment = build_reference_environment(db_session, populations)
+        edges = _add_food_web(db_session, environment, degree) if case == "food_web" else 0
+        simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(),
+                                         engine=engine, seed=0, profile=True)
+        summary = simulation.run(days)
+        predation = summary["profile"]["phases"].get("predation", {"seconds": 0.0, "calls": 0})
+        result = {
+            "benchmark": "food_web",
+            "case": case,
+            "engine": engine,
+            "populations": populations,
+            "edges": edges,
+            "days": days,
+            "events": summary["events"],
+            "elapsed_seconds": summary["elapsed_seconds"],
+            "predation_seconds": predation["seconds"],
+            "predation_microseconds_per_call": round(predation["seconds"] / predation["calls"] * 1e6, 3)
+            if predation["calls"] else None,
+        }
+        if case == "food_web":
+            ids = [organism.id for organism in simulation.organisms]
+            start = time.perf_counter()
+            FoodWeb(ids, load_interactions(db_session, environment.id))
+            result["compile_seconds"] = round(time.perf_counter() - start, 6)
+            new_rows = max(1, edges // 100)
+            herbivore = next(o.id for o in simulation.organisms if o.organism_type == "Herbivore")
+            carnivores = [o.id for o in simulation.organisms if o.organism_type == "Carnivore"]
+            db_session.execute(Interactions.__table__.insert(), [
+                dict(predator_id=carnivores[i % len(carnivores)], prey_id=herbivore, interaction_type="Depredacion",
+                     interaction_rate=0.5) for i in range(new_rows)
+            ])
+            db_session.commit()
+            start = time.perf_counter()
+            result["incremental_edges"] = simulation.refresh_food_web()
+            result["incremental_seconds"] = round(time.perf_counter() - start, 6)
+        results.append(result)
+        db_session.close()
+    return results
+
+
+def bench_result_cache(populations=1000, days=100, engine="simpy"):
+    """Misma corrida dos veces con la caché de resultados: la primera corre, la segunda la lee.
+
+    Entre una y otra se restaura el estado inicial en la base, como si se repitiera el pedido.
+    """
+    db_session = memory_session()
+    environment = build_reference_environment(db_session, populations)
+    initial = [dict(b_id=organism.id, b_energy=organism.initial_energy, b_quantity=organism.quantity)
+               for organism in load_organism_states(db_session, environment.id)]
+    table = Organisms.__table__
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResultCache(directory)
+        for case in ("miss", "hit"):
+            db_session.execute(table.update().where(table.c.id == bindparam("b_id"))
+                               .values(initial_energy=bindparam("b_energy"), quantity=bindparam("b_quantity")),
+                               initial)
+            db_session.get(Environment, environment.id).resources = 500.0
+            db_session.commit()
+            db_session.expire_all()
+            start = time.perf_counter()
+            simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(),
+                                             engine=engine, seed=0)
+            summary = run_cached(simulation, days, cache)
+            results.append({
+                "benchmark": "result_cache",
+                "case": case,
+                "engine": engine,
+                "populations": populations,
+                "days": days,
+                "cached": summary["cached"],
+                "digest": summary["digest"],
+                "seconds": round(time.perf_counter() - start, 6),
+                "entry_bytes": cache.stats()["size_bytes"],
+            })
+    db_session.close()
+    return results
+
+
+def bench_cohorts(populations=10000, days=365, age_bins=(None, 16), quantities=(50, 10_000_000)):
+    """Motor vectorizado con y sin clases de edad; memoria de las cohortes según la cantidad de individuos."""
+    results = []
+    for quantity in quantities:
+        for bins in age_bins:
+            db_session = memory_session()
+            environment = build_reference_environment(db_session, populations)
+            db_session.execute(Organisms.__table__.update().values(quantity=quantity))
+            db_session.commit()
+            simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(),
+                                             engine="vectorized", seed=0, age_bins=bins)
+            start = time.perf_counter()
+            summary = simulation.run(days)
+            elapsed = time.perf_counter() - start
+            cohorts = simulation.vectorized.cohorts
+            results.append({
+                "benchmark": "cohorts",
+                "age_bins": bins,
+                "populations": populations,
+                "quantity": quantity,
+                "days": days,
+                "events": summary["events"],
+                "seconds": round(elapsed, 6),
+                "cohort_bytes": 0 if cohorts is None else cohorts.counts.nbytes + cohorts.relative.nbytes,
+            })
+            db_session.close()
+    return results
+
+
+# Escenarios del informe de campo medio: (poblaciones, días, temporada de reproducción o None)
+MEANFIELD_SCENARIOS = ((30, 3650, None), (3000, 3650, None), (30, 90, "all_year"))
+
+
+def _trajectory_error(trajectory, reference):
+    """Error medio y final entre trayectorias (muestras x tipos), relativo al total de `reference` en cada muestra.
+
+    Cerca de la extinción el total se acota por debajo al 1% de su máximo, para que
+    unos pocos individuos no dominen el promedio.
+    """
+    total = reference.sum(axis=1)
+    scale = np.maximum(total, max(0.01 * total.max(), 1.0))
+    error = np.abs(trajectory - reference).sum(axis=1) / scale
+    return round(float(error.mean()), 4), round(float(error[-1]), 4)
+
+
+def bench_meanfield(scenarios=MEANFIELD_SCENARIOS, seeds=5, sample_every=30, hybrid_threshold=10):
+    """Precisión y velocidad del motor meanfield (y del híbrido) frente al vectorizado.
+
+    La referencia es la trayectoria media del motor vectorizado con `seeds` semillas; su
+    propio ruido (distancia media de cada semilla a la media) da la escala del error.
+    """
+    results = []
+    for populations, days, season in scenarios:
+        def run(engine, seed=0, **kwargs):
+            db_session = memory_session()
+            environment = build_reference_environment(db_session, populations)
+            if season:
+                db_session.execute(Organisms.__table__.update().values(reproduction_season=season))
+                db_session.commit()
+            simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=seed,
+                                             engine=engine, sample_every=sample_every, **kwargs)
+            start = time.perf_counter()
+            summary = simulation.run(days)
+            elapsed = time.perf_counter() - start
+            db_session.close()
+            return np.array(simulation.trajectory, dtype=np.float64), elapsed, summary["meanfield"]
+
+        runs = [run("vectorized", seed) for seed in range(seeds)]
+        reference = np.mean([trajectory for trajectory, _, _ in runs], axis=0)
+        stochastic_seconds = float(np.mean([elapsed for _, elapsed, _ in runs]))
+        noise = np.mean([_trajectory_error(trajectory, reference) for trajectory, _, _ in runs], axis=0)
+        scenario = {"benchmark": "meanfield", "populations": populations, "days": days,
+                    "reproduction_season": season, "sample_every": sample_every}
+        results.append(dict(scenario, engine="vectorized", seeds=seeds, seconds=round(stochastic_seconds, 6),
+                            mean_error=round(float(noise[0]), 4), final_error=round(float(noise[1]), 4)))
+        for threshold in (None, hybrid_threshold):
+            trajectory, elapsed, stats = run("meanfield", hybrid_threshold=threshold)
+            mean_error, final_error = _trajectory_error(trajectory, reference)
+            results.append(dict(scenario, engine="meanfield", hybrid_threshold=threshold, seconds=round(elapsed, 6),
+                                speedup=round(stochastic_seconds / elapsed, 2), mean_error=mean_error,
+                                final_error=final_error, steps=stats["steps"], switched_at=stats["switched_at"]))
+    return results
+
+
+def _synthetic_events(count, populations=1000):
+    """Filas de Lifecycle con la misma forma (y descripciones) que las del simulador."""
+    types = ("consume", "growth", "reproduce", "death")
+    stream = PopulationStream(0)
+    rows = []
+    for i in range(count):
+        consumed = stream.uniform(0, 20)
+        rows.append((i % populations + 1, stream.choice(types), f"Ciervo cazó y consumió {consumed:.2f} de energía.",
+                     float(i // populations), stream.randint(1, 500), stream.uniform(0, 300)))
+    return rows
+
+
+def bench_columnar_output(events, capacity=50000):
+    """Throughput y tamaño al escribir eventos en la base (SQLite en archivo) frente a Parquet/Arrow."""
+    from .columnar import ColumnarLifecycleSink
+
+    rows = _synthetic_events(events)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'events.db')}")
+        Base.metadata.create_all(bind=engine)
+        initial_size = os.path.getsize(os.path.join(directory, "events.db"))
+        db_session = sessionmaker(bind=engine)()
+        sinks = {"database": lambda: BufferedLifecycleSink(db_session, capacity=capacity)}
+        for file_format in ("parquet", "arrow"):
+            for description in (False, True):
+                name = f"{file_format}{'_with_description' if description else ''}"
+                path = os.path.join(directory, f"{name}.{file_format}")
+                sinks[name] = lambda path=path, file_format=file_format, description=description: (
+                    ColumnarLifecycleSink(path, file_format, capacity, include_description=description)
+                )
+        for name, make_sink in sinks.items():
+            sink = make_sink()
+            start = time.perf_counter()
+            for offset in range(0, events, 1000):
+                sink.record_many(rows[offset:offset + 1000])
+            sink.close()
+            elapsed = time.perf_counter() - start
+            if name == "database":
+                size = os.path.getsize(os.path.join(directory, "events.db")) - initial_size
+            else:
+                size = sink.writer.size_bytes()
+            results.append({
+                "benchmark": "columnar_output",
+                "case": name,
+                "events": events,
+                "events_per_second": round(events / elapsed, 2),
+                "size_bytes": size,
+                "bytes_per_event": round(size / events, 2),
+            })
+        db_session.close()
+        engine.dispose()
+    return results
+
+
+def bench_read_cache(populations=1000, requests=500):
+    """Lecturas repetidas de un entorno y de sus organismos sin caché, con acierto y con If-None-Match.
+
+    La API corre en proceso (TestClient) sobre SQLite en archivo; se cuentan las
+    sentencias SQL que llegan a la base en cada caso.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from .database import get_async_db
+    from .main import app
+    from .read_cache import ReadCache
+    from . import main as api
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "api.db")
+        db_session = memory_session_factory(path)()
+        environment_id = build_reference_environment(db_session, populations).id
+        db_session.close()
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+        statements = [0]
+
+        def count_statement(*args):
+            statements[0] += 1
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+
+        async def override():
+            async with sessions() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = override
+        client = TestClient(app)
+        previous = api.read_cache
+        try:
+            for case, max_bytes in (("no_cache", 0), ("hit", None), ("not_modified", None)):
+                api.read_cache = cache = ReadCache(ttl=3600, max_bytes=max_bytes)
+                for url in (f"/environments/{environment_id}", f"/environments/{environment_id}/organisms/"):
+                    response = client.get(url)
+                    headers = {"If-None-Match": response.headers["etag"]} if case == "not_modified" else {}
+                    statements[0] = 0
+                    start = time.perf_counter()
+                    for _ in range(requests):
+                        response = client.get(url, headers=headers)
+                    elapsed = time.perf_counter() - start
+                    results.append({
+                        "benchmark": "read_cache",
+                        "case": case,
+                        "url": url.replace(str(environment_id), "{id}"),
+                        "populations": populations,
+                        "status": response.status_code,
+                        "requests_per_second": round(requests / elapsed, 2),
+                        "response_bytes": len(response.content),
+                        "statements_per_request": round(statements[0] / requests, 2),
+                        "cache_bytes": cache.stats()["size_bytes"],
+                    })
+        finally:
+            api.read_cache = previous
+            app.dependency_overrides.pop(get_async_db, None)
+            client.close()
+            asyncio.run(async_engine.dispose())
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del simulador de ecosistemas")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    step_cost = commands.add_parser("step-cost", help="Costo por paso al crecer el número de poblaciones")
+    step_cost.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    step_cost.add_argument("--days", type=int, default=10)
+    step_cost.add_argument("--engine", default="simpy")
+
+    state_records = commands.add_parser("state-records", help="Costo por evento con ORM frente a registros")
+    state_records.add_argument("--populations", type=int, default=1000)
+    state_records.add_argument("--events", type=int, default=200000)
+    state_records.add_argument("--commit-every", type=int, default=1000)
+
+    columnar = commands.add_parser("columnar-output", help="Eventos a la base frente a Parquet/Arrow")
+    columnar.add_argument("--events", type=int, default=500000)
+    columnar.add_argument("--capacity", type=int, default=50000)
+
+    suite = commands.add_parser("suite", help="Escenarios de referencia con salida JSON para comparar versiones")
+    suite.add_argument("--scenarios", nargs="+", metavar="POBLACIONES:DIAS",
+                       default=[f"{populations}:{days}" for populations, days in SUITE_SCENARIOS])
+    suite.add_argument("--engines", nargs="+", default=["simpy", "vectorized"])
+    suite.add_argument("--sqlite-file", action="store_true", help="Usa una base SQLite en archivo temporal")
+    suite.add_argument("--no-memory", action="store_true", help="Omite la corrida que mide la memoria pico")
+    suite.add_argument("--output", help="Archivo donde guardar el JSON (por defecto la salida estándar)")
+    suite.add_argument("--baseline", help="JSON de una ejecución anterior con el que comparar")
+
+    logging_bench = commands.add_parser("logging", help="Corrida larga con los mensajes por evento apagados y encendidos")
+    logging_bench.add_argument("--days", type=int, default=1000)
+    logging_bench.add_argument("--populations", type=int, default=30)
+    logging_bench.add_argument("--engine", default="simpy")
+
+    time_advance = commands.add_parser("time-advance", help="Modos discrete y fixed del motor simpy con distintos muestreos")
+    time_advance.add_argument("--sizes", type=int, nargs="+", default=[3, 30, 300])
+    time_advance.add_argument("--days", type=int, default=2000)
+    time_advance.add_argument("--sample-every", type=int, nargs="+", default=[1, 10])
+    result_cache = commands.add_parser("result-cache", help="Corrida repetida sin caché y leída de la caché")
+    result_cache.add_argument("--populations", type=int, default=1000)
+    result_cache.add_argument("--days", type=int, default=100)
+    result_cache.add_argument("--engine", default="simpy")
+    meanfield = commands.add_parser("meanfield", help="Precisión y velocidad del campo medio frente al motor estocástico")
+    meanfield.add_argument("--seeds", type=int, default=5)
+    meanfield.add_argument("--sample-every", type=int, default=30)
+    meanfield.add_argument("--hybrid-threshold", type=int, default=10)
+    cohorts = commands.add_parser("cohorts", help="Motor vectorizado con y sin estructura de edades")
+    cohorts.add_argument("--populations", type=int, default=10000)
+    cohorts.add_argument("--days", type=int, default=365)
+    cohorts.add_argument("--age-bins", type=int, nargs="+", default=[16])
+    cohorts.add_argument("--quantities", type=int, nargs="+", default=[50, 10_000_000])
+    read_cache = commands.add_parser("read-cache", help="Lecturas de la API sin caché, con acierto y con If-None-Match")
+    read_cache.add_argument("--populations", type=int, default=1000)
+    read_cache.add_argument("--requests", type=int, default=500)
+    food_web = commands.add_parser("food-web", help="Caza por tipo frente a la red trófica de Interactions")
+    food_web.add_argument("--populations", type=int, default=10000)
+    food_web.add_argument("--degree", type=int, default=5)
+    food_web.add_argument("--days", type=int, default=30)
+    food_web.add_argument("--engine", default="vectorized")
+
+    args = parser.parse_args(argv)
+    configure_logging()
+    if args.command == "suite":
+        scenarios = [tuple(int(value) for value in scenario.split(":")) for scenario in args.scenarios]
+        report = bench_suite(scenarios, args.engines, args.sqlite_file, not args.no_memory)
+        if args.baseline:
+            with open(args.baseline) as baseline:
+                report = compare_suites(json.load(baseline), report)
+        if args.output:
+            with open(args.output, "w") as output:
+                json.dump(report, output, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+        return
+    if args.command == "step-cost":
+        results = bench_step_cost(args.sizes, args.days, args.engine)
+    elif args.command == "state-records":
+        results = bench_state_records(args.populations, args.events, args.commit_every)
+    elif args.command == "logging":
+        results = bench_logging(args.days, args.populations, args.engine)
+    elif args.command == "food-web":
+        results = bench_food_web(args.populations, args.degree, args.days, args.engine)
+    elif args.command == "time-advance":
+        results = bench_time_advance(args.sizes, args.days, args.sample_every)
+    elif args.command == "result-cache":
+        results = bench_result_cache(args.populations, args.days, args.engine)
+    elif args.command == "meanfield":
+        results = bench_meanfield(seeds=args.seeds, sample_every=args.sample_every,
+                                  hybrid_threshold=args.hybrid_threshold)
+    elif args.command == "cohorts":
+        results = bench_cohorts(args.populations, args.days, [None, *args.age_bins], args.quantities)
+    elif args.command == "read-cache":
+        results = bench_read_cache(args.populations, args.requests)
+    elif args.command == "columnar-output":
+        results = bench_columnar_output(args.events, args.capacity)
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
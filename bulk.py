@@ -0,0 +1,82 @@
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select, update, bindparam
+
+# Content-Type de las cargas línea a línea
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+# Ids por consulta al validar claves foráneas (límite de parámetros de SQLite)
+ID_CHUNK = 5000
+
+
+class BulkPayloadError(ValueError):
+    """Cuerpo de una carga masiva que no se puede leer o validar."""
+
+
+async def read_items(request, schema):
+    """Lee un arreglo JSON o un cuerpo NDJSON y valida cada elemento con `schema`.
+
+    El NDJSON se procesa a medida que llega, sin juntar primero todo el cuerpo.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_TYPES:
+        items = []
+        pending = b""
+        line_number = 0
+        async for chunk in request.stream():
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                line_number += 1
+                _append_line(items, schema, line, line_number)
+        _append_line(items, schema, pending, line_number + 1)
+        return items
+    try:
+        return TypeAdapter(list[schema]).validate_json(await request.body())
+    except ValidationError as e:
+        raise BulkPayloadError(_describe(e)) from None
+
+
+def _append_line(items, schema, line, line_number):
+    if not line.strip():
+        return
+    try:
+        items.append(schema.model_validate_json(line))
+    except ValidationError as e:
+        raise BulkPayloadError(f"Línea {line_number}: {_describe(e)}") from None
+
+
+def _describe(error):
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+async def missing_ids(db, column, ids):
+    """Ids de `ids` que no existen en `column`, con una consulta por tramo de ID_CHUNK."""
+    ids = sorted(set(ids))
+    found = set()
+    for start in range(0, len(ids), ID_CHUNK):
+        chunk = ids[start:start + ID_CHUNK]
+        found.update((await db.scalars(select(column).where(column.in_(chunk)))).all())
+    return [value for value in ids if value not in found]
+
+
+async def insert_rows(db, model, rows):
+    """INSERT masivo con RETURNING; devuelve los ids en el orden de `rows`."""
+    if not rows:
+        return []
+    result = await db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return result.all()
+
+
+async def update_rows(db, model, rows):
+    """UPDATE masivo por id (executemany); cada fila trae `id` y los campos a cambiar."""
+    if not rows:
+        return
+    table = model.__table__
+    fields = [name for name in rows[0] if name != "id"]
+    await db.execute(
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values({name: bindparam(f"b_{name}") for name in fields}),
+        [{f"b_{name}": row[name] for name in ["id"] + fields} for row in rows]
+    )
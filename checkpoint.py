@@ -0,0 +1,87 @@
+import os
+import time
+import zlib
+import struct
+import numpy as np
+
+# Directorio donde se guardan los checkpoints de las simulaciones
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "checkpoints")
+
+MAGIC = b"ECOSNAP2"
+ENGINE_CODES = {"simpy": 0, "vectorized": 1}
+# magic, motor, reloj simulado, recursos del entorno, poblaciones, semilla
+HEADER = struct.Struct("<8sBddIq")
+# Columnas por población, en el orden en que se guardan
+COLUMNS = (("ids", np.int64), ("energy", np.float64), ("quantity", np.int64),
+           ("next_wake", np.float64), ("wake_order", np.int64), ("draws", np.uint64))
+
+
+class SimulationSnapshot:
+    """Estado completo de una simulación en un instante del reloj simulado.
+
+    `next_wake` guarda el tiempo del timeout pendiente de cada población (NaN si su
+    proceso ya terminó) y `wake_order` el orden en que se programaron, para que al
+    reanudar los despertares simultáneos se procesen en el mismo orden. Los flujos
+    aleatorios quedan determinados por `seed` y los números usados por cada población
+    (`draws`).
+    """
+
+    def __init__(self, engine, now, resources, seed, ids, energy, quantity, next_wake, wake_order, draws):
+        self.engine = engine
+        self.now = now
+        self.resources = resources
+        self.seed = seed
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.energy = np.asarray(energy, dtype=np.float64)
+        self.quantity = np.asarray(quantity, dtype=np.int64)
+        self.next_wake = np.asarray(next_wake, dtype=np.float64)
+        self.wake_order = np.asarray(wake_order, dtype=np.int64)
+        self.draws = np.asarray(draws, dtype=np.uint64)
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, ENGINE_CODES[self.engine], float(self.now), float(self.resources),
+                             self.ids.size, self.seed)
+        body = b"".join(getattr(self, name).tobytes() for name, _ in COLUMNS)
+        return header + zlib.compress(body, 1)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, engine_code, now, resources, count, seed = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("El archivo no es un checkpoint de simulación")
+        body = zlib.decompress(data[HEADER.size:])
+        columns = []
+        offset = 0
+        for _, dtype in COLUMNS:
+            columns.append(np.frombuffer(body, dtype=dtype, count=count, offset=offset))
+            offset += count * 8
+        engine = next(name for name, code in ENGINE_CODES.items() if code == engine_code)
+        return cls(engine, now, resources, seed, *columns)
+
+
+def checkpoint_path(environment_id):
+    """Ruta del checkpoint de un entorno dentro de CHECKPOINT_DIR."""
+    return os.path.join(CHECKPOINT_DIR, f"environment_{environment_id}.ecosnap")
+
+
+def write_snapshot(path, snapshot):
+    """Escribe el checkpoint de forma atómica y devuelve (bytes, segundos)."""
+    start = time.perf_counter()
+    data = snapshot.to_bytes()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+    return len(data), time.perf_counter() - start
+
+
+def read_snapshot(path):
+    """Lee un checkpoint y devuelve (snapshot, bytes, segundos)."""
+    start = time.perf_counter()
+    with open(path, "rb") as handle:
+        data = handle.read()
+    snapshot = SimulationSnapshot.from_bytes(data)
+    return snapshot, len(data), time.perf_counter() - start
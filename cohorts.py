@@ -0,0 +1,148 @@
+"""Estructura de edades de las poblaciones en arreglos compactos.
+
+Cada población se divide en `bins` clases de edad, con los individuos y la energía de
+cada cohorte (la misma magnitud que `initial_energy`, que pasa a ser la media de las
+cohortes ponderada por individuos). La memoria por población es fija (bins × 16
+bytes): diez millones de ciervos ocupan lo mismo que cincuenta.
+
+Una clase de edad dura `lifespan * LIFESPAN_DAYS / bins` días (al menos uno). Cada vez
+que se cumple ese plazo todas las cohortes pasan a la clase siguiente y los individuos
+de la última mueren de viejos. Solo se reproducen las cohortes maduras (a partir de
+MATURITY de la vida) con energía suficiente; las crías entran en la primera clase.
+Las poblaciones sin `lifespan` no envejecen y todas sus cohortes son fértiles.
+
+Variables de entorno:
+
+    COHORT_AGE_BINS        clases de edad por población (16 por defecto)
+    COHORT_LIFESPAN_DAYS   días simulados por unidad de `lifespan` (365 por defecto)
+"""
+import math
+import os
+import numpy as np
+
+AGE_BINS = int(os.getenv("COHORT_AGE_BINS", 16))
+LIFESPAN_DAYS = float(os.getenv("COHORT_LIFESPAN_DAYS", 365))
+# Fracción de la vida a partir de la cual una cohorte puede reproducirse
+MATURITY = 0.2
+# Máximo de individuos de una población (int64), con margen para el redondeo de float64
+MAX_INDIVIDUALS = 2.0 ** 63 - 4096
+
+
+def check_individuals(total):
+    """Lanza OverflowError si algún total de individuos (en float) no cabe en un entero de 64 bits."""
+    if (total >= MAX_INDIVIDUALS).any():
+        raise OverflowError("La población supera el máximo de individuos de un entero de 64 bits")
+
+
+def offspring(counts, birth_rate):
+    """int(counts * birth_rate) crías por grupo.
+
+    El motor SimPy falla al guardar una población que no entra en la base; aquí un
+    entero de NumPy daría la vuelta a negativo en silencio, así que se falla antes.
+    """
+    births = counts * birth_rate
+    check_individuals(counts + births)
+    return births.astype(np.int64)
+
+
+def _weighted(counts, values):
+    """counts * values sin contar las cohortes vacías."""
+    return np.multiply(counts, values, out=np.zeros(values.shape), where=counts > 0)
+
+
+class CohortStore:
+    """Individuos y energía por población y clase de edad (arreglos poblaciones × clases).
+
+    La energía de una cohorte es `offset[i] + relative[i, b]`: los cambios de energía de
+    toda la población (comer, cazar, metabolismo) solo tocan `offset`, así cuestan lo
+    mismo con o sin clases de edad.
+    """
+
+    def __init__(self, quantity, energy, lifespan, bins=AGE_BINS, lifespan_days=LIFESPAN_DAYS, now=0):
+        if bins < 1:
+            raise ValueError("bins debe ser mayor que 0")
+        quantity = np.asarray(quantity, dtype=np.int64)
+        span = np.array([value or 0.0 for value in lifespan], dtype=np.float64) * lifespan_days
+        self.bins = bins
+        self.start = int(now)
+        # Días por clase de edad (0: la población no envejece)
+        self.bin_days = np.where(span > 0, np.maximum(np.ceil(span / bins), 1), 0).astype(np.int64)
+        first_mature = np.where(self.bin_days > 0, math.ceil(MATURITY * bins), 0)
+        self.mature = np.arange(bins)[None, :] >= first_mature[:, None]
+        # Al empezar los individuos se reparten por igual entre las clases (el resto, en las más jóvenes)
+        base, extra = np.divmod(quantity, bins)
+        self.counts = base[:, None] + (np.arange(bins)[None, :] < extra[:, None])
+        self.offset = np.array(energy, dtype=np.float64)
+        self.relative = np.zeros((quantity.size, bins))
+
+    def cohort_energy(self, rows):
+        return self.offset[rows, None] + self.relative[rows]
+
+    def totals(self, rows=slice(None)):
+        return self.counts[rows].sum(axis=1)
+
+    def mean_energy(self, rows, fallback):
+        """Energía media de las poblaciones `rows` (`fallback` si no tienen individuos)."""
+        counts = self.counts[rows]
+        total = counts.sum(axis=1)
+        relative = _weighted(counts, self.relative[rows]).sum(axis=1) / np.maximum(total, 1)
+        return np.where(total > 0, self.offset[rows] + relative, fallback)
+
+    def add_energy(self, rows, before, after):
+        """Suma a las cohortes de `rows` el cambio de energía de su población (de `before` a `after`)."""
+        delta = after - before
+        finite = np.isfinite(delta)
+        self.offset[rows] = np.where(finite, self.offset[rows] + delta, after)
+        # Si la energía llegó a infinito la diferencia no sirve: las cohortes toman la de la población
+        if not finite.all():
+            self.relative[rows[~finite]] = 0.0
+
+    def remove(self, rows, amount):
+        """Quita `amount` individuos de cada población de `rows`, de la cohorte más vieja a la más joven."""
+        counts = self.counts[rows][:, ::-1]
+        older = np.cumsum(counts, axis=1) - counts
+        taken = np.clip(amount[:, None] - older, 0, counts)
+        self.counts[rows] -= taken[:, ::-1]
+
+    def age(self, day):
+        """Pasa a la clase siguiente las poblaciones cuyo plazo se cumple en `day`.
+
+        Devuelve (filas, muertos por edad, energía de los muertos) de las poblaciones que envejecieron.
+        """
+        elapsed = day - self.start
+        if elapsed <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        rows = np.flatnonzero((self.bin_days > 0) & (elapsed % np.maximum(self.bin_days, 1) == 0))
+        if not rows.size:
+            return rows, np.zeros(0, dtype=np.int64), np.zeros(0)
+        dead = self.counts[rows, -1].copy()
+        dead_energy = self.offset[rows] + self.relative[rows, -1]
+        self.counts[rows, 1:] = self.counts[rows, :-1]
+        self.relative[rows, 1:] = self.relative[rows, :-1]
+        self.counts[rows, 0] = 0
+        return rows, dead, dead_energy
+
+    def reproduce(self, rows, threshold, birth_rate):
+        """Reproducción por cohorte de las poblaciones `rows`.
+
+        Cada cohorte madura con energía de al menos `threshold` tiene
+        int(individuos * birth_rate) crías y paga `threshold` de energía. Las crías
+        entran en la primera clase con la energía media de sus progenitoras. Devuelve
+        (crías por población, si alguna cohorte de la población se reprodujo).
+        """
+        counts = self.counts[rows]
+        relative = self.relative[rows]
+        fertile = self.mature[rows] & (counts > 0) & (relative >= (threshold - self.offset[rows])[:, None])
+        births = np.where(fertile, offspring(counts, birth_rate[:, None]), 0)
+        relative -= np.where(fertile, threshold[:, None], 0.0)
+        check_individuals(counts.sum(axis=1) + births.sum(axis=1, dtype=np.float64))
+        total = births.sum(axis=1)
+        parents = _weighted(births, relative).sum(axis=1) / np.maximum(total, 1)
+        # La cohorte recién nacida se suma a la primera clase
+        newborn = counts[:, 0] + total
+        merged = (_weighted(counts[:, 0], relative[:, 0]) + _weighted(total, parents)) / np.maximum(newborn, 1)
+        relative[:, 0] = np.where(newborn > 0, merged, relative[:, 0])
+        counts[:, 0] = newborn
+        self.counts[rows] = counts
+        self.relative[rows] = relative
+        return total, fertile.any(axis=1)
@@ -0,0 +1,249 @@
+"""Salida de las corridas en archivos columnares (Parquet o Arrow IPC) para análisis.
+
+Requiere pyarrow, que es opcional: sin él el resto del simulador funciona igual y
+estas clases lanzan RuntimeError al construirse.
+"""
+import os
+import time
+from sqlalchemy import select
+from .event_sink import LifecycleEventSink
+from .models import Lifecycle, PopulationHistory
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+COLUMNAR_FORMATS = ("parquet", "arrow")
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+# Filas por lote (row group en Parquet, record batch en Arrow)
+COLUMNAR_CHUNK = 50000
+EXPORT_TABLES = ("lifecycle", "population")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("La salida columnar requiere pyarrow (pip install pyarrow)")
+
+
+def lifecycle_schema(include_description=False):
+    """Esquema de los eventos: event_type como diccionario y columnas numéricas tipadas."""
+    fields = [
+        ("run_id", pa.int64()),
+        ("organism_id", pa.int64()),
+        ("event_type", pa.dictionary(pa.int8(), pa.string())),
+        ("timestamp", pa.float64()),
+        ("quantity", pa.int64()),
+        ("energy", pa.float64()),
+    ]
+    if include_description:
+        fields.append(("description", pa.string()))
+    return pa.schema(fields)
+
+
+def population_schema():
+    return pa.schema([
+        ("run_id", pa.int64()),
+        ("sim_time", pa.float64()),
+        ("plant", pa.int64()),
+        ("herbivore", pa.int64()),
+        ("predator", pa.int64()),
+    ])
+
+
+def output_path(name, table, file_format, directory=None):
+    """Ruta del archivo de `table` ("lifecycle" o "population") de una corrida o trabajo."""
+    return os.path.join(directory or EXPORT_DIR, f"{name}_{table}.{EXTENSIONS[file_format]}")
+
+
+class ColumnarWriter:
+    """Escribe lotes de columnas en un archivo Parquet o Arrow IPC."""
+
+    def __init__(self, path, schema, file_format="parquet", compression="zstd"):
+        _require_pyarrow()
+        if file_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Formato columnar desconocido: {file_format}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.schema = schema
+        self.file_format = file_format
+        self.rows_written = 0
+        # Valores ya vistos de cada columna diccionario: los lotes comparten un diccionario
+        # que solo crece (Arrow IPC no admite reemplazarlo entre lotes)
+        self._dictionaries = {field.name: {} for field in schema if pa.types.is_dictionary(field.type)}
+        if file_format == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression=compression)
+        else:
+            self._sink = pa.OSFile(path, "wb")
+            options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(self._sink, schema, options=options)
+
+    def write(self, columns):
+        """Escribe un lote; `columns` tiene una lista de valores por campo del esquema."""
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if field.name in self._dictionaries:
+                positions = self._dictionaries[field.name]
+                indices = [positions.setdefault(value, len(positions)) for value in values]
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(indices, type=field.type.index_type), pa.array(list(positions), type=field.type.value_type)
+                ))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        batch = pa.record_batch(arrays, schema=self.schema)
+        self._writer.write_batch(batch)
+        self.rows_written += batch.num_rows
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        if self.file_format == "arrow":
+            self._sink.close()
+        self._writer = None
+
+    @property
+    def closed(self):
+        return self._writer is None
+
+    def size_bytes(self):
+        return os.path.getsize(self.path)
+
+
+class ColumnarLifecycleSink(LifecycleEventSink):
+    """Escribe los eventos en un archivo columnar en lugar de la tabla lifecycle.
+
+    Sin `include_description` no se guarda la frase de cada evento (que es la mayor
+    parte de cada fila) y el motor vectorizado ni siquiera la formatea.
+    """
+
+    def __init__(self, path, file_format="parquet", capacity=COLUMNAR_CHUNK, include_description=False,
+                 compression="zstd"):
+        super().__init__()
+        if capacity < 1:
+            raise ValueError("capacity debe ser mayor que 0")
+        self.keeps_descriptions = include_description
+        self.capacity = capacity
+        self.writer = ColumnarWriter(path, lifecycle_schema(include_description), file_format, compression)
+        self._rows = []
+
+    def record(self, organism_id, event_type, description, timestamp, quantity, energy):
+        self._rows.append((organism_id, event_type, description, timestamp, quantity, energy))
+        if len(self._rows) >= self.capacity:
+            self.flush()
+
+    def record_many(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self.capacity:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        start = time.perf_counter()
+        organism_id, event_type, description, timestamp, quantity, energy = zip(*self._rows)
+        columns = {
+            "run_id": [self.run_id] * len(self._rows),
+            "organism_id": organism_id,
+            "event_type": event_type,
+            "timestamp": timestamp,
+            "quantity": quantity,
+            "energy": energy,
+            "description": description,
+        }
+        self.writer.write(columns)
+        self.write_seconds += time.perf_counter() - start
+        self.events_written += len(self._rows)
+        self.flush_count += 1
+        self._rows = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.writer.close()
+
+    def stats(self):
+        stats = super().stats()
+        stats["path"] = self.writer.path
+        stats["size_bytes"] = self.writer.size_bytes() if self.writer.closed else None
+        return stats
+
+
+class ColumnarPopulationWriter:
+    """Callback diario que escribe la población de cada día en un archivo columnar."""
+
+    def __init__(self, path, file_format="parquet", run_id=None, capacity=COLUMNAR_CHUNK, compression="zstd"):
+        self.run_id = run_id
+        self.capacity = capacity
+        self.writer = ColumnarWriter(path, population_schema(), file_format, compression)
+        self._points = []
+
+    def __call__(self, simulation):
+        self.record(simulation.env.now, *simulation.population_counts(), run_id=simulation.run_id)
+
+    def record(self, sim_time, plant, herbivore, predator, run_id=None):
+        if run_id is not None:
+            self.run_id = run_id
+        self._points.append((sim_time, plant, herbivore, predator))
+        if len(self._points) >= self.capacity:
+            self.flush()
+
+    def flush(self):
+        if not self._points:
+            return
+        sim_time, plant, herbivore, predator = zip(*self._points)
+        self.writer.write({"run_id": [self.run_id] * len(sim_time), "sim_time": sim_time,
+                           "plant": plant, "herbivore": herbivore, "predator": predator})
+        self._points = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.writer.close()
+
+
+# Consulta y columnas de cada tabla exportable de una corrida
+def _export_query(table, run_id, include_description):
+    if table == "lifecycle":
+        columns = [Lifecycle.run_id, Lifecycle.organism_id, Lifecycle.event_type, Lifecycle.timestamp,
+                   Lifecycle.quantity, Lifecycle.energy]
+        if include_description:
+            columns.append(Lifecycle.description)
+        return select(*columns).where(Lifecycle.run_id == run_id).order_by(Lifecycle.id), \
+            lifecycle_schema(include_description)
+    if table == "population":
+        columns = [PopulationHistory.run_id, PopulationHistory.sim_time,
+                   PopulationHistory.plant_population.label("plant"),
+                   PopulationHistory.herbivore_population.label("herbivore"),
+                   PopulationHistory.predator_population.label("predator")]
+        return select(*columns).where(PopulationHistory.run_id == run_id).order_by(PopulationHistory.sim_time), \
+            population_schema()
+    raise ValueError(f"Tabla desconocida: {table}")
+
+
+def export_run(db_session, run_id, table, path, file_format="parquet", chunk=COLUMNAR_CHUNK,
+               include_description=False):
+    """Copia una tabla de la corrida a un archivo columnar de a `chunk` filas.
+
+    Las filas se leen con yield_per, así que en memoria nunca hay más de un lote.
+    Devuelve filas escritas, tamaño del archivo y segundos.
+    """
+    _require_pyarrow()
+    statement, schema = _export_query(table, run_id, include_description)
+    start = time.perf_counter()
+    writer = ColumnarWriter(path, schema, file_format)
+    try:
+        result = db_session.execute(statement.execution_options(yield_per=chunk))
+        for rows in result.partitions():
+            writer.write({name: values for name, values in zip(schema.names, zip(*rows))})
+    finally:
+        writer.close()
+    return {"table": table, "format": file_format, "path": path, "rows": writer.rows_written,
+            "size_bytes": writer.size_bytes(), "seconds": round(time.perf_counter() - start, 6)}
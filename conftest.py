@@ -0,0 +1,107 @@
+# conftest.py
+
+import atexit
+import os
+import shutil
+import tempfile
+
+# Los módulos del paquete crean los motores al importarse; sin DATABASE configurada las
+# pruebas usan un SQLite en archivo temporal. En memoria, el motor asíncrono de la API
+# tendría su propia base sin tablas; con un archivo comparte las del motor síncrono.
+if "DATABASE" not in os.environ:
+    _database_dir = tempfile.mkdtemp(prefix="ecosim-tests-")
+    atexit.register(shutil.rmtree, _database_dir, ignore_errors=True)
+    os.environ["DATABASE"] = f"sqlite:///{os.path.join(_database_dir, 'api.db')}"
+# La caché de resultados de la API y de los workers no comparte entradas con el directorio de trabajo
+if "RESULT_CACHE_DIR" not in os.environ:
+    _cache_dir = tempfile.mkdtemp(prefix="ecosim-cache-")
+    atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
+    os.environ["RESULT_CACHE_DIR"] = _cache_dir
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from . import database
+from .database import Base, get_async_db, get_db, get_simulation_db
+from .main import app
+from .models import Environment, Organisms
+from .read_cache import read_cache
+
+# database.py llama a create_all antes de que se definan los modelos: las tablas de la
+# base de la API (la que usan test_organisms.py y los endpoints sin override) se crean aquí
+Base.metadata.create_all(bind=database.engine)
+
+
+# Mismas especies que en test_organisms.py
+FIXTURE_ORGANISMS = [
+    dict(name="Ciervo", organism_type="Herbivore", birth_rate=0.3, death_rate=0.1, initial_energy=100.0,
+         quantity=50, growth_rate=1.05, energy_consumption_rate=10.0, reproduction_season="Primavera",
+         lifespan=15.0, reproduction_energy_threshold=20.0, min_energy_for_health=15.0),
+    dict(name="Lobo", organism_type="Carnivore", birth_rate=0.1, death_rate=0.05, initial_energy=200.0,
+         quantity=15, growth_rate=1.02, energy_consumption_rate=20.0, reproduction_season="Invierno",
+         lifespan=12.0, reproduction_energy_threshold=30.0, min_energy_for_health=25.0),
+    dict(name="Helecho", organism_type="Plant", birth_rate=1.0, death_rate=0.2, initial_energy=50.0,
+         quantity=100, growth_rate=1.10, energy_consumption_rate=5.0, reproduction_season="Verano",
+         lifespan=5.0, reproduction_energy_threshold=10.0, min_energy_for_health=10.0),
+]
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def environment(db_session):
+    """Entorno con un ciervo, un lobo y un helecho."""
+    environment = Environment(name="Bosque", temperature=18.0, humidity=0.6, resources=500.0, surface_area=10.0)
+    db_session.add(environment)
+    db_session.commit()
+    for data in FIXTURE_ORGANISMS:
+        db_session.add(Organisms(environment_id=environment.id, **data))
+    db_session.commit()
+    return environment
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Cliente de la API sobre una base SQLite en archivo propia de la prueba."""
+    url = f"sqlite:///{tmp_path / 'api.db'}"
+    Base.metadata.create_all(bind=create_engine(url))
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'api.db'}")
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    sync_sessions = sessionmaker(autocommit=False, autoflush=False, bind=create_engine(url))
+
+    async def override():
+        async with sessions() as db:
+            yield db
+
+    def sync_override():
+        db = sync_sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_async_db] = override
+    # Los endpoints síncronos (simulaciones, corridas) usan la misma base
+    app.dependency_overrides[get_db] = sync_override
+    app.dependency_overrides[get_simulation_db] = sync_override
+    # Cada prueba tiene su propia base con los mismos ids: las lecturas guardadas no sirven
+    read_cache.clear()
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
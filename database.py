@@ -1,29 +1,194 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from collections import deque
 from dotenv import load_dotenv
+import threading
+import logging
+import time
 import os
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 DATABASE_URL = os.getenv('DATABASE')
 
-# Crear el motor de conexión
-engine = create_engine(DATABASE_URL)
+# Pool de la API (lecturas y CRUD)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+# Pool de las simulaciones: pocas conexiones con escrituras largas en bloque
+SIMULATION_POOL_SIZE = int(os.getenv("SIMULATION_DB_POOL_SIZE", 2))
+SIMULATION_MAX_OVERFLOW = int(os.getenv("SIMULATION_DB_MAX_OVERFLOW", 2))
+SIMULATION_STATEMENT_TIMEOUT_MS = int(os.getenv("SIMULATION_DB_STATEMENT_TIMEOUT_MS", 0))
+# Comunes a todos los pools
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Driver asíncrono de cada motor para el AsyncSession de la API
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite", "mysql": "aiomysql"}
+
+
+class PoolMetrics:
+    """Latencia de checkout y saturación de un pool de conexiones."""
+
+    def __init__(self, name, capacity=None):
+        self.name = name
+        self.capacity = capacity
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.recent_waits = deque(maxlen=1000)
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self.recent_waits.append(seconds)
+
+    def timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self.recent_waits)
+        checked_out = self.pool.checkedout() if isinstance(self.pool, QueuePool) else None
+        return {
+            "pool": self.name,
+            "capacity": self.capacity,
+            "checked_out": checked_out,
+            "saturation": round(checked_out / self.capacity, 4) if checked_out is not None and self.capacity else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "mean_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 4) if self.checkouts else None,
+            "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 4) if waits else None,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 4),
+        }
+
+
+class MeteredPool:
+    """Mezcla para una clase de pool que mide cuánto tarda cada checkout.
+
+    Las métricas se guardan como atributo de clase: SQLAlchemy recrea el pool con
+    `self.__class__` al hacer dispose(), así que sobreviven a la recreación.
+    """
+
+    metrics = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics.pool = self
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.metrics.timed_out()
+            raise
+        self.metrics.observe(time.perf_counter() - start)
+        return connection
+
+
+# Métricas de cada pool por nombre ("api", "simulation", "api_async")
+POOL_METRICS = {}
+
+
+def engine_options(url, name, pool_size, max_overflow, statement_timeout_ms, pool_timeout=POOL_TIMEOUT):
+    """Argumentos de create_engine/create_async_engine para un pool con métricas."""
+    url = make_url(url)
+    pool_class = url.get_dialect().get_pool_class(url)
+    options = {"pool_pre_ping": POOL_PRE_PING, "pool_recycle": POOL_RECYCLE}
+    capacity = None
+    if issubclass(pool_class, QueuePool):
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+        capacity = pool_size + max(max_overflow, 0)
+    if statement_timeout_ms and url.get_backend_name() == "postgresql":
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(statement_timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    metrics = POOL_METRICS[name] = PoolMetrics(name, capacity)
+    options["poolclass"] = type(f"Metered{pool_class.__name__}", (MeteredPool, pool_class), {"metrics": metrics})
+    return options
+
+
+def async_database_url(url):
+    """URL con el driver asíncrono del mismo motor (o ASYNC_DATABASE si está definida)."""
+    if os.getenv("ASYNC_DATABASE"):
+        return os.getenv("ASYNC_DATABASE")
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def _is_memory_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+# Crear el motor de conexión de la API
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, "api", POOL_SIZE, MAX_OVERFLOW, STATEMENT_TIMEOUT_MS))
+# Las simulaciones escriben con su propio pool para no dejar a la API sin conexiones
+# (una base SQLite en memoria solo existe en su motor, así que se comparte)
+if _is_memory_sqlite(DATABASE_URL):
+    simulation_engine = engine
+else:
+    simulation_engine = create_engine(DATABASE_URL, **engine_options(
+        DATABASE_URL, "simulation", SIMULATION_POOL_SIZE, SIMULATION_MAX_OVERFLOW, SIMULATION_STATEMENT_TIMEOUT_MS
+    ))
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(
+    ASYNC_DATABASE_URL, "api_async", POOL_SIZE, MAX_OVERFLOW, STATEMENT_TIMEOUT_MS
+))
 # Crear una clase Base para los modelos
 Base = declarative_base()
-# Crear una fábrica de sesiones
+# Crear las fábricas de sesiones
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SimulationSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=simulation_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 # Crear las tablas en la base de datos
 try:
     Base.metadata.create_all(bind=engine)
 except Exception as e:
-    print(f"Error creando las tablas: {e}")
+    logger.error("Error creando las tablas: %s", e)
+
+
+def pool_stats():
+    """Métricas de todos los pools de conexiones."""
+    return [metrics.stats() for metrics in POOL_METRICS.values()]
+
+
 # Dependencia para obtener la sesión de base de datos
 def get_db():
     db = SessionLocal()
-    print(db)
     try:
         yield db
     finally:
         db.close()
+
+
+# Sesión del pool de simulaciones (endpoints que corren una simulación en la petición)
+def get_simulation_db():
+    db = SimulationSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Sesión asíncrona para los endpoints CRUD
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,89 +1,317 @@
 from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException, Depends
 from sqlalchemy.orm import Session
-from .models import Environment, Organisms, PopulationHistory, Lifecycle
 from . import database
+from .event_sink import BufferedLifecycleSink, NullLifecycleSink
+from .vectorized_engine import VectorizedEngine
+from .spatial import SpatialEngine
+from .meanfield import MeanFieldEngine
+from .trophic_index import TrophicIndex
+from .foodweb import FoodWeb, load_interactions
+from .checkpoint import SimulationSnapshot, read_snapshot, write_snapshot
+from .state import load_environment_state, load_organism_states, write_back_states
+from .rng import PopulationStream, new_seed, stream_key
+from .runs import decode_initial_state, finish_run, start_run, state_digest
+from .history import HistoryRecorder
+from .profiler import NullProfiler, SimulationProfiler
+from .time_advance import TIME_ADVANCE_MODES, FixedStepScheduler, UrgentTimeout
+from .logs import EVENTS_LOGGER
+import logging
 import simpy
-import random
+import math
+import time
 from datetime import datetime
-import asyncio
+import numpy as np
+
+logger = logging.getLogger(__name__)
+# Mensajes por evento del ciclo de vida (DEBUG, apagados por defecto; ver logs.py)
+event_logger = logging.getLogger(EVENTS_LOGGER)
+
+# Motores disponibles: un proceso SimPy por población, arreglos NumPy por día, una
+# grilla de celdas con la superficie del entorno (ver spatial.py) o el sistema de EDO
+# de campo medio (ver meanfield.py)
+ENGINES = ("simpy", "vectorized", "spatial", "meanfield")
+# Motores sin checkpoints
+NO_CHECKPOINT_ENGINES = ("spatial", "meanfield")
+
+
+class SimulationCancelled(Exception):
+    """Se lanza desde un callback diario para detener la simulación."""
+
 
 class EcosystemSimulation:
-    def __init__(self, db_session, environment_id):
+    def __init__(self, db_session, environment_id, event_sink=None, engine="simpy", seed=None,
+                 organisms=None, environment=None, profile=False, profile_capture=None, cell_area=None,
+                 spatial_workers=None, interactions=None, time_advance="discrete", sample_every=1, age_bins=None,
+                 hybrid_threshold=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Motor de simulación desconocido: {engine}")
+        if cell_area is not None and cell_area <= 0:
+            raise ValueError("cell_area debe ser mayor que 0")
+        if time_advance not in TIME_ADVANCE_MODES:
+            raise ValueError(f"Modo de avance del tiempo desconocido: {time_advance}")
+        if int(sample_every) != sample_every or sample_every < 1:
+            raise ValueError("sample_every debe ser un número entero de días mayor que 0")
+        if age_bins is not None and (engine != "vectorized" or age_bins < 1):
+            raise ValueError("age_bins requiere el motor vectorized y al menos una clase de edad")
+        if hybrid_threshold is not None and (engine != "meanfield" or hybrid_threshold < 1):
+            raise ValueError("hybrid_threshold requiere el motor meanfield y al menos un individuo")
         self.db_session = db_session
         self.environment_id = environment_id
+        self.engine = engine
+        # Semilla de los flujos aleatorios; sin semilla se elige una y queda en el resumen
+        self.seed = seed if seed is not None else new_seed()
+        self.vectorized = None
+        self.spatial = None
+        # Superficie por celda y procesos del motor espacial
+        self.cell_area = cell_area
+        self.spatial_workers = spatial_workers
+        # Cómo avanza el motor simpy (ver time_advance.py) y cada cuántos días se toma una muestra
+        # de la población (historia, trayectoria, checkpoints y callbacks)
+        self.time_advance = time_advance
+        self.sample_every = int(sample_every)
+        # Clases de edad por población del motor vectorizado (ver cohorts.py); None: sin edades
+        self.age_bins = age_bins
+        # Motor de campo medio y cantidad de individuos por debajo de la cual pasa al vectorizado
+        self.meanfield = None
+        self.hybrid_threshold = hybrid_threshold
         self.env = simpy.Environment()
-        self.organisms = self.load_organisms()
-        self.environment = self.load_environment()
+        # Los eventos de Lifecycle se acumulan y se escriben en bloque
+        if event_sink is None:
+            event_sink = BufferedLifecycleSink(db_session) if db_session is not None else NullLifecycleSink()
+        self.event_sink = event_sink
+        # La descripción de cada evento solo se formatea si el destino la guarda o si se registra
+        self.describe_events = event_sink.keeps_events and event_sink.keeps_descriptions
+        self.events_logged = 0
+        # Tiempos por fase (ver profiler.py); `profile_capture` guarda además un perfil de cProfile
+        if profile or profile_capture:
+            self.profiler = SimulationProfiler(profile_capture)
+        else:
+            self.profiler = NullProfiler()
+        # Funciones llamadas con la simulación en cada muestra (por defecto, cada día simulado)
+        self.day_callbacks = []
+        # Con `organisms`/`environment` se simula sobre registros ya cargados (ver from_states)
+        self.organisms = organisms if organisms is not None else self.load_organisms()
+        self.environment = environment if environment is not None else self.load_environment()
+        # Plantas/herbívoros vivos y totales por tipo, actualizados en cada cambio
+        self.index = TrophicIndex(self.organisms)
+        # Red trófica de Interactions (ver foodweb.py): con base de datos se completa al
+        # empezar cada run(); sin interacciones los carnívoros cazan cualquier herbívoro
+        self.food_web = FoodWeb([organism.id for organism in self.organisms], interactions or ())
+        # Flujo aleatorio independiente por población (ver rng.PopulationStream)
+        self.streams = {
+            organism.id: PopulationStream(stream_key(self.seed, organism.id)) for organism in self.organisms
+        }
+        # Poblaciones por tipo al cerrar cada día, para el digest de la corrida
+        self.trajectory = []
+        # Tiempo simulado de cada punto de `trajectory` (una muestra cada `sample_every` días)
+        self.sample_times = []
+        self.run_id = None
+        # Historia de la población de la corrida (solo si hay base de datos)
+        self.history = None
+        # Timeout pendiente de cada población: id -> (tiempo de despertar, orden de programación)
+        self.pending_wakes = {}
+        self._wake_counter = 0
+        self.restored_snapshot = None
+        self.checkpoint_every = None
+        self.checkpoint_path = None
+        self.checkpoint_stats = {"written": 0, "size_bytes": None, "write_seconds": 0.0,
+                                 "read_size_bytes": None, "read_seconds": None}
+
+    @classmethod
+    def from_checkpoint(cls, db_session, environment_id, path, **kwargs):
+        """Crea una simulación que continúa desde el checkpoint guardado en `path`."""
+        snapshot, size, seconds = read_snapshot(path)
+        # La semilla es la del checkpoint: los flujos continúan donde quedaron
+        kwargs.pop("seed", None)
+        simulation = cls(db_session, environment_id, engine=snapshot.engine, seed=snapshot.seed, **kwargs)
+        simulation.restore(snapshot)
+        simulation.checkpoint_stats.update(read_size_bytes=size, read_seconds=round(seconds, 6))
+        return simulation
+
+    @classmethod
+    def from_states(cls, organisms, environment, **kwargs):
+        """Crea una simulación en memoria sobre registros OrganismState/EnvironmentState.
+
+        No usa la base de datos: la historia y el estado final no se guardan, y el
+        resultado se lee del resumen de `run()` o de los callbacks diarios.
+        """
+        return cls(None, environment.id, organisms=organisms, environment=environment, **kwargs)
+
+    @classmethod
+    def from_run(cls, run, **kwargs):
+        """Reconstruye en memoria una corrida registrada (SimulationRun) para repetirla."""
+        organisms, environment, interactions, settings = decode_initial_state(run.initial_state)
+        kwargs.pop("seed", None)
+        kwargs.setdefault("sample_every", settings.get("sample_every", 1))
+        kwargs.setdefault("age_bins", settings.get("age_bins"))
+        kwargs.setdefault("hybrid_threshold", settings.get("hybrid_threshold"))
+        simulation = cls.from_states(organisms, environment, engine=run.engine, seed=run.seed,
+                                     interactions=[(None, *edge) for edge in interactions], **kwargs)
+        if run.initial_snapshot is not None:
+            simulation.restore(SimulationSnapshot.from_bytes(run.initial_snapshot))
+        return simulation
 
     def load_organisms(self):
-        """Cargar organismos de la base de datos."""
-        organisms_data = self.db_session.query(Organisms).filter(
-            Organisms.environment_id == self.environment_id
-        ).all()
-        return organisms_data
+        """Cargar organismos de la base de datos como registros livianos (OrganismState)."""
+        return load_organism_states(self.db_session, self.environment_id)
 
     def load_environment(self):
         """Cargar el entorno desde la base de datos."""
-        print("Cargando entorno...")
-        return self.db_session.query(Environment).filter(Environment.id == self.environment_id).first()
+        logger.debug("Cargando entorno %s", self.environment_id, extra={"environment_id": self.environment_id})
+        return load_environment_state(self.db_session, self.environment_id)
+
+    def refresh_food_web(self):
+        """Agrega a la red trófica las interacciones creadas desde la última lectura.
+
+        Solo lee las filas nuevas y las inserta en la red ya compilada; devuelve cuántas
+        aristas se agregaron.
+        """
+        if self.db_session is None:
+            return 0
+        return self.food_web.add(load_interactions(self.db_session, self.environment_id,
+                                                   self.food_web.last_interaction_id))
+
+    def choose_prey(self, organism, rng):
+        """Presa viva al azar para `organism`, o None si no tiene.
 
-    def organism_lifecycle(self, organism):
-        """Ciclo de vida individual de un organismo."""
-        print(f"Iniciando ciclo de vida de {organism.name} ({organism.organism_type})")
-        while organism.quantity > 0:
+        Con red trófica elige entre las presas vivas del depredador con probabilidad
+        proporcional a `interaction_rate`; sin interacciones en el entorno, cualquier
+        herbívoro vivo. Usa un solo número del flujo, como antes.
+        """
+        web = self.food_web
+        if web.empty:
+            return rng.choice(self.index.alive_herbivores) if self.index.alive_herbivores else None
+        organisms = self.organisms
+        candidates = []
+        total = 0.0
+        for position, rate in web.row(web.positions[organism.id]):
+            prey = organisms[position]
+            if prey.initial_energy > 0:
+                candidates.append((prey, rate))
+                total += rate
+        if not candidates:
+            return None
+        target = rng.random() * total
+        for prey, rate in candidates:
+            target -= rate
+            if target < 0:
+                return prey
+        return candidates[-1][0]
+
+    def save_state(self):
+        """Escribe el estado actual en Organisms/Environment con un único UPDATE masivo."""
+        self.profiler.enter("save_state")
+        if self.vectorized is not None:
+            self.vectorized.sync_states()
+        if self.spatial is not None:
+            self.spatial.sync_states()
+        if self.meanfield is not None:
+            self.meanfield.sync_states()
+        if self.db_session is not None:
+            write_back_states(self.db_session, self.organisms, self.environment)
+        self.profiler.exit()
+
+    def organism_lifecycle(self, organism, first_delay=None):
+        """Ciclo de vida individual de un organismo.
+
+        `first_delay` permite reanudar un checkpoint con el timeout que estaba pendiente.
+        """
+        event_logger.debug("Iniciando ciclo de vida de %s (%s)", organism.name, organism.organism_type,
+                           extra={"organism_id": organism.id, "run_id": self.run_id})
+        rng = self.streams[organism.id]
+        # Un proceso reanudado completa siempre el despertar que tenía pendiente
+        while organism.quantity > 0 or first_delay is not None:
             # Simula el paso de días
-            yield self.env.timeout(random.randint(1, 5))
-
-            if organism.organism_type == "Plant":
-                # Crecimiento basado en recursos disponibles
-                growth = self.environment.resources * 0.1 * organism.growth_rate
-                organism.initial_energy += growth
-                self.log_lifecycle_event(organism, "growth", f"{organism.name} ha crecido en {growth:.2f} energía.")
-
-            elif organism.organism_type == "Herbivore":
-                plants = [org for org in self.organisms if org.organism_type == "Plant" and org.initial_energy > 0]
-                if plants:
-                    consumed_energy = min(self.environment.resources, random.uniform(0.5, 2.0))
-                    organism.initial_energy += consumed_energy
-                    self.environment.resources -= consumed_energy
-                    self.log_lifecycle_event(organism, "consume", f"{organism.name} consumió {consumed_energy:.2f} de energía.")
-                else:
-                    self.log_lifecycle_event(organism, "energy_loss", f"{organism.name} no encontró plantas y perdió energía.")
-                    organism.reduce_energy(0.5)  # Pérdida de energía por falta de alimento
-
-            elif organism.organism_type == "Carnivore":
-                herbivores = [org for org in self.organisms if org.organism_type == "Herbivore" and org.initial_energy > 0]
-                if herbivores:
-                    prey = random.choice(herbivores)
-                    consumed_energy = min(prey.initial_energy, random.uniform(1.0, 3.0))
-                    organism.initial_energy += consumed_energy
-                    prey.initial_energy -= consumed_energy
-                    if prey.initial_energy <= 0:
-                        prey.quantity -= 1
-                        self.log_lifecycle_event(prey, "death", f"{prey.name} ha muerto.")
-                    self.log_lifecycle_event(organism, "consume", f"{organism.name} cazó y consumió {consumed_energy:.2f} de energía.")
-                else:
-                    self.log_lifecycle_event(organism, "energy_loss", f"{organism.name} no encontró presas y perdió energía.")
-                    organism.reduce_energy(1.0)  # Pérdida de energía por falta de presas
-
-            # Pérdida de energía por metabolismo
-            energy_loss = random.uniform(0.1, 1.0)
-            organism.initial_energy -= energy_loss
-            self.log_lifecycle_event(organism, "energy_loss", f"{organism.name} perdió {energy_loss:.2f} de energía.")
-
-            # Reproducción
-            if self.check_reproduction_conditions(organism):
-                offspring = self.reproduce(organism)
-                self.log_lifecycle_event(organism, "reproduction", f"{organism.name} se ha reproducido. Nuevos individuos: {offspring}")
-
-            # Muerte
-            if organism.initial_energy <= 0 or random.random() < organism.death_rate:
-                organism.quantity -= 1
-                self.environment.resources += organism.initial_energy * 0.2  # Retorna energía al ambiente
-                self.log_lifecycle_event(organism, "death", f"{organism.name} ha muerto.")
-                if organism.quantity <= 0:
-                    break
+            delay = rng.randint(1, 5) if first_delay is None else first_delay
+            first_delay = None
+            self._wake_counter += 1
+            self.pending_wakes[organism.id] = (self.env.now + delay, self._wake_counter)
+            yield self.env.timeout(delay)
+            self.step_organism(organism, rng)
+        self.pending_wakes.pop(organism.id, None)
+
+    def step_organism(self, organism, rng):
+        """Un despertar de la población: alimentación, metabolismo, reproducción y muerte.
+
+        Si la población se extingue no vuelve a despertar (lo decide quien la programa).
+        """
+        profiler = self.profiler
+        # Sin perfilado se evita hasta la llamada a los métodos vacíos de NullProfiler
+        timed = profiler.enabled
+        if organism.organism_type == "Plant":
+            if timed:
+                profiler.enter("growth")
+            # Crecimiento basado en recursos disponibles
+            growth = self.environment.resources * 0.1 * organism.growth_rate
+            self.change_energy(organism, growth)
+            self.log_lifecycle_event(organism, "growth", "%s ha crecido en %.2f energía.", organism.name, growth)
+            if timed:
+                profiler.exit()
+
+        elif organism.organism_type == "Herbivore":
+            if timed:
+                profiler.enter("grazing")
+            if self.index.alive_plants:
+                consumed_energy = min(self.environment.resources, rng.uniform(0.5, 2.0))
+                self.change_energy(organism, consumed_energy)
+                self.environment.resources -= consumed_energy
+                self.log_lifecycle_event(organism, "consume", "%s consumió %.2f de energía.", organism.name, consumed_energy)
+            else:
+                self.log_lifecycle_event(organism, "energy_loss", "%s no encontró plantas y perdió energía.", organism.name)
+                previous_energy = organism.initial_energy
+                organism.reduce_energy(0.5)  # Pérdida de energía por falta de alimento
+                self.index.energy_changed(organism, previous_energy)
+            if timed:
+                profiler.exit()
+
+        elif organism.organism_type == "Carnivore":
+            if timed:
+                profiler.enter("predation")
+            prey = self.choose_prey(organism, rng)
+            if prey is not None:
+                consumed_energy = min(prey.initial_energy, rng.uniform(1.0, 3.0))
+                self.change_energy(organism, consumed_energy)
+                self.change_energy(prey, -consumed_energy)
+                if prey.initial_energy <= 0:
+                    self.change_quantity(prey, -1)
+                    self.log_lifecycle_event(prey, "death", "%s ha muerto.", prey.name)
+                self.log_lifecycle_event(organism, "consume", "%s cazó y consumió %.2f de energía.", organism.name, consumed_energy)
+            else:
+                self.log_lifecycle_event(organism, "energy_loss", "%s no encontró presas y perdió energía.", organism.name)
+                previous_energy = organism.initial_energy
+                organism.reduce_energy(1.0)  # Pérdida de energía por falta de presas
+                self.index.energy_changed(organism, previous_energy)
+            if timed:
+                profiler.exit()
+
+        # Pérdida de energía por metabolismo
+        if timed:
+            profiler.enter("metabolism")
+        energy_loss = rng.uniform(0.1, 1.0)
+        self.change_energy(organism, -energy_loss)
+        self.log_lifecycle_event(organism, "energy_loss", "%s perdió %.2f de energía.", organism.name, energy_loss)
+        if timed:
+            profiler.exit()
+
+        # Reproducción
+        if timed:
+            profiler.enter("reproduction")
+        if self.check_reproduction_conditions(organism):
+            offspring = self.reproduce(organism)
+            self.log_lifecycle_event(organism, "reproduction", "%s se ha reproducido. Nuevos individuos: %s", organism.name, offspring)
+        if timed:
+            profiler.exit()
+
+        # Muerte
+        if timed:
+            profiler.enter("death")
+        if organism.initial_energy <= 0 or rng.random() < organism.death_rate:
+            self.change_quantity(organism, -1)
+            self.environment.resources += organism.initial_energy * 0.2  # Retorna energía al ambiente
+            self.log_lifecycle_event(organism, "death", "%s ha muerto.", organism.name)
+        if timed:
+            profiler.exit()
 
     def check_reproduction_conditions(self, organism):
         """Verifica si un organismo cumple las condiciones para reproducirse."""
@@ -94,13 +322,24 @@ class EcosystemSimulation:
     def reproduce(self, organism):
         """Realiza la reproducción del organismo y devuelve el número de nuevos individuos."""
         birth_count = int(organism.quantity * organism.birth_rate)
-        organism.quantity += birth_count
-        organism.initial_energy -= organism.reproduction_energy_threshold  # El costo energético de la reproducción
+        self.change_quantity(organism, birth_count)
+        self.change_energy(organism, -organism.reproduction_energy_threshold)  # El costo energético de la reproducción
         return birth_count
 
-    def get_current_season(self):
+    def change_energy(self, organism, amount):
+        """Suma `amount` a la energía del organismo manteniendo el índice trófico."""
+        previous_energy = organism.initial_energy
+        organism.initial_energy = previous_energy + amount
+        self.index.energy_changed(organism, previous_energy)
+
+    def change_quantity(self, organism, amount):
+        """Suma `amount` individuos a la población manteniendo los totales por tipo."""
+        organism.quantity += amount
+        self.index.quantity_changed(organism, amount)
+
+    def get_current_season(self, now=None):
         """Determina la estación actual en función del tiempo simulado."""
-        month = datetime.fromtimestamp(self.env.now).month
+        month = datetime.fromtimestamp(self.env.now if now is None else now).month
         if 3 <= month <= 5:
             return "spring"
         elif 6 <= month <= 8:
@@ -110,52 +349,307 @@ class EcosystemSimulation:
         else:
             return "winter"
 
-    def log_lifecycle_event(self, organism, event_type, message):
-        """Registra eventos importantes en la tabla Lifecycle."""
-        print(f"[{event_type.upper()}] {message}")
-        new_event = Lifecycle(
-            organism_id=organism.id,
-            event_type=event_type,
-            description=message,
-            timestamp=self.env.now,
-            quantity=organism.quantity,
-            energy=organism.initial_energy
+    def log_lifecycle_event(self, organism, event_type, template, *args):
+        """Registra eventos importantes en la tabla Lifecycle.
+
+        El mensaje (`template % args`) se arma solo si el destino guarda descripciones;
+        el log del evento lo formatea el hilo de logging, y solo si está habilitado.
+        """
+        profiler = self.profiler
+        if profiler.enabled:
+            profiler.enter("event_logging")
+            profiler.count_events(event_type)
+        if event_logger.isEnabledFor(logging.DEBUG):
+            event_logger.debug(template, *args, extra={
+                "event_type": event_type, "organism_id": organism.id, "sim_time": self.env.now, "run_id": self.run_id
+            })
+        self.events_logged += 1
+        self.event_sink.record(
+            organism.id,
+            event_type,
+            template % args if self.describe_events else None,
+            self.env.now,
+            organism.quantity,
+            organism.initial_energy
         )
-        self.db_session.add(new_event)
-        self.db_session.commit()
-
-    def run(self, simulation_time):
-        """Inicia la simulación de manera asíncrona y registra la historia de la población periódicamente."""
-        print("Iniciando simulación...")
-        for organism in self.organisms:
-            self.env.process(self.organism_lifecycle(organism))
-        while self.env.now < simulation_time:
-            # Pausa asíncrona para permitir que otras tareas se ejecuten
-            asyncio.sleep(0.1)  # Pausa para no bloquear el bucle de eventos
-            self.env.run(until=self.env.now + 1)  # Avanzamos la simulación 1 unidad de tiempo
-            self.update_population_history()
+        if profiler.enabled:
+            profiler.exit()
 
-    def update_population_history(self):
-        """Actualiza la historia de la población."""
-        print("Actualizando historia de la población...")
+    def record_events(self, batches):
+        """Registra lotes de filas de Lifecycle generadas por el motor vectorizado."""
+        self.profiler.enter("event_logging")
+        for rows in batches:
+            self.events_logged += len(rows)
+            self.event_sink.record_many(rows)
+        self.profiler.exit()
+
+    def run(self, simulation_time, checkpoint_every=None, checkpoint_path=None):
+        """Inicia la simulación de manera asíncrona y registra la historia de la población periódicamente.
+
+        Con `checkpoint_every` se guarda un checkpoint en `checkpoint_path` cada N días
+        simulados (debe ser múltiplo de `sample_every`: los checkpoints se toman con las
+        muestras). Devuelve un resumen con el número de eventos y el throughput (eventos/segundo).
+        """
+        if checkpoint_every and not checkpoint_path:
+            raise ValueError("checkpoint_every requiere checkpoint_path")
+        if checkpoint_every and (self.engine in NO_CHECKPOINT_ENGINES or self.age_bins):
+            raise ValueError("Los motores spatial y meanfield y las cohortes por edad no admiten checkpoints")
+        if checkpoint_every and checkpoint_every % self.sample_every:
+            raise ValueError("checkpoint_every debe ser múltiplo de sample_every")
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_path = checkpoint_path
+        self.profiler.start(self.db_session)
+        self.profiler.enter("setup")
+        self.refresh_food_web()
+        if self.db_session is not None:
+            # La corrida queda registrada con su semilla para poder repetirla (POST /runs/{id}/replay)
+            self.run_id = start_run(self.db_session, self, simulation_time)
+            self.event_sink.run_id = self.run_id
+            self.history = HistoryRecorder(self.db_session, self.environment_id, self.run_id)
+        self.profiler.exit()
+        logger.info("Iniciando simulación del entorno %s hasta el día %s", self.environment_id, simulation_time,
+                    extra={"run_id": self.run_id, "environment_id": self.environment_id, "engine": self.engine})
+        started = time.perf_counter()
         try:
-            plant_count = sum(org.quantity for org in self.organisms if org.organism_type == "Plant")
-            herbivore_count = sum(org.quantity for org in self.organisms if org.organism_type == "Herbivore")
-            predator_count = sum(org.quantity for org in self.organisms if org.organism_type == "Carnivore")
-            timestamp = datetime.fromtimestamp(self.env.now)
-
-            new_history = PopulationHistory(
-                environment_id=self.environment_id,
-                timestamp=timestamp,
-                plant_population=plant_count,
-                herbivore_population=herbivore_count,
-                predator_population=predator_count
+            if self.engine == "vectorized":
+                self.run_vectorized(simulation_time)
+            elif self.engine == "spatial":
+                self.run_spatial(simulation_time)
+            elif self.engine == "meanfield":
+                self.run_meanfield(simulation_time)
+            elif self.time_advance == "fixed":
+                self.advance_fixed_step(FixedStepScheduler(self), simulation_time)
+            else:
+                self.run_discrete(simulation_time)
+            # La simulación trabaja sobre registros en memoria: el estado final se guarda una vez
+            self.save_state()
+            digest = state_digest(self.organisms, self.environment, self.trajectory, self.env.now)
+        except Exception as error:
+            if self.db_session is not None:
+                self.db_session.rollback()
+                if self.run_id is not None:
+                    status = "cancelled" if isinstance(error, SimulationCancelled) else "failed"
+                    finish_run(self.db_session, self.run_id, status)
+            raise
+        finally:
+            # Volcado final garantizado, incluso si la simulación falla
+            self.profiler.enter("flush")
+            self.event_sink.close()
+            if self.spatial is not None:
+                self.spatial.close()
+            if self.history is not None:
+                self.history.close()
+            self.profiler.exit()
+            self.profiler.stop()
+        if self.run_id is not None:
+            finish_run(self.db_session, self.run_id, "completed", digest, self.events_logged)
+        elapsed = time.perf_counter() - started
+        plant_count, herbivore_count, predator_count = self.population_counts()
+        logger.info("Simulación terminada: %s eventos en %.3f s", self.events_logged, elapsed,
+                    extra={"run_id": self.run_id, "environment_id": self.environment_id, "sim_time": self.env.now})
+        return {
+            "run_id": self.run_id,
+            "engine": self.engine,
+            "seed": self.seed,
+            "time_advance": self.time_advance if self.engine == "simpy" else "fixed",
+            "sample_every": self.sample_every,
+            "age_bins": self.age_bins,
+            "hybrid_threshold": self.hybrid_threshold,
+            "digest": digest,
+            "simulation_time": self.env.now,
+            "population": {
+                "plant": plant_count,
+                "herbivore": herbivore_count,
+                "predator": predator_count,
+            },
+            "events": self.events_logged,
+            "elapsed_seconds": round(elapsed, 6),
+            "events_per_second": round(self.events_logged / elapsed, 2) if elapsed > 0 else None,
+            "event_sink": self.event_sink.stats(),
+            "history": self.history.stats() if self.history is not None else None,
+            "checkpoints": dict(self.checkpoint_stats, write_seconds=round(self.checkpoint_stats["write_seconds"], 6)),
+            "profile": self.profiler.summary(),
+            "meanfield": self.meanfield.stats() if self.meanfield is not None else None,
+        }
+
+    def start_processes(self):
+        """Lanza un proceso SimPy por población (o reanuda los pendientes del checkpoint)."""
+        if self.restored_snapshot is None:
+            for organism in self.organisms:
+                self.env.process(self.organism_lifecycle(organism))
+            return
+        # Se respeta el orden original para que los despertares simultáneos no cambien
+        by_id = {organism.id: organism for organism in self.organisms}
+        pending = sorted(self.pending_wakes.items(), key=lambda item: item[1][1])
+        self.pending_wakes = {}
+        for organism_id, (wake_time, _) in pending:
+            self.env.process(self.organism_lifecycle(by_id[organism_id], first_delay=wake_time - self.env.now))
+
+    def run_discrete(self, simulation_time):
+        """Avanza el motor simpy con una sola entrada al planificador.
+
+        Las muestras las toma `sampling_process`; la última (en `simulation_time`) se
+        toma al volver, porque la corrida se detiene antes que los despertares de ese día.
+        """
+        if self.env.now >= simulation_time:
+            return
+        stop = UrgentTimeout(self.env, simulation_time - self.env.now)
+        self.start_processes()
+        self.env.process(self.sampling_process(simulation_time))
+        self.profiler.enter("scheduling")
+        self.env.run(until=stop)
+        self.profiler.exit()
+        self.end_of_day()
+
+    def sampling_process(self, simulation_time):
+        """Proceso SimPy que toma una muestra cada `sample_every` días, antes de `simulation_time`."""
+        while self.env.now + self.sample_every < simulation_time:
+            # Prioridad urgente: la muestra del día t se toma antes de los despertares de t
+            yield UrgentTimeout(self.env, self.sample_every)
+            self.end_of_day()
+
+    def advance_fixed_step(self, engine, simulation_time):
+        """Avanza un motor de paso fijo (`engine.advance`) de una muestra a la siguiente."""
+        while self.env.now < simulation_time:
+            until = min(self.env.now + self.sample_every, simulation_time)
+            self.profiler.enter("scheduling")
+            engine.advance(until)
+            self.env.run(until=until)  # Solo avanza el reloj; no hay procesos SimPy
+            self.profiler.exit()
+            self.end_of_day()
+
+    def end_of_day(self):
+        """Tareas de cada muestra (por defecto, cada día simulado): historia, checkpoint y callbacks."""
+        self.trajectory.append(self.population_counts())
+        self.sample_times.append(self.env.now)
+        self.profiler.enter("history")
+        self.update_population_history()
+        self.profiler.exit()
+        if self.checkpoint_every and self.env.now % self.checkpoint_every == 0:
+            self.profiler.enter("checkpoint")
+            self.write_checkpoint(self.checkpoint_path)
+            self.profiler.exit()
+        self.profiler.enter("callbacks")
+        self.notify_day()
+        self.profiler.exit()
+
+    def capture_snapshot(self):
+        """Copia el estado completo de la simulación (reloj, poblaciones, recursos y flujos aleatorios)."""
+        if self.engine in NO_CHECKPOINT_ENGINES or self.age_bins:
+            raise ValueError("Los motores spatial y meanfield y las cohortes por edad no admiten checkpoints")
+        if self.vectorized is not None:
+            engine = self.vectorized
+            next_wake = np.where(engine.active, engine.next_wake, np.nan)
+            return SimulationSnapshot(
+                "vectorized", self.env.now, engine.resources, self.seed, engine.ids, engine.energy,
+                engine.quantity, next_wake, np.arange(engine.ids.size), engine.draws
             )
+        next_wake = [self.pending_wakes.get(org.id, (math.nan, -1)) for org in self.organisms]
+        return SimulationSnapshot(
+            "simpy", self.env.now, self.environment.resources, self.seed,
+            [org.id for org in self.organisms],
+            [org.initial_energy for org in self.organisms],
+            [org.quantity for org in self.organisms],
+            [wake for wake, _ in next_wake],
+            [order for _, order in next_wake],
+            [self.streams[org.id].draws for org in self.organisms]
+        )
 
-            self.db_session.add(new_history)
-            self.db_session.commit()
-            print(f"Historia actualizada: Plantas={plant_count}, Herbívoros={herbivore_count}, Depredadores={predator_count}")
-        except Exception as e:
-            self.db_session.rollback()
-            print(f"Error al actualizar historia: {e}")
-            raise
+    def write_checkpoint(self, path):
+        """Guarda un checkpoint en `path` y acumula su tamaño y tiempo de escritura."""
+        # Los eventos y el estado de las poblaciones quedan persistidos antes de guardarlo
+        self.event_sink.flush()
+        if self.history is not None:
+            self.history.flush()
+        self.save_state()
+        size, seconds = write_snapshot(path, self.capture_snapshot())
+        self.checkpoint_stats["written"] += 1
+        self.checkpoint_stats["size_bytes"] = size
+        self.checkpoint_stats["write_seconds"] += seconds
+        return size, seconds
+
+    def restore(self, snapshot):
+        """Carga un checkpoint: el próximo `run()` continúa exactamente desde ese instante."""
+        if snapshot.engine != self.engine:
+            raise ValueError(f"El checkpoint es del motor {snapshot.engine}, no de {self.engine}")
+        if snapshot.seed != self.seed:
+            raise ValueError("La semilla de la simulación no coincide con la del checkpoint")
+        by_id = {organism.id: organism for organism in self.organisms}
+        if set(by_id) != set(snapshot.ids.tolist()):
+            raise ValueError("Los organismos del entorno no coinciden con los del checkpoint")
+        self.env = simpy.Environment(initial_time=snapshot.now)
+        self.environment.resources = snapshot.resources
+        self.pending_wakes = {}
+        for i, organism_id in enumerate(snapshot.ids.tolist()):
+            organism = by_id[organism_id]
+            organism.initial_energy = float(snapshot.energy[i])
+            organism.quantity = int(snapshot.quantity[i])
+            self.streams[organism_id].draws = int(snapshot.draws[i])
+            if not math.isnan(snapshot.next_wake[i]):
+                self.pending_wakes[organism_id] = (float(snapshot.next_wake[i]), int(snapshot.wake_order[i]))
+        self._wake_counter = int(snapshot.wake_order.max(initial=0))
+        self.index = TrophicIndex(self.organisms)
+        self.restored_snapshot = snapshot
+
+    def run_vectorized(self, simulation_time):
+        """Avanza la simulación con el motor NumPy."""
+        self.vectorized = VectorizedEngine(self)
+        if self.restored_snapshot is not None:
+            self.vectorized.restore(self.restored_snapshot)
+        self.advance_fixed_step(self.vectorized, simulation_time)
+        self.vectorized.sync_states()
+        self.index = TrophicIndex(self.organisms)
+
+    def run_spatial(self, simulation_time):
+        """Avanza la simulación sobre la grilla de celdas del entorno."""
+        self.spatial = SpatialEngine(self, self.cell_area, self.spatial_workers)
+        self.spatial.horizon = simulation_time
+        self.advance_fixed_step(self.spatial, simulation_time)
+        self.spatial.sync_states()
+        self.index = TrophicIndex(self.organisms)
+
+    def run_meanfield(self, simulation_time):
+        """Integra el sistema de campo medio (y sigue con el motor vectorizado si es híbrido)."""
+        self.meanfield = MeanFieldEngine(self, self.hybrid_threshold)
+        self.advance_fixed_step(self.meanfield, simulation_time)
+        self.meanfield.sync_states()
+        self.index = TrophicIndex(self.organisms)
+
+    def population_snapshot(self):
+        """Instantánea del día actual: poblaciones por tipo y recursos del entorno."""
+        plant_count, herbivore_count, predator_count = self.population_counts()
+        resources = self.environment.resources
+        for engine in (self.vectorized, self.spatial, self.meanfield):
+            if engine is not None:
+                resources = engine.resources
+        return {
+            "sim_time": self.env.now,
+            "plant": plant_count,
+            "herbivore": herbivore_count,
+            "predator": predator_count,
+            "resources": resources,
+        }
+
+    def notify_day(self):
+        """Avisa a los callbacks diarios (progreso, cancelación, streaming)."""
+        for callback in self.day_callbacks:
+            callback(self)
+
+    def population_counts(self):
+        """Devuelve (plantas, herbívoros, depredadores) del estado actual."""
+        if self.vectorized is not None:
+            return self.vectorized.population_counts()
+        if self.spatial is not None:
+            return self.spatial.population_counts()
+        if self.meanfield is not None:
+            return self.meanfield.population_counts()
+        return self.index.population_counts()
+
+    def update_population_history(self):
+        """Agrega el punto del día a la historia de la población (se escribe en bloque)."""
+        if self.history is None:
+            return
+        plant_count, herbivore_count, predator_count = self.population_counts()
+        self.history.record(self.env.now, plant_count, herbivore_count, predator_count)
+        logger.debug("Historia actualizada: Plantas=%s, Herbívoros=%s, Depredadores=%s",
+                     plant_count, herbivore_count, predator_count, extra={"run_id": self.run_id, "sim_time": self.env.now})
@@ -0,0 +1,198 @@
+import io
+import csv
+import time
+from .models import Lifecycle
+
+# Columnas de la tabla lifecycle en el orden en que se guardan en el buffer
+LIFECYCLE_COLUMNS = ("organism_id", "event_type", "description", "timestamp", "quantity", "energy")
+
+
+class LifecycleEventSink:
+    """Destino de los eventos del ciclo de vida generados por la simulación."""
+
+    # Si es False el destino descarta las filas y basta con contarlas
+    keeps_events = True
+    # Si es False el destino no guarda la descripción y no hace falta formatearla
+    keeps_descriptions = True
+
+    def __init__(self):
+        # Corrida a la que pertenecen los eventos (la asigna la simulación al empezar)
+        self.run_id = None
+        self.events_written = 0
+        self.flush_count = 0
+        self.write_seconds = 0.0
+
+    def record(self, organism_id, event_type, description, timestamp, quantity, energy):
+        """Recibe un evento. Cada implementación decide cuándo persistirlo."""
+        raise NotImplementedError
+
+    def record_many(self, rows):
+        """Recibe un lote de filas con el orden de LIFECYCLE_COLUMNS."""
+        for row in rows:
+            self.record(*row)
+
+    def flush(self):
+        """Persiste los eventos pendientes (si los hay)."""
+
+    def close(self):
+        """Cierra el destino garantizando que no queden eventos pendientes."""
+        self.flush()
+
+    def stats(self):
+        """Devuelve contadores de escritura y el throughput en eventos/segundo."""
+        events_per_second = self.events_written / self.write_seconds if self.write_seconds > 0 else None
+        return {
+            "sink": type(self).__name__,
+            "events_written": self.events_written,
+            "flushes": self.flush_count,
+            "write_seconds": round(self.write_seconds, 6),
+            "events_per_second": round(events_per_second, 2) if events_per_second else None,
+        }
+
+
+class NullLifecycleSink(LifecycleEventSink):
+    """Descarta los eventos; útil cuando solo interesa la dinámica de la población."""
+
+    keeps_events = False
+
+    def record(self, organism_id, event_type, description, timestamp, quantity, energy):
+        self.events_written += 1
+
+    def record_many(self, rows):
+        self.events_written += len(rows)
+
+
+class DirectLifecycleSink(LifecycleEventSink):
+    """Comportamiento original: un INSERT y un commit por cada evento."""
+
+    def __init__(self, db_session):
+        super().__init__()
+        self.db_session = db_session
+
+    def record(self, organism_id, event_type, description, timestamp, quantity, energy):
+        start = time.perf_counter()
+        self.db_session.add(Lifecycle(
+            run_id=self.run_id,
+            organism_id=organism_id,
+            event_type=event_type,
+            description=description,
+            timestamp=timestamp,
+            quantity=quantity,
+            energy=energy
+        ))
+        self.db_session.commit()
+        self.write_seconds += time.perf_counter() - start
+        self.events_written += 1
+        self.flush_count += 1
+
+
+class BufferedLifecycleSink(LifecycleEventSink):
+    """Acumula eventos en un buffer de tamaño fijo y los escribe en bloque.
+
+    El buffer se vacía cuando se llena (`capacity`), cuando el tiempo simulado
+    avanza `flush_interval` unidades desde el último volcado, o al cerrar el destino.
+    En Postgres (psycopg2) se usa COPY; en el resto de motores un executemany.
+    """
+
+    def __init__(self, db_session, capacity=5000, flush_interval=None):
+        super().__init__()
+        if capacity < 1:
+            raise ValueError("capacity debe ser mayor que 0")
+        self.db_session = db_session
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._buffer = [None] * capacity
+        self._size = 0
+        self._last_flush_time = None
+
+    def record(self, organism_id, event_type, description, timestamp, quantity, energy):
+        self._buffer[self._size] = (organism_id, event_type, description, timestamp, quantity, energy)
+        self._size += 1
+        if self._last_flush_time is None:
+            self._last_flush_time = timestamp
+        if self._size >= self.capacity:
+            self.flush()
+        elif self.flush_interval is not None and timestamp - self._last_flush_time >= self.flush_interval:
+            self.flush()
+
+    def record_many(self, rows):
+        start = 0
+        while start < len(rows):
+            # Copia por tramos hasta llenar el buffer
+            chunk = rows[start:start + self.capacity - self._size]
+            self._buffer[self._size:self._size + len(chunk)] = chunk
+            self._size += len(chunk)
+            start += len(chunk)
+            if self._last_flush_time is None:
+                self._last_flush_time = chunk[0][3]
+            if self._size >= self.capacity:
+                self.flush()
+            elif self.flush_interval is not None and chunk[-1][3] - self._last_flush_time >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        if self._size == 0:
+            return
+        rows = self._buffer[:self._size]
+        start = time.perf_counter()
+        try:
+            if self._supports_copy():
+                self._copy_rows(rows)
+            else:
+                self.db_session.execute(
+                    Lifecycle.__table__.insert(),
+                    [dict(zip(LIFECYCLE_COLUMNS, row), run_id=self.run_id) for row in rows]
+                )
+            self.db_session.commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+        self.write_seconds += time.perf_counter() - start
+        self.events_written += len(rows)
+        self.flush_count += 1
+        self._last_flush_time = rows[-1][3]
+        self._buffer[:self._size] = [None] * self._size
+        self._size = 0
+
+    def _supports_copy(self):
+        bind = self.db_session.get_bind()
+        return bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+
+    def _copy_rows(self, rows):
+        """Envía las filas con COPY ... FROM STDIN (solo psycopg2)."""
+        data = io.StringIO()
+        csv.writer(data).writerows(row + (self.run_id,) for row in rows)
+        data.seek(0)
+        cursor = self.db_session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {Lifecycle.__tablename__} ({', '.join(LIFECYCLE_COLUMNS)}, run_id) FROM STDIN WITH (FORMAT csv)",
+                data
+            )
+        finally:
+            cursor.close()
+
+
+EVENT_SINKS = {
+    "buffered": BufferedLifecycleSink,
+    "direct": DirectLifecycleSink,
+}
+
+
+def make_event_sink(kind, db_session, **options):
+    """Construye un destino de eventos a partir de su nombre.
+
+    "buffered", "direct" o "null"; "parquet" y "arrow" escriben en el archivo `path`
+    (ver columnar.py).
+    """
+    if kind == "null":
+        return NullLifecycleSink()
+    if kind in ("parquet", "arrow"):
+        # Import diferido: columnar.py depende de este módulo y de pyarrow (opcional)
+        from .columnar import ColumnarLifecycleSink
+        if "path" not in options:
+            raise ValueError(f"El destino {kind} requiere la ruta del archivo")
+        return ColumnarLifecycleSink(file_format=kind, **options)
+    if kind not in EVENT_SINKS:
+        raise ValueError(f"Destino de eventos desconocido: {kind}")
+    return EVENT_SINKS[kind](db_session, **options)
@@ -0,0 +1,99 @@
+"""Red trófica de un entorno compilada a partir de la tabla Interactions.
+
+Cada interacción de depredación (`predator_id` come a `prey_id` con `interaction_rate`)
+es una arista. La red se guarda como CSR: `indptr[i]:indptr[i + 1]` son las posiciones
+en `prey`/`rate` de las presas de la población `i` (posiciones en la lista de
+organismos de la simulación). Así un depredador recorre solo sus presas y el costo de
+la caza depende del grado de la red, no del tamaño del padrón.
+
+Si el entorno no tiene interacciones la red queda vacía y la simulación usa la regla
+de siempre: un carnívoro caza cualquier herbívoro vivo.
+"""
+import numpy as np
+from sqlalchemy import select
+from .models import Interactions, Organisms
+
+# interaction_type de las filas que son depredación (la API guarda "Depredacion")
+PREDATION_TYPES = ("Depredacion", "Depredación", "Predation")
+
+
+def load_interactions(db_session, environment_id, after_id=0):
+    """Interacciones de depredación cuyo depredador es del entorno, con id mayor que `after_id`.
+
+    Devuelve tuplas (id, predator_id, prey_id, interaction_rate) ordenadas por id.
+    """
+    rows = db_session.execute(
+        select(Interactions.id, Interactions.predator_id, Interactions.prey_id, Interactions.interaction_rate)
+        .join(Organisms, Organisms.id == Interactions.predator_id)
+        .where(Organisms.environment_id == environment_id, Interactions.interaction_type.in_(PREDATION_TYPES),
+               Interactions.id > after_id)
+        .order_by(Interactions.id)
+    )
+    return [tuple(row) for row in rows]
+
+
+class FoodWeb:
+    """Presas y tasas de cada población en arreglos CSR; se amplía con `add`."""
+
+    def __init__(self, organism_ids, interactions=()):
+        self.ids = np.array(organism_ids, dtype=np.int64)
+        self.positions = {organism_id: i for i, organism_id in enumerate(self.ids.tolist())}
+        self.indptr = np.zeros(len(self.positions) + 1, dtype=np.int64)
+        self.prey = np.zeros(0, dtype=np.int64)
+        self.rate = np.zeros(0, dtype=np.float64)
+        # Id de la última interacción incorporada: las siguientes se leen desde ahí
+        self.last_interaction_id = 0
+        self._rows = {}
+        self.add(interactions)
+
+    @property
+    def empty(self):
+        return self.prey.size == 0
+
+    def add(self, interactions):
+        """Incorpora aristas (id, predator_id, prey_id, rate) sin recompilar la red.
+
+        Cada arista nueva se inserta al final de la fila de su depredador; las aristas
+        con organismos de otro entorno o con tasa 0 se ignoran. Devuelve cuántas se
+        agregaron.
+        """
+        edges = []
+        for interaction_id, predator_id, prey_id, rate in interactions:
+            self.last_interaction_id = max(self.last_interaction_id, interaction_id or 0)
+            predator, prey = self.positions.get(predator_id), self.positions.get(prey_id)
+            # Una arista con tasa 0 nunca se elegiría
+            if predator is not None and prey is not None and rate > 0:
+                edges.append((predator, prey, rate))
+        if not edges:
+            return 0
+        edges.sort(key=lambda edge: edge[0])
+        predators, prey, rate = (np.array(column) for column in zip(*edges))
+        where = self.indptr[predators + 1]
+        self.prey = np.insert(self.prey, where, prey.astype(np.int64))
+        self.rate = np.insert(self.rate, where, rate.astype(np.float64))
+        self.indptr[1:] += np.cumsum(np.bincount(predators, minlength=len(self.positions)))
+        # Solo cambian las filas de los depredadores con aristas nuevas
+        for predator in set(predators.tolist()):
+            self._rows.pop(predator, None)
+        return len(edges)
+
+    def row(self, i):
+        """Presas de la población `i` como lista de (posición, tasa) (se arma una vez por fila)."""
+        row = self._rows.get(i)
+        if row is None:
+            start, stop = self.indptr[i], self.indptr[i + 1]
+            row = self._rows[i] = list(zip(self.prey[start:stop].tolist(), self.rate[start:stop].tolist()))
+        return row
+
+    def degree(self, i):
+        return int(self.indptr[i + 1] - self.indptr[i])
+
+    def prey_lists(self):
+        """Posiciones de las presas de cada población (sin tasas)."""
+        return [self.prey[self.indptr[i]:self.indptr[i + 1]].tolist() for i in range(len(self.positions))]
+
+    def to_list(self):
+        """Aristas como [predator_id, prey_id, rate], para guardarlas con la corrida."""
+        predators = np.repeat(self.ids, np.diff(self.indptr))
+        return [[int(predator), int(prey), float(rate)]
+                for predator, prey, rate in zip(predators, self.ids[self.prey], self.rate)]
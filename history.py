@@ -0,0 +1,166 @@
+import time
+from datetime import datetime
+from sqlalchemy import select
+from .models import PopulationHistory, PopulationRollup
+
+# Resoluciones (en días) de los resúmenes que se guardan además de los puntos diarios
+ROLLUP_RESOLUTIONS = (10, 100)
+# Puntos diarios que se acumulan antes de escribir en bloque
+HISTORY_CAPACITY = 1000
+# Puntos que devuelve por defecto una consulta de historia
+DEFAULT_MAX_POINTS = 500
+POPULATION_KEYS = ("plant", "herbivore", "predator")
+
+
+class RollupBucket:
+    """Mínimo, máximo y suma por tipo de los días de un intervalo."""
+
+    __slots__ = ("start", "points", "minimum", "maximum", "total")
+
+    def __init__(self, start):
+        self.start = start
+        self.points = 0
+        self.minimum = [None, None, None]
+        self.maximum = [None, None, None]
+        self.total = [0, 0, 0]
+
+    def add(self, counts):
+        for i, count in enumerate(counts):
+            if self.points == 0 or count < self.minimum[i]:
+                self.minimum[i] = count
+            if self.points == 0 or count > self.maximum[i]:
+                self.maximum[i] = count
+            self.total[i] += count
+        self.points += 1
+
+    def to_row(self, run_id, resolution):
+        row = {"run_id": run_id, "resolution": resolution, "bucket_start": self.start, "points": self.points}
+        for i, key in enumerate(POPULATION_KEYS):
+            row[f"{key}_min"] = self.minimum[i]
+            row[f"{key}_max"] = self.maximum[i]
+            row[f"{key}_mean"] = self.total[i] / self.points
+        return row
+
+
+class HistoryRecorder:
+    """Acumula la población diaria de una corrida y la escribe en bloque.
+
+    Además de los puntos diarios (PopulationHistory) mantiene un intervalo abierto por
+    resolución; cuando un día cae fuera del intervalo, éste se cierra como fila de
+    PopulationRollup. Los puntos y los resúmenes pendientes se escriben cuando se
+    llena el buffer (`capacity`), en cada checkpoint y al cerrar.
+    """
+
+    def __init__(self, db_session, environment_id, run_id, capacity=HISTORY_CAPACITY,
+                 resolutions=ROLLUP_RESOLUTIONS):
+        if capacity < 1:
+            raise ValueError("capacity debe ser mayor que 0")
+        self.db_session = db_session
+        self.environment_id = environment_id
+        self.run_id = run_id
+        self.capacity = capacity
+        self.resolutions = tuple(resolutions)
+        self._points = []
+        self._rollups = []
+        self._buckets = dict.fromkeys(self.resolutions)
+        self.points_written = 0
+        self.rollups_written = 0
+        self.flush_count = 0
+        self.write_seconds = 0.0
+
+    def record(self, sim_time, plant, herbivore, predator):
+        """Agrega el punto de un día simulado."""
+        self._points.append({
+            "environment_id": self.environment_id,
+            "run_id": self.run_id,
+            "sim_time": sim_time,
+            "timestamp": datetime.fromtimestamp(sim_time),
+            "plant_population": plant,
+            "herbivore_population": herbivore,
+            "predator_population": predator,
+        })
+        counts = (plant, herbivore, predator)
+        for resolution in self.resolutions:
+            start = sim_time // resolution * resolution
+            bucket = self._buckets[resolution]
+            if bucket is None or bucket.start != start:
+                if bucket is not None:
+                    self._rollups.append(bucket.to_row(self.run_id, resolution))
+                bucket = self._buckets[resolution] = RollupBucket(start)
+            bucket.add(counts)
+        if len(self._points) >= self.capacity:
+            self.flush()
+
+    def flush(self):
+        """Escribe los puntos y los intervalos cerrados pendientes en una transacción."""
+        if not self._points and not self._rollups:
+            return
+        start = time.perf_counter()
+        try:
+            if self._points:
+                self.db_session.execute(PopulationHistory.__table__.insert(), self._points)
+            if self._rollups:
+                self.db_session.execute(PopulationRollup.__table__.insert(), self._rollups)
+            self.db_session.commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+        self.write_seconds += time.perf_counter() - start
+        self.points_written += len(self._points)
+        self.rollups_written += len(self._rollups)
+        self.flush_count += 1
+        self._points = []
+        self._rollups = []
+
+    def close(self):
+        """Cierra los intervalos abiertos (aunque estén incompletos) y escribe todo."""
+        for resolution, bucket in self._buckets.items():
+            if bucket is not None:
+                self._rollups.append(bucket.to_row(self.run_id, resolution))
+                self._buckets[resolution] = None
+        self.flush()
+
+    def stats(self):
+        return {
+            "points_written": self.points_written,
+            "rollups_written": self.rollups_written,
+            "flushes": self.flush_count,
+            "write_seconds": round(self.write_seconds, 6),
+        }
+
+
+def choose_resolution(start, end, max_points, resolutions=ROLLUP_RESOLUTIONS):
+    """Resolución más fina (1 = puntos diarios) que entrega como mucho `max_points` puntos."""
+    days = max(end - start + 1, 1)
+    for resolution in (1,) + tuple(sorted(resolutions)):
+        if days / resolution <= max_points:
+            return resolution
+    return max(resolutions)
+
+
+def query_history(db_session, run_id, start, end, resolution):
+    """Puntos de la historia de una corrida entre los días `start` y `end` a una resolución."""
+    if resolution == 1:
+        table = PopulationHistory.__table__
+        rows = db_session.execute(
+            select(table.c.sim_time, table.c.plant_population, table.c.herbivore_population,
+                   table.c.predator_population)
+            .where(table.c.run_id == run_id, table.c.sim_time >= start, table.c.sim_time <= end)
+            .order_by(table.c.sim_time)
+        )
+        return [
+            {"sim_time": sim_time, "plant": plant, "herbivore": herbivore, "predator": predator}
+            for sim_time, plant, herbivore, predator in rows
+        ]
+    table = PopulationRollup.__table__
+    columns = [table.c.bucket_start, table.c.points] + [
+        table.c[f"{key}_{stat}"] for key in POPULATION_KEYS for stat in ("min", "max", "mean")
+    ]
+    # Se incluyen los intervalos que se solapan con el rango pedido
+    rows = db_session.execute(
+        select(*columns)
+        .where(table.c.run_id == run_id, table.c.resolution == resolution,
+               table.c.bucket_start > start - resolution, table.c.bucket_start <= end)
+        .order_by(table.c.bucket_start)
+    ).mappings()
+    return [dict(row) for row in rows]
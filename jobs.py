@@ -0,0 +1,338 @@
+import os
+import time
+import uuid
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from . import database
+from .ecosystem_simulation import EcosystemSimulation, SimulationCancelled
+from .event_sink import make_event_sink
+from .streaming import QueuePublisher, pump_updates, streams
+from .checkpoint import checkpoint_path
+from .columnar import COLUMNAR_FORMATS, ColumnarPopulationWriter, output_path
+from .profiler import simulation_metrics
+from .logs import configure_logging
+from .result_cache import result_cache, run_cached
+from .read_cache import read_cache
+
+# Procesos de simulación en paralelo (por defecto uno por núcleo)
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", os.cpu_count() or 1))
+# Cada cuántos segundos (reales) un worker publica su progreso y revisa si lo cancelaron
+PROGRESS_INTERVAL = 0.1
+# Segundos que se conserva un trabajo terminado (con su resultado) y cuántos como máximo
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", 3600))
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", 1000))
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+
+# Fábrica de sesiones de cada proceso worker (se crea en _init_worker)
+_worker_sessions = None
+
+
+def _init_worker(database_url):
+    """Prepara la conexión a la base de datos en un proceso worker recién creado."""
+    global _worker_sessions
+    # El hilo de logging del proceso padre no existe en el worker
+    configure_logging()
+    if database_url:
+        _worker_sessions = sessionmaker(autocommit=False, autoflush=False, bind=create_engine(database_url))
+    else:
+        # Las conexiones heredadas del proceso padre no se pueden reutilizar
+        database.simulation_engine.dispose(close=False)
+        _worker_sessions = database.SimulationSessionLocal
+
+
+def run_simulation_job(job_id, environment_id, simulation_time, options, progress, cancel_requests, updates):
+    """Ejecuta una simulación dentro de un proceso worker y devuelve su resumen."""
+    progress[job_id] = {"status": "running", "sim_time": 0, "started_at": time.time()}
+    db = _worker_sessions()
+    publisher = QueuePublisher(updates, job_id)
+    last_report = [0.0]
+
+    def report_progress(simulation):
+        now = time.monotonic()
+        if now - last_report[0] < PROGRESS_INTERVAL and simulation.env.now < simulation_time:
+            return
+        last_report[0] = now
+        progress[job_id] = dict(progress[job_id], sim_time=simulation.env.now)
+        if job_id in cancel_requests:
+            raise SimulationCancelled(job_id)
+
+    population_writer = None
+    try:
+        kind = options.get("event_sink", "buffered")
+        if kind in COLUMNAR_FORMATS:
+            # Eventos y población diaria van a archivos del trabajo en lugar de la base
+            sink = make_event_sink(kind, db, path=output_path(f"job_{job_id}", "lifecycle", kind))
+            population_writer = ColumnarPopulationWriter(output_path(f"job_{job_id}", "population", kind), kind)
+        else:
+            sink = make_event_sink(kind, db)
+        checkpoint_every = options.get("checkpoint_every")
+        path = checkpoint_path(environment_id)
+        if options.get("resume"):
+            simulation = EcosystemSimulation.from_checkpoint(db, environment_id, path, event_sink=sink,
+                                                             profile=options.get("profile", False))
+        else:
+            simulation = EcosystemSimulation(
+                db, environment_id, event_sink=sink,
+                engine=options.get("engine", "simpy"), seed=options.get("seed"),
+                profile=options.get("profile", False), cell_area=options.get("cell_area"),
+                time_advance=options.get("time_advance", "discrete"), sample_every=options.get("sample_every", 1),
+                age_bins=options.get("age_bins"), hybrid_threshold=options.get("hybrid_threshold")
+            )
+        simulation.day_callbacks.append(publisher)
+        simulation.day_callbacks.append(report_progress)
+        if population_writer is not None:
+            simulation.day_callbacks.append(population_writer)
+        try:
+            if checkpoint_every:
+                summary = simulation.run(simulation_time, checkpoint_every=checkpoint_every, checkpoint_path=path)
+            else:
+                summary = run_cached(simulation, simulation_time, result_cache, cacheable=cacheable(options))
+        except SimulationCancelled:
+            progress[job_id] = dict(progress[job_id], status="cancelled", sim_time=simulation.env.now)
+            return None
+        progress[job_id] = dict(progress[job_id], status="completed", sim_time=simulation.env.now)
+        if population_writer is not None:
+            summary["population_output"] = population_writer.writer.path
+        return summary
+    finally:
+        if population_writer is not None:
+            population_writer.close()
+        publisher.close()
+        db.close()
+
+
+def cacheable(options):
+    """Si el resultado del trabajo puede leerse de (y guardarse en) la caché de resultados.
+
+    Solo las corridas con semilla explícita se repiten igual; las perfiladas, las
+    reanudadas y las que escriben archivos columnares tienen efectos que la caché no guarda.
+    """
+    return (options.get("seed") is not None and not options.get("profile") and not options.get("resume")
+            and not options.get("checkpoint_every") and options.get("event_sink", "buffered") not in COLUMNAR_FORMATS)
+
+
+class SimulationJob:
+    """Estado de una simulación enviada al pool de procesos."""
+
+    def __init__(self, environment_id, simulation_time, options):
+        self.id = uuid.uuid4().hex
+        self.environment_id = environment_id
+        self.simulation_time = simulation_time
+        self.options = options
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.sim_time = 0
+        self.result = None
+        self.error = None
+        self.future = None
+
+    @property
+    def finished(self):
+        return self.status in ("completed", "failed", "cancelled")
+
+    def wall_time(self):
+        """Segundos reales de ejecución (hasta ahora si sigue corriendo)."""
+        if self.started_at is None:
+            return None
+        return round((self.finished_at or time.time()) - self.started_at, 3)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "environment_id": self.environment_id,
+            "status": self.status,
+            "simulation_time": self.simulation_time,
+            "sim_time": self.sim_time,
+            "progress": round(min(self.sim_time / self.simulation_time, 1.0), 4) if self.simulation_time else 1.0,
+            "options": self.options,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wall_time": self.wall_time(),
+            "error": self.error,
+        }
+
+
+class SimulationJobManager:
+    """Ejecuta simulaciones en un ProcessPoolExecutor acotado y guarda su estado.
+
+    El pool y el Manager de multiprocessing se crean en el primer envío, así importar
+    la aplicación no lanza procesos.
+
+    Los trabajos terminados se descartan `retention` segundos después de terminar, o
+    antes si hay más de `max_finished`; de los descartados solo se recuerda el id
+    (`evicted`), para distinguirlos de un id que nunca existió.
+    """
+
+    def __init__(self, max_workers=None, database_url=None, retention=JOB_RETENTION, max_finished=MAX_FINISHED_JOBS):
+        self.max_workers = max_workers or SIMULATION_WORKERS
+        self.database_url = database_url
+        self.retention = retention
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._evicted = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._progress = None
+        self._cancel_requests = None
+        self._updates = None
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._cancel_requests = self._manager.dict()
+            # Las instantáneas diarias de los workers llegan por esta cola a los flujos SSE
+            self._updates = self._manager.Queue()
+            threading.Thread(target=pump_updates, args=(self._updates, streams), daemon=True).start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.database_url,)
+            )
+
+    def submit(self, environment_id, simulation_time, **options):
+        """Encola una simulación y devuelve el trabajo sin esperar a que termine."""
+        with self._lock:
+            self._ensure_started()
+            job = SimulationJob(environment_id, simulation_time, options)
+            self._jobs[job.id] = job
+            streams.open(job.id)
+            job.future = self._executor.submit(
+                run_simulation_job, job.id, environment_id, simulation_time, options,
+                self._progress, self._cancel_requests, self._updates
+            )
+        job.future.add_done_callback(lambda future, job=job: self._finish(job, future))
+        return job
+
+    def _finish(self, job, future):
+        self._refresh(job)
+        job.finished_at = time.time()
+        # El worker guardó el estado en la base desde otro proceso: las lecturas guardadas de la API quedan viejas
+        read_cache.invalidate_environment(job.environment_id)
+        engine = {"engine": self._job_engine(job)}
+        if future.cancelled():
+            job.status = "cancelled"
+            streams.close(job.id)
+            simulation_metrics.record(engine, "cancelled")
+            return
+        error = future.exception()
+        if error is not None:
+            job.status = "failed"
+            job.error = str(error)
+            streams.close(job.id)
+            simulation_metrics.record(engine, "failed")
+        elif future.result() is None:
+            job.status = "cancelled"
+            simulation_metrics.record(engine, "cancelled")
+        else:
+            job.status = "completed"
+            job.result = future.result()
+            job.sim_time = job.result["simulation_time"]
+            # Los tiempos por fase se midieron en el worker; se suman a las métricas de este proceso
+            simulation_metrics.record(job.result, "cached" if job.result.get("cached") else "completed")
+        try:
+            self._cancel_requests.pop(job.id, None)
+        except (OSError, EOFError):
+            pass  # El Manager ya se cerró
+        self._evict()
+
+    def _evict(self):
+        """Descarta los trabajos terminados que superan la retención."""
+        now = time.time()
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job.finished and job.finished_at is not None),
+                              key=lambda job: job.finished_at)
+            excess = len(finished) - self.max_finished
+            for index, job in enumerate(finished):
+                if index >= excess and now - job.finished_at < self.retention:
+                    break
+                del self._jobs[job.id]
+                self._evicted[job.id] = None
+            # Los ids recordados también tienen tope
+            while len(self._evicted) > 10 * max(self.max_finished, 1):
+                self._evicted.popitem(last=False)
+
+    def evicted(self, job_id):
+        """Si `job_id` fue un trabajo terminado que ya se descartó."""
+        return job_id in self._evicted
+
+    @staticmethod
+    def _job_engine(job):
+        return "resumed" if job.options.get("resume") else job.options.get("engine", "simpy")
+
+    def _refresh(self, job):
+        """Copia el progreso publicado por el worker al trabajo."""
+        if job.finished or self._progress is None:
+            return
+        try:
+            progress = self._progress.get(job.id)
+        except (OSError, EOFError):
+            return
+        if progress:
+            job.started_at = progress["started_at"]
+            job.sim_time = progress["sim_time"]
+            if job.status == "queued":
+                job.status = "running"
+
+    def get(self, job_id):
+        self._evict()
+        job = self._jobs.get(job_id)
+        if job is not None:
+            self._refresh(job)
+        return job
+
+    def list(self):
+        self._evict()
+        jobs = list(self._jobs.values())
+        for job in jobs:
+            self._refresh(job)
+        return jobs
+
+    def cancel(self, job_id):
+        """Cancela un trabajo en cola o pide a su worker que se detenga."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.future.cancel():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            streams.close(job_id)
+        else:
+            self._cancel_requests[job_id] = True
+        return job
+
+    def stats(self):
+        """Profundidad de la cola, uso de workers y tiempos reales por trabajo."""
+        jobs = self.list()
+        counts = {status: 0 for status in JOB_STATUSES}
+        for job in jobs:
+            counts[job.status] += 1
+        wall_times = [job.wall_time() for job in jobs if job.status == "completed"]
+        return {
+            "workers": self.max_workers,
+            "queue_depth": counts["queued"],
+            "running": counts["running"],
+            "worker_utilization": round(counts["running"] / self.max_workers, 4),
+            "jobs": counts,
+            "mean_wall_time": round(sum(wall_times) / len(wall_times), 3) if wall_times else None,
+            "wall_times": {job.id: job.wall_time() for job in jobs if job.started_at is not None},
+        }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._updates.put(None)
+            self._manager.shutdown()
+            self._executor = None
+
+
+job_manager = SimulationJobManager()
@@ -0,0 +1,59 @@
+import json
+from sqlalchemy import select
+
+# Filas por página (por defecto y máximo sin `stream`) y filas por lote al transmitir
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH = 1000
+
+
+def parse_fields(model, fields):
+    """Columnas pedidas en `fields` ("id,name,...") o todas; `id` siempre se incluye.
+
+    Lanza ValueError si alguna no es una columna del modelo.
+    """
+    table = model.__table__
+    if not fields:
+        return list(table.columns)
+    names = ["id"] + [name.strip() for name in fields.split(",") if name.strip() and name.strip() != "id"]
+    unknown = [name for name in names if name not in table.columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [table.columns[name] for name in dict.fromkeys(names)]
+
+
+def keyset_query(model, columns, after_id=None, limit=None, **filters):
+    """SELECT de `columns` ordenado por id a partir de `after_id` (excluido).
+
+    Los filtros con valor None se ignoran. A diferencia de OFFSET, el costo de una
+    página no crece con su profundidad: la base salta directo al id por el índice.
+    """
+    table = model.__table__
+    statement = select(*columns).order_by(table.c.id)
+    if after_id is not None:
+        statement = statement.where(table.c.id > after_id)
+    for name, value in filters.items():
+        if value is not None:
+            statement = statement.where(table.c[name] == value)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+async def fetch_page(db, statement, limit):
+    """Filas de una página como diccionarios y el cursor de la siguiente (None si no hay más)."""
+    rows = [dict(row) for row in (await db.execute(statement)).mappings()]
+    next_cursor = rows[-1]["id"] if rows and len(rows) == limit else None
+    return rows, next_cursor
+
+
+async def stream_json(db, statement):
+    """Arreglo JSON generado por lotes, sin cargar todas las filas en memoria."""
+    result = await db.stream(statement)
+    yield "["
+    first = True
+    async for batch in result.mappings().partitions(STREAM_BATCH):
+        text = ",".join(json.dumps(dict(row)) for row in batch)
+        yield text if first else "," + text
+        first = False
+    yield "]"
@@ -0,0 +1,119 @@
+"""Logging estructurado y sin bloqueos del simulador.
+
+Los módulos usan `logging.getLogger(__name__)`; los mensajes por evento del ciclo de
+vida van al logger `<paquete>.events` en nivel DEBUG, así que por defecto ni se
+formatean. `configure_logging()` instala en el logger del paquete un QueueHandler:
+el hilo de la simulación solo encola el registro y un hilo aparte lo formatea (texto
+o JSON) y lo escribe.
+
+Variables de entorno:
+
+    LOG_LEVEL          nivel del paquete (INFO por defecto)
+    EVENT_LOG_LEVEL    nivel de los mensajes por evento (WARNING por defecto: apagados)
+    LOG_FORMAT         "json" (por defecto) o "text"
+    LOG_QUEUE_SIZE     registros pendientes antes de descartar (10000 por defecto)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+PACKAGE_LOGGER = __package__ or "ecosistemsimulator"
+EVENTS_LOGGER = f"{PACKAGE_LOGGER}.events"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+EVENT_LOG_LEVEL = os.getenv("EVENT_LOG_LEVEL", "WARNING").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Atributos que se agregan al JSON cuando se pasan en `extra`
+STRUCTURED_FIELDS = ("run_id", "job_id", "environment_id", "organism_id", "event_type", "sim_time", "engine")
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro con los campos de STRUCTURED_FIELDS presentes."""
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca espera: si la cola está llena descarta y cuenta el registro.
+
+    A diferencia del QueueHandler estándar no formatea en el hilo que registra; el
+    mensaje se arma en el hilo del QueueListener (la cola no sale del proceso).
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+_listener = None
+_handler = None
+
+
+def configure_logging(level=None, event_level=None, log_format=None, stream=None, queue_size=None):
+    """Instala (o reemplaza) el pipeline de logging del paquete y devuelve su handler."""
+    global _listener, _handler
+    shutdown_logging()
+    formatter = JsonFormatter() if (log_format or LOG_FORMAT) == "json" else logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(formatter)
+    _handler = NonBlockingQueueHandler(queue.Queue(queue_size or LOG_QUEUE_SIZE))
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+    package = logging.getLogger(PACKAGE_LOGGER)
+    package.handlers = [_handler]
+    package.propagate = False
+    package.setLevel(level or LOG_LEVEL)
+    logging.getLogger(EVENTS_LOGGER).setLevel(event_level or EVENT_LOG_LEVEL)
+    return _handler
+
+
+def shutdown_logging():
+    """Detiene el hilo de escritura después de vaciar la cola."""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger(PACKAGE_LOGGER).removeHandler(_handler)
+        _handler = None
+
+
+def dropped_records():
+    """Registros descartados porque la cola estaba llena."""
+    return _handler.dropped if _handler is not None else 0
+
+
+atexit.register(shutdown_logging)
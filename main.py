@@ -1,14 +1,101 @@
-from .ecosystem_simulation import EcosystemSimulation
-from fastapi import FastAPI,Depends,HTTPException
-from .models import Environment,Interactions,Lifecycle,Organisms,PopulationHistory
-from .schemas import OrganismCreate,InteractionCreate,EnvironimentoCreate
-from .database import get_db
+from .ecosystem_simulation import EcosystemSimulation, ENGINES
+from .time_advance import TIME_ADVANCE_MODES
+from .event_sink import make_event_sink, EVENT_SINKS, NullLifecycleSink
+from .jobs import job_manager
+from .streaming import streams
+from .checkpoint import checkpoint_path
+from .sweep import expand_grid, run_sweep
+from .runs import run_to_dict
+from .columnar import COLUMNAR_FORMATS, EXPORT_TABLES, export_run, output_path
+from .history import DEFAULT_MAX_POINTS, ROLLUP_RESOLUTIONS, choose_resolution, query_history
+import os
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI,Depends,HTTPException,Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+import asyncio
+import json
+from .models import Environment,Interactions,Lifecycle,Organisms,PopulationHistory,SimulationRun
+from .schemas import OrganismCreate,InteractionCreate,EnvironimentoCreate,SweepCreate,OrganismBulkUpdate
+from .bulk import BulkPayloadError, insert_rows, missing_ids, read_items, update_rows
+from .listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, keyset_query, parse_fields, stream_json
+from .database import get_db, get_async_db, get_simulation_db, pool_stats
+from .profiler import simulation_metrics
+from .logs import configure_logging
+from .result_cache import result_cache, run_cached
+from .read_cache import read_cache
+from .migrations import upgrade_schema
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-app = FastAPI()
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+logger = logging.getLogger(__name__)
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Las bases creadas con una versión anterior reciben las tablas y columnas nuevas
+    upgrade_schema()
+    yield
+    # Al apagar la aplicación se detienen los procesos de simulación
+    job_manager.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
+
+async def invalidate_reads(db, environment_ids=(), organism_ids=()):
+    # Las lecturas guardadas de los entornos tocados por una escritura dejan de servir. La caché de
+    # resultados no se toca: su clave es el estado de entrada, y si se restaura el mismo estado vuelve a servir
+    environment_ids = set(environment_ids)
+    if organism_ids:
+        rows = await db.execute(select(Organisms.environment_id).where(Organisms.id.in_(set(organism_ids))))
+        environment_ids.update(rows.scalars())
+    drop_reads(environment_ids)
+    return environment_ids
+
+def drop_reads(environment_ids):
+    # Incluye None: los organismos sin entorno se guardan bajo esa clave
+    for environment_id in environment_ids:
+        read_cache.invalidate_environment(environment_id)
+
+## LECTURAS CON CACHÉ
+def read_response(entry, request):
+    # 304 sin cuerpo si el cliente ya tiene la versión vigente
+    if entry.matches(request.headers.get("if-none-match")):
+        read_cache.revalidated()
+        return Response(status_code=304, headers={"ETag": entry.etag})
+    return Response(entry.body, media_type="application/json", headers=entry.headers)
+
+def render_json(value):
+    # Los mismos bytes que FastAPI arma al devolver el objeto del ORM
+    return JSONResponse(jsonable_encoder(value)).body
+
+## LISTADOS
+async def list_rows(db, model, after_id, limit, fields, stream, skip=0, **filters):
+    # Paginación por id (`after_id`) con el cursor de la página siguiente en X-Next-Cursor.
+    # Con `stream` las filas se envían por lotes y `limit` es opcional. `skip` (OFFSET) se
+    # mantiene por compatibilidad, pero su costo crece con la profundidad de la página.
+    try:
+        columns = parse_fields(model, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not stream:
+        limit = DEFAULT_PAGE_SIZE if limit is None else limit
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}; use stream=true for larger results")
+    statement = keyset_query(model, columns, after_id, limit, **filters)
+    if skip:
+        statement = statement.offset(skip)
+    if stream:
+        return StreamingResponse(stream_json(db, statement), media_type="application/json")
+    rows, next_cursor = await fetch_page(db, statement, limit)
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else None
+    return JSONResponse(rows, headers=headers)
 
 ## ENTORNOS
 @app.post("/environments/")
-def create_environment(enviroments: EnvironimentoCreate, db: Session = Depends(get_db)):
+async def create_environment(enviroments: EnvironimentoCreate, db: AsyncSession = Depends(get_async_db)):
    new_environments = Environment(
         name = enviroments.name,
         temperature= enviroments.temperature,
@@ -17,94 +104,339 @@ def create_environment(enviroments: EnvironimentoCreate, db: Session = Depends(g
         surface_area=enviroments.surface_area  # Superficie en km²  # Superficie en km²  # Superficie en km²  # Superficie en km²  # Superficie en km²  # Superficie en km²  # Superficie en km²  # Superficie en km²  # Superficie en km²  # Superficie en km²  # Superficie en km²
     )
    db.add(new_environments)
-   db.commit()
-   db.refresh(new_environments)
+   await db.commit()
+   await db.refresh(new_environments)
+   # SQLite puede reutilizar el id de un entorno borrado
+   drop_reads([new_environments.id])
    return new_environments
 ## Obtener todos los entornos
 @app.get("/environments/")
-def get_all_environments(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    environments = db.query(Environment).offset(skip).limit(limit).all()
-    return environments
+async def get_all_environments(after_id: int | None = None, limit: int | None = None, fields: str | None = None, name: str | None = None, stream: bool = False, skip: int = 0, db: AsyncSession = Depends(get_async_db)):
+    return await list_rows(db, Environment, after_id, limit, fields, stream, skip, name=name)
 ##  Obtener un entorno por ID
 @app.get("/environments/{environment_id}")
-def get_environment_by_id(environment_id: int, db: Session = Depends(get_db)):
-    environment = db.query(Environment).filter(Environment.id == environment_id).first()
-    if environment is None:
-        raise HTTPException(status_code=404, detail="Environment not found")
-    return environment
+async def get_environment_by_id(environment_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Con acierto en la caché la sesión no llega a pedir una conexión
+    key = ("environment", environment_id)
+    entry = read_cache.get(key)
+    if entry is None:
+        token = read_cache.token()
+        environment = await db.get(Environment, environment_id)
+        if environment is None:
+            raise HTTPException(status_code=404, detail="Environment not found")
+        entry = read_cache.put(key, environment_id, render_json(environment), token=token)
+    return read_response(entry, request)
 ## Actualizar entorno
 @app.put("/environments/{environment_id}")
-def update_environment(enviroments:EnvironimentoCreate,environment_id: int, db: Session = Depends(get_db)):
-   db_environments = db.query(Environment).filter(Environment.id == environment_id).first()
+async def update_environment(enviroments:EnvironimentoCreate,environment_id: int, db: AsyncSession = Depends(get_async_db)):
+   db_environments = await db.get(Environment, environment_id)
    if db_environments is None:
         raise HTTPException(status_code=404, detail="Environment id not found")
-   db_environments.name = enviroments.name,
-   db_environments.temperature= enviroments.temperature,
-   db_environments.humidity= enviroments.humidity,
-   db_environments.resources=enviroments.resources,
+   db_environments.name = enviroments.name
+   db_environments.temperature= enviroments.temperature
+   db_environments.humidity= enviroments.humidity
+   db_environments.resources=enviroments.resources
    db_environments.surface_area=enviroments.surface_area
    db.add(db_environments)
-   db.commit()
-   db.refresh(db_environments)
+   await db.commit()
+   await invalidate_reads(db, [environment_id])
+   await db.refresh(db_environments)
    return db_environments
 # Eliminar entorno
 @app.delete("/environments/{environment_id}")
-def delete_environment(environment_id: int, db: Session = Depends(get_db)):
-    environment = db.query(Environment).filter(Environment.id == environment_id).first()
+async def delete_environment(environment_id: int, db: AsyncSession = Depends(get_async_db)):
+    environment = await db.get(Environment, environment_id)
     if environment is None:
         raise HTTPException(status_code=404, detail="Environment not found")
  
-    db.delete(environment)
-    db.commit()
+    await db.delete(environment)
+    await db.commit()
+    await invalidate_reads(db, [environment_id])
+    # Sus resultados guardados ya no se pueden pedir: se libera el lugar
+    result_cache.invalidate_environment(environment_id)
     return {"detail": "Environment deleted"}
 ## Asignar organismo a entorno
 @app.post("/environments/{environment_id}/organisms/")
-def assign_organism_to_environment(environment_id: int, organism_id: int, db: Session = Depends(get_db)):
-    environment = db.query(Environment).filter(Environment.id == environment_id).first()
+async def assign_organism_to_environment(environment_id: int, organism_id: int, db: AsyncSession = Depends(get_async_db)):
+    environment = await db.get(Environment, environment_id)
     if environment is None:
         raise HTTPException(status_code=404, detail="Environment not found")
  
-    organism = db.query(Organisms).filter(Organisms.id == organism_id).first()
+    organism = await db.get(Organisms, organism_id)
     if organism is None:
         raise HTTPException(status_code=404, detail="Organism not found")
  
+    previous_environment_id = organism.environment_id
     organism.environment_id = environment_id
-    db.commit()
-    db.refresh(organism)
+    await db.commit()
+    await invalidate_reads(db, [previous_environment_id, environment_id])
     return {"detail": "Organism assigned to environment"}
 # Obetener todos los organismos de un entorno
 @app.get("/environments/{environment_id}/organisms/")
-def get_organisms_in_environment(environment_id: int, db: Session = Depends(get_db)):
-    organisms = db.query(Organisms).filter(Organisms.environment_id == environment_id).all()
-    if not organisms:
-        raise HTTPException(status_code=404, detail="No organisms found in this environment")
-    return organisms
+async def get_organisms_in_environment(environment_id: int, request: Request, after_id: int | None = None, limit: int | None = None, fields: str | None = None, organism_type: str | None = None, stream: bool = False, db: AsyncSession = Depends(get_async_db)):
+    # Sin `limit` el flujo envía todos los organismos; una página, hasta MAX_PAGE_SIZE
+    if stream:
+        return await list_rows(db, Organisms, after_id, limit, fields, stream, environment_id=environment_id, organism_type=organism_type)
+    limit = MAX_PAGE_SIZE if limit is None else limit
+    key = ("environment_organisms", environment_id, after_id, limit, fields, organism_type)
+    entry = read_cache.get(key)
+    if entry is None:
+        token = read_cache.token()
+        response = await list_rows(db, Organisms, after_id, limit, fields, stream, environment_id=environment_id, organism_type=organism_type)
+        if after_id is None and response.body == b"[]":
+            raise HTTPException(status_code=404, detail="No organisms found in this environment")
+        cursor = response.headers.get("x-next-cursor")
+        entry = read_cache.put(key, environment_id, response.body,
+                               {"X-Next-Cursor": cursor} if cursor is not None else None, token=token)
+    return read_response(entry, request)
 from sqlalchemy.exc import DBAPIError
 @app.post("/environments/{environment_id}/simulate/")
-async def simulate_environment(environment_id: int, simulation_time: int, db: Session = Depends(get_db)):
-    try:
-        simulation = EcosystemSimulation(db, environment_id)
-        simulation.env.process(simulation.run(simulation_time))
-        simulation.env.run()
-        return {"message": "Simulation completed successfully", "environment_id": environment_id}
-    except Exception as e:
-        return {"error": str(e), "message": "An error occurred during the simulation."}
+def simulate_environment(environment_id: int, simulation_time: int, engine: str = "simpy", seed: int | None = None, db: Session = Depends(get_db)):
+    # La simulación corre en el pool de procesos; se responde con el id del trabajo
+    return submit_simulation_job(environment_id, simulation_time, db, engine=engine, seed=seed, event_sink="buffered")
     
 
 
+#################### JOBS
+
+def submit_simulation_job(environment_id, simulation_time, db, **options):
+    environment = db.query(Environment).filter(Environment.id == environment_id).first()
+    if environment is None:
+        raise HTTPException(status_code=404, detail="Environment not found")
+    if options.get("engine", "simpy") not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown engine: {options['engine']}")
+    if options["event_sink"] not in EVENT_SINKS and options["event_sink"] not in ("null",) + COLUMNAR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown event sink: {options['event_sink']}")
+    job = job_manager.submit(environment_id, simulation_time, **options)
+    return {"job_id": job.id, "status": job.status, "environment_id": environment_id}
+
+@app.post("/jobs/simulate/{environment_id}")
+def create_simulation_job(environment_id: int, time: int, engine: str = "simpy", seed: int | None = None, event_sink: str = "buffered", checkpoint_every: int | None = None, profile: bool = False, cell_area: float | None = None, time_advance: str = "discrete", sample_every: int = 1, age_bins: int | None = None, hybrid_threshold: int | None = None, db: Session = Depends(get_db)):
+    if cell_area is not None and cell_area <= 0:
+        raise HTTPException(status_code=400, detail="cell_area must be positive")
+    if time_advance not in TIME_ADVANCE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown time advance mode: {time_advance}")
+    if sample_every < 1 or (checkpoint_every and checkpoint_every % sample_every):
+        raise HTTPException(status_code=400, detail="sample_every must be positive and divide checkpoint_every")
+    if age_bins is not None and (engine != "vectorized" or age_bins < 1 or checkpoint_every):
+        raise HTTPException(status_code=400, detail="age_bins must be positive and requires the vectorized engine without checkpoints")
+    if hybrid_threshold is not None and (engine != "meanfield" or hybrid_threshold < 1):
+        raise HTTPException(status_code=400, detail="hybrid_threshold must be positive and requires the meanfield engine")
+    if engine == "meanfield" and checkpoint_every:
+        raise HTTPException(status_code=400, detail="The meanfield engine does not support checkpoints")
+    return submit_simulation_job(environment_id, time, db, engine=engine, seed=seed, event_sink=event_sink, checkpoint_every=checkpoint_every, profile=profile, cell_area=cell_area, time_advance=time_advance, sample_every=sample_every, age_bins=age_bins, hybrid_threshold=hybrid_threshold)
+
+@app.post("/jobs/resume/{environment_id}")
+def resume_simulation_job(environment_id: int, time: int, event_sink: str = "buffered", checkpoint_every: int | None = None, profile: bool = False, db: Session = Depends(get_db)):
+    # Continúa la simulación desde el último checkpoint del entorno hasta el día `time`
+    if not os.path.exists(checkpoint_path(environment_id)):
+        raise HTTPException(status_code=404, detail="No checkpoint found for this environment")
+    return submit_simulation_job(environment_id, time, db, resume=True, event_sink=event_sink, checkpoint_every=checkpoint_every, profile=profile)
+
+@app.get("/jobs/")
+def get_all_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+@app.get("/jobs/stats")
+def get_job_stats():
+    return job_manager.stats()
+
+def job_not_found(job_id):
+    # Un trabajo terminado que ya se descartó de la memoria responde 410, uno desconocido 404
+    if job_manager.evicted(job_id):
+        return HTTPException(status_code=410, detail="Job expired")
+    return HTTPException(status_code=404, detail="Job not found")
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise job_not_found(job_id)
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise job_not_found(job_id)
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job_progress(job_id: str):
+    # Server-Sent Events con las poblaciones de cada día simulado
+    if streams.get(job_id) is None:
+        if job_manager.get(job_id) is not None:
+            raise HTTPException(status_code=410, detail="Job stream expired")
+        raise job_not_found(job_id)
+
+    async def events():
+        # La suscripción se toma al empezar a enviar: así el finally siempre la suelta
+        stream = streams.subscribe(job_id)
+        if stream is None:
+            yield "event: end\ndata: {}\n\n"
+            return
+        try:
+            cursor = 0
+            while True:
+                closed = stream.closed
+                snapshots, cursor, skipped = stream.read(cursor)
+                if skipped:
+                    yield f"event: coalesced\ndata: {json.dumps({'skipped': skipped})}\n\n"
+                for snapshot in snapshots:
+                    yield f"data: {json.dumps(snapshot)}\n\n"
+                if not snapshots:
+                    if closed:
+                        yield "event: end\ndata: {}\n\n"
+                        return
+                    await asyncio.sleep(0.1)
+        finally:
+            streams.unsubscribe(job_id, stream)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise job_not_found(job_id)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return {"job_id": job.id, "wall_time": job.wall_time(), "result": job.result}
+
+
+#################### RUNS
+
+@app.get("/runs/")
+def get_all_runs(skip: int = 0, limit: int = 10, environment_id: int | None = None, db: Session = Depends(get_db)):
+    query = db.query(SimulationRun)
+    if environment_id is not None:
+        query = query.filter(SimulationRun.environment_id == environment_id)
+    return [run_to_dict(run) for run in query.order_by(SimulationRun.id).offset(skip).limit(limit).all()]
+
+@app.get("/runs/{run_id}")
+def get_run(run_id: int, db: Session = Depends(get_db)):
+    run = db.query(SimulationRun).filter(SimulationRun.id == run_id).first()
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run_to_dict(run)
+
+@app.get("/runs/{run_id}/history")
+def get_run_history(run_id: int, start: float | None = None, end: float | None = None, resolution: int | None = None, max_points: int = DEFAULT_MAX_POINTS, db: Session = Depends(get_db)):
+    # Sin `resolution` se usa la más fina que entrega como mucho `max_points` puntos
+    run = db.query(SimulationRun).filter(SimulationRun.id == run_id).first()
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    start = run.start_time + 1 if start is None else start
+    end = run.simulation_time if end is None else end
+    if resolution is None:
+        resolution = choose_resolution(start, end, max_points)
+    elif resolution != 1 and resolution not in ROLLUP_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Resolution must be 1 or one of {list(ROLLUP_RESOLUTIONS)}")
+    return {"run_id": run_id, "start": start, "end": end, "resolution": resolution,
+            "points": query_history(db, run_id, start, end, resolution)}
+
+@app.get("/runs/{run_id}/export")
+def export_run_table(run_id: int, table: str = "lifecycle", format: str = "parquet", description: bool = False, db: Session = Depends(get_db)):
+    # Copia los eventos o la población de la corrida a un archivo columnar por lotes y lo descarga
+    run = db.query(SimulationRun).filter(SimulationRun.id == run_id).first()
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=400, detail=f"Table must be one of {list(EXPORT_TABLES)}")
+    if format not in COLUMNAR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of {list(COLUMNAR_FORMATS)}")
+    path = output_path(f"run_{run_id}", table, format)
+    try:
+        export = export_run(db, run_id, table, path, format, include_description=description)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return FileResponse(path, filename=os.path.basename(path), headers={"X-Rows": str(export["rows"])})
+
+@app.post("/runs/{run_id}/replay")
+def replay_run(run_id: int, db: Session = Depends(get_db)):
+    # Repite la corrida en memoria con su semilla y estado inicial y compara el digest final
+    run = db.query(SimulationRun).filter(SimulationRun.id == run_id).first()
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if run.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Run is {run.status}")
+    simulation = EcosystemSimulation.from_run(run, event_sink=NullLifecycleSink())
+    summary = simulation.run(run.simulation_time)
+    return {
+        "run_id": run.id,
+        "seed": run.seed,
+        "engine": run.engine,
+        "digest": run.digest,
+        "replay_digest": summary["digest"],
+        "identical": summary["digest"] == run.digest,
+        "summary": summary,
+    }
+
+
+#################### SWEEPS
+
+@app.post("/sweeps/{environment_id}")
+def create_sweep(environment_id: int, sweep: SweepCreate, db: Session = Depends(get_db)):
+    # Corre todas las configuraciones y réplicas en paralelo y devuelve la tabla agregada
+    environment = db.query(Environment).filter(Environment.id == environment_id).first()
+    if environment is None:
+        raise HTTPException(status_code=404, detail="Environment not found")
+    configurations = sweep.configurations if sweep.configurations is not None else expand_grid(sweep.grid)
+    seeds = sweep.seeds or list(range(sweep.replicates))
+    try:
+        return run_sweep(environment_id, sweep.simulation_time, configurations, seeds,
+                         engine=sweep.engine, percentiles=sweep.percentiles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+#################### BASE DE DATOS
+
+@app.get("/db/pools")
+def get_pool_stats():
+    # Latencia de checkout y saturación de los pools de la API y de las simulaciones
+    return pool_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Formato de exposición de Prometheus: corridas, fases, eventos, latencia SQL, pools, trabajos y caché de lecturas
+    return PlainTextResponse(simulation_metrics.render(pool_stats(), job_manager.stats(), read_cache.stats()),
+                             media_type="text/plain; version=0.0.4")
+
+
+#################### CACHÉS DE RESULTADOS Y DE LECTURAS
+
+@app.get("/cache/results")
+def get_result_cache_stats():
+    return result_cache.stats()
+
+@app.delete("/cache/results")
+def clear_result_cache():
+    result_cache.clear()
+    return {"detail": "Result cache cleared"}
+
+@app.get("/cache/reads")
+def get_read_cache_stats():
+    return read_cache.stats()
+
+@app.delete("/cache/reads")
+def clear_read_cache():
+    read_cache.clear()
+    return {"detail": "Read cache cleared"}
+
+
 #################### INTERACTIONS
 
 @app.get("/interactions/")
-def get_all_interactions(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    interactions = db.query(Interactions).offset(skip).limit(limit).all()
-    return interactions
+async def get_all_interactions(after_id: int | None = None, limit: int | None = None, fields: str | None = None, interaction_type: str | None = None, predator_id: int | None = None, prey_id: int | None = None, stream: bool = False, skip: int = 0, db: AsyncSession = Depends(get_async_db)):
+    return await list_rows(db, Interactions, after_id, limit, fields, stream, skip, interaction_type=interaction_type, predator_id=predator_id, prey_id=prey_id)
 @app.post("/interactions/")
-def create_interactions(interaction: InteractionCreate, db: Session = Depends(get_db)):
-    predator = db.query(Organisms).filter(Organisms.id == interaction.predator_id).first()
-    prey = db.query(Organisms).filter(Organisms.id == interaction.prey_id).first()
-    if predator is None:
+async def create_interactions(interaction: InteractionCreate, db: AsyncSession = Depends(get_async_db)):
+    # Depredador y presa se verifican en una sola consulta
+    missing = await missing_ids(db, Organisms.id, [interaction.predator_id, interaction.prey_id])
+    if interaction.predator_id in missing:
         raise HTTPException(status_code=404, detail="Predator not found")
-    if prey is None:
+    if interaction.prey_id in missing:
         raise HTTPException(status_code=404, detail="Prey not found")
     new_interaction = Interactions(
         predator_id=interaction.predator_id,
@@ -113,8 +445,8 @@ def create_interactions(interaction: InteractionCreate, db: Session = Depends(ge
         interaction_rate=0.5
     )
     db.add(new_interaction)
-    db.commit()
-    db.refresh(new_interaction)
+    await db.commit()
+    await db.refresh(new_interaction)
     return {
         "id": new_interaction.id,
         "predator_id": new_interaction.predator_id,
@@ -122,23 +454,83 @@ def create_interactions(interaction: InteractionCreate, db: Session = Depends(ge
         "message": "Interaction successfully created"
     }
 
+@app.post("/interactions/bulk")
+async def create_interactions_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Arreglo JSON o NDJSON de InteractionCreate; todo se inserta en una transacción
+    try:
+        interactions = await read_items(request, InteractionCreate)
+    except BulkPayloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    organism_ids = [i.predator_id for i in interactions] + [i.prey_id for i in interactions]
+    missing = await missing_ids(db, Organisms.id, organism_ids)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Organisms not found: {missing[:20]}")
+    ids = await insert_rows(db, Interactions, [
+        dict(interaction.model_dump(), interaction_type="Depredacion", interaction_rate=0.5)
+        for interaction in interactions
+    ])
+    await db.commit()
+    return {"created": len(ids), "ids": ids}
+
 
 ########## ORGANISMS
 
 @app.get("/organisms/")
-def read_organisms(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    organisms = db.query(Organisms).offset(skip).limit(limit).all()
-    return organisms
+async def read_organisms(after_id: int | None = None, limit: int | None = None, fields: str | None = None, organism_type: str | None = None, environment_id: int | None = None, name: str | None = None, stream: bool = False, skip: int = 0, db: AsyncSession = Depends(get_async_db)):
+    return await list_rows(db, Organisms, after_id, limit, fields, stream, skip, organism_type=organism_type, environment_id=environment_id, name=name)
+
+@app.post("/organisms/bulk")
+async def create_organisms_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Arreglo JSON o NDJSON de OrganismCreate; todo se inserta en una transacción
+    try:
+        organisms = await read_items(request, OrganismCreate)
+    except BulkPayloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    missing = await missing_ids(db, Environment.id, [organism.environment_id for organism in organisms])
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Environments not found: {missing[:20]}")
+    ids = await insert_rows(db, Organisms, [organism.model_dump() for organism in organisms])
+    await db.commit()
+    await invalidate_reads(db, [organism.environment_id for organism in organisms])
+    return {"created": len(ids), "ids": ids}
+
+@app.put("/organisms/bulk")
+async def modify_organisms_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Arreglo JSON o NDJSON de organismos completos con su id
+    try:
+        organisms = await read_items(request, OrganismBulkUpdate)
+    except BulkPayloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    missing = await missing_ids(db, Organisms.id, [organism.id for organism in organisms])
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Organisms not found: {missing[:20]}")
+    missing = await missing_ids(db, Environment.id, [organism.environment_id for organism in organisms])
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Environments not found: {missing[:20]}")
+    # Entornos de antes y de después de la actualización
+    environment_ids = await invalidate_reads(db, [organism.environment_id for organism in organisms],
+                                             [organism.id for organism in organisms])
+    await update_rows(db, Organisms, [organism.model_dump() for organism in organisms])
+    await db.commit()
+    # Una lectura entre la invalidación y el commit pudo guardar las filas anteriores
+    drop_reads(environment_ids)
+    return {"updated": len(organisms)}
 
 @app.get("/organisms/{organism_id}")
-def read_organisms_by_id(organism_id: int, db: Session = Depends(get_db)):
-    organism = db.query(Organisms).filter(Organisms.id == organism_id).first()
-    if organism is None:
-        raise HTTPException(status_code=404, detail="Organism id not found")
-    return organism
+async def read_organisms_by_id(organism_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    key = ("organism", organism_id)
+    entry = read_cache.get(key)
+    if entry is None:
+        token = read_cache.token()
+        organism = await db.get(Organisms, organism_id)
+        if organism is None:
+            raise HTTPException(status_code=404, detail="Organism id not found")
+        # Se guarda bajo su entorno: las escrituras sobre el entorno la invalidan
+        entry = read_cache.put(key, organism.environment_id, render_json(organism), token=token)
+    return read_response(entry, request)
 
 @app.post("/organisms/")
-def create_organisms(organism: OrganismCreate, db: Session = Depends(get_db)):
+async def create_organisms(organism: OrganismCreate, db: AsyncSession = Depends(get_async_db)):
     new_organism = Organisms(
         name = organism.name,
         organism_type = organism.organism_type,
@@ -155,42 +547,47 @@ def create_organisms(organism: OrganismCreate, db: Session = Depends(get_db)):
         min_energy_for_health = organism.min_energy_for_health
     )
     db.add(new_organism)
-    db.commit()
-    db.refresh(new_organism)
+    await db.commit()
+    await invalidate_reads(db, [organism.environment_id])
+    await db.refresh(new_organism)
     return new_organism
 
 @app.put("/organisms/{organism_id}")
-def modify_organism(organism_id: int, organism: OrganismCreate, db: Session = Depends(get_db)):
-    db_organism = db.query(Organisms).filter(Organisms.id == organism_id).first()
+async def modify_organism(organism_id: int, organism: OrganismCreate, db: AsyncSession = Depends(get_async_db)):
+    db_organism = await db.get(Organisms, organism_id)
     if db_organism is None:
         raise HTTPException(status_code=404, detail="Organism id not found")
+    previous_environment_id = db_organism.environment_id
 
-    db_organism.name = organism.name,
-    db_organism.organism_type = organism.organism_type,
-    db_organism.birth_rate = organism.birth_rate,
-    db_organism.death_rate = organism.death_rate,
-    db_organism.initial_energy = organism.initial_energy,
-    db_organism.quantity = organism.quantity,
-    db_organism.environment_id = organism.environment_id,
-    db_organism.growth_rate = organism.growth_rate,
-    db_organism.energy_consumption_rate = organism.energy_consumption_rate,
-    db_organism.reproduction_season = organism.reproduction_season,
-    db_organism.lifespan = organism.lifespan,
-    db_organism.reproduction_energy_threshold = organism.reproduction_energy_threshold,
+    db_organism.name = organism.name
+    db_organism.organism_type = organism.organism_type
+    db_organism.birth_rate = organism.birth_rate
+    db_organism.death_rate = organism.death_rate
+    db_organism.initial_energy = organism.initial_energy
+    db_organism.quantity = organism.quantity
+    db_organism.environment_id = organism.environment_id
+    db_organism.growth_rate = organism.growth_rate
+    db_organism.energy_consumption_rate = organism.energy_consumption_rate
+    db_organism.reproduction_season = organism.reproduction_season
+    db_organism.lifespan = organism.lifespan
+    db_organism.reproduction_energy_threshold = organism.reproduction_energy_threshold
     db_organism.min_energy_for_health= organism.min_energy_for_health
-    db.commit()
-    db.refresh(db_organism)
+    await db.commit()
+    await invalidate_reads(db, [previous_environment_id, organism.environment_id])
+    await db.refresh(db_organism)
     return db_organism
 
 
 @app.delete("/organisms/{organism_id}")
-def delete_organism(organism_id: int, db: Session = Depends(get_db)):
-    organism = db.query(Organisms).filter(Organisms.id == organism_id).first()
+async def delete_organism(organism_id: int, db: AsyncSession = Depends(get_async_db)):
+    organism = await db.get(Organisms, organism_id)
     if organism is None:
         raise HTTPException(status_code=404, detail="Organism id not found")
 
-    db.delete(organism)
-    db.commit()
+    environment_id = organism.environment_id
+    await db.delete(organism)
+    await db.commit()
+    await invalidate_reads(db, [environment_id])
     return {"detail": "Organism deleted"}
 
 
@@ -198,18 +595,25 @@ def delete_organism(organism_id: int, db: Session = Depends(get_db)):
 
 
 @app.post("/ecosystem/simulate/{environment_id}")
-def simulate_ecosystem(environment_id: int,time:int, db: Session = Depends(get_db)):
-    print("Inicia la simulación del ecosistema para un entorno específico.")
+def simulate_ecosystem(environment_id: int,time:int, event_sink: str = "buffered", engine: str = "simpy", seed: int | None = None, profile: bool = False, cell_area: float | None = None, time_advance: str = "discrete", sample_every: int = 1, age_bins: int | None = None, hybrid_threshold: int | None = None, db: Session = Depends(get_simulation_db)):
+    logger.info("Simulación síncrona solicitada para el entorno %s", environment_id, extra={"environment_id": environment_id})
     environment = db.query(Environment).filter(Environment.id == environment_id).first()
     
     if not environment:
         raise HTTPException(status_code=404, detail="Environment not found")
     
-    simulation = EcosystemSimulation(db_session=db, environment_id=environment_id)
+    try:
+        sink = make_event_sink(event_sink, db)
+        simulation = EcosystemSimulation(db_session=db, environment_id=environment_id, event_sink=sink, engine=engine, seed=seed, profile=profile, cell_area=cell_area, time_advance=time_advance, sample_every=sample_every, age_bins=age_bins, hybrid_threshold=hybrid_threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        # Ejecutar la simulación de manera síncrona (sin await)
-        simulation.run(simulation_time=time)  # Por ejemplo, 100 días
-        return {"message": "Simulation completed successfully."}
+        # Ejecutar la simulación de manera síncrona (sin await); con semilla puede venir de la caché
+        summary = run_cached(simulation, time, result_cache,
+                             cacheable=seed is not None and not profile and event_sink not in COLUMNAR_FORMATS)
+        simulation_metrics.record(summary, "cached" if summary.get("cached") else "completed")
+        return {"message": "Simulation completed successfully.", "summary": summary}
     except Exception as e:
+        simulation_metrics.record({"engine": engine}, "failed")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,318 @@
+"""Motor de campo medio: las reglas de la simulación como un sistema de EDO.
+
+En lugar de sortear cada despertar, se integra la evolución esperada de cada
+población (individuos N y energía E) y de los recursos del entorno R. Cada población
+despierta en promedio WAKE_RATE veces por día (el randint(1, 5) de los otros motores)
+y en cada despertar aplica el valor esperado de las mismas reglas:
+
+- plantas: E += 0.1 * R * growth_rate;
+- herbívoros, si hay plantas vivas: E += 1.25 y R -= 1.25 (sin pasar de R); si no, E -= 0.5;
+- carnívoros: eligen presas vivas como `choose_prey` (red trófica o cualquier
+  herbívoro) y les quitan 2 de energía (sin pasar de la de la presa); sin presas, E -= 1;
+- metabolismo: E -= 0.55;
+- reproducción, en temporada y con E >= reproduction_energy_threshold: N crece en
+  N * birth_rate por despertar (tasa continua log(1 + birth_rate)) y E paga el umbral;
+- muerte: un individuo con probabilidad death_rate (siempre si E <= 0), que devuelve
+  0.2 * E a los recursos.
+
+Los umbrales (energía > 0, umbral de reproducción) se suavizan en una rampa de
+SWITCH_WIDTH de energía: el sistema no queda rebotando en el umbral y el integrador
+no necesita pasos diminutos. Las poblaciones con menos de medio individuo se extinguen.
+
+El sistema se integra con Runge-Kutta 4(5) de Dormand-Prince de paso adaptativo: con
+poblaciones estables el paso crece a varios días y el costo depende de los pasos, no
+de los días ni de los individuos. El error se controla con MEANFIELD_RTOL en los
+individuos; la energía y los recursos, que en las reglas actuales se retroalimentan y
+crecen sin límite (como en los otros motores, hasta infinito), solo con
+MEANFIELD_ENERGY_RTOL: basta con que no cambien de signo dentro de un paso.
+
+Con `hybrid_threshold` la corrida pasa al motor vectorizado (estocástico) en cuanto
+una población viva baja de ese número de individuos, donde el ruido ya importa.
+
+Variables de entorno:
+
+    MEANFIELD_RTOL          tolerancia relativa de los individuos (1e-3 por defecto)
+    MEANFIELD_ATOL          tolerancia absoluta (1e-6 por defecto)
+    MEANFIELD_ENERGY_RTOL   tolerancia relativa de la energía y los recursos (0.01 por defecto)
+"""
+import math
+import os
+import numpy as np
+from .cohorts import MAX_INDIVIDUALS
+from .vectorized_engine import CARNIVORE, HERBIVORE, PLANT, SEASONS, TYPE_CODES, VectorizedEngine
+
+MEANFIELD_RTOL = float(os.getenv("MEANFIELD_RTOL", 1e-3))
+MEANFIELD_ATOL = float(os.getenv("MEANFIELD_ATOL", 1e-6))
+ENERGY_RTOL = float(os.getenv("MEANFIELD_ENERGY_RTOL", 0.01))
+# Despertares por día: 1 / E[randint(1, 5)]
+WAKE_RATE = 1 / 3
+SWITCH_WIDTH = 1.0
+# Valores esperados de los sorteos de cada despertar
+GRAZING, HUNTING, METABOLISM = 1.25, 2.0, 0.55
+
+# Tablero de Dormand-Prince (RK45)
+_C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1])
+_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+# Diferencia entre la solución de orden 5 y la de orden 4 (estimación del error)
+_E = np.array([71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40])
+
+
+def _ramp(x):
+    """Indicador suavizado de x > 0: 0 por debajo de -SWITCH_WIDTH/2, 1 por encima de SWITCH_WIDTH/2."""
+    return np.clip(x / SWITCH_WIDTH + 0.5, 0.0, 1.0)
+
+
+class MeanFieldEngine:
+    """Motor determinista con la interfaz de VectorizedEngine (`advance`, `population_counts`, `sync_states`)."""
+
+    def __init__(self, simulation, hybrid_threshold=None, rtol=MEANFIELD_RTOL, atol=MEANFIELD_ATOL):
+        self.simulation = simulation
+        organisms = simulation.organisms
+        self.size = len(organisms)
+        self.types = np.array([TYPE_CODES.get(org.organism_type, -1) for org in organisms], dtype=np.int8)
+        self.growth_rate = np.array([org.growth_rate or 0.0 for org in organisms], dtype=np.float64)
+        self.birth_log = np.log1p(np.array([org.birth_rate for org in organisms], dtype=np.float64))
+        self.death_rate = np.array([org.death_rate for org in organisms], dtype=np.float64)
+        self.reproduction_threshold = np.array(
+            [org.reproduction_energy_threshold for org in organisms], dtype=np.float64
+        )
+        self.season_masks = {
+            season: np.array([org.reproduction_season in ("all_year", season) for org in organisms], dtype=bool)
+            for season in SEASONS
+        }
+        self.plants = self.types == PLANT
+        self.herbivores = self.types == HERBIVORE
+        self.carnivores = self.types == CARNIVORE
+        self.plant_rows = np.flatnonzero(self.plants)
+        self.herbivore_rows = np.flatnonzero(self.herbivores)
+        self.carnivore_rows = np.flatnonzero(self.carnivores)
+        # Aristas de la red trófica con su depredador (vacía: cualquier herbívoro es presa)
+        web = simulation.food_web
+        self.web_empty = web.empty
+        self.edge_predator = np.repeat(np.arange(self.size), np.diff(web.indptr))
+        self.edge_prey = web.prey
+        self.edge_rate = web.rate
+        # Estado: [N (poblaciones), E (poblaciones), R]
+        self.y = np.concatenate([
+            np.array([org.quantity for org in organisms], dtype=np.float64),
+            np.array([org.initial_energy for org in organisms], dtype=np.float64),
+            [float(simulation.environment.resources)],
+        ])
+        self.now = int(simulation.env.now)
+        # Tolerancia relativa por componente del estado
+        self.rtol = np.full(self.y.size, ENERGY_RTOL)
+        self.rtol[:self.size] = rtol
+        self.atol = atol
+        self.step_size = None
+        self.hybrid_threshold = hybrid_threshold
+        # Motor estocástico que sigue la corrida después del cambio (modo híbrido)
+        self.stochastic = None
+        self.switched_at = None
+        self.steps = 0
+        self.rejected = 0
+        self.evaluations = 0
+
+    @property
+    def resources(self):
+        if self.stochastic is not None:
+            return self.stochastic.resources
+        return float(self.y[-1])
+
+    def quantities(self):
+        """Individuos por población redondeados, como los guardaría la corrida.
+
+        Una población que se desbordó (infinito tras `_saturate`) no tiene un entero que
+        guardar: como en los otros motores, la corrida falla con OverflowError.
+        """
+        quantity = self.y[:self.size]
+        if not (quantity < MAX_INDIVIDUALS).all():
+            raise OverflowError("La población supera el máximo de individuos de un entero de 64 bits")
+        return np.rint(quantity).astype(np.int64)
+
+    def population_counts(self):
+        """Devuelve (plantas, herbívoros, depredadores) sumando las cantidades por tipo."""
+        if self.stochastic is not None:
+            return self.stochastic.population_counts()
+        quantity = self.quantities()
+        # Suma con enteros de Python: la de int64 podría dar la vuelta
+        return tuple(sum(quantity[rows].tolist()) for rows in (self.plants, self.herbivores, self.carnivores))
+
+    def derivatives(self, t, y):
+        """dN/dt, dE/dt y dR/dt esperados en el instante `t`."""
+        self.evaluations += 1
+        size = self.size
+        quantity, energy, resources = y[:size], y[size:2 * size], y[-1]
+        f = np.empty_like(y)
+        d_quantity, d_energy = f[:size], f[size:2 * size]
+        wake = WAKE_RATE * (quantity >= 0.5)
+        alive = _ramp(energy)
+        np.multiply(wake, -METABOLISM, out=d_energy)
+        d_resources = 0.0
+
+        plants, herbivores, carnivores = self.plant_rows, self.herbivore_rows, self.carnivore_rows
+        if resources > 0:
+            awake = plants[wake[plants] > 0]  # 0 * inf no es 0: solo las plantas que despiertan
+            d_energy[awake] += wake[awake] * 0.1 * resources * self.growth_rate[awake]
+
+        # Pastoreo: sin plantas vivas los herbívoros pierden energía
+        plants_alive = alive[plants].max(initial=0.0)
+        share = min(1.0, resources / GRAZING) if resources > 0 else 0.0
+        grazing = wake[herbivores]
+        d_energy[herbivores] += grazing * (plants_alive * GRAZING * share - (1 - plants_alive) * 0.5)
+        d_resources -= plants_alive * GRAZING * share * grazing.sum()
+
+        # Caza: cada depredador reparte sus despertares entre las presas vivas
+        hunting = wake[carnivores]
+        if self.web_empty:
+            weights = alive[herbivores]
+            total = weights.sum()
+            if total > 0:
+                # Cada herbívoro recibe la parte de los ataques de su peso
+                available = np.minimum(1.0, np.maximum(energy[herbivores], 0.0) / HUNTING)
+                eaten = hunting.sum() * HUNTING * available * weights / total
+                d_energy[herbivores] -= eaten
+                d_energy[carnivores] += hunting * (HUNTING * (available * weights).sum() / total)
+            d_energy[carnivores] -= hunting * (1 - weights.max(initial=0.0))
+        else:
+            prey, predator = self.edge_prey, self.edge_predator
+            edge_weight = self.edge_rate * alive[prey]
+            total = np.bincount(predator, edge_weight, minlength=size)
+            found = np.zeros(size)
+            np.maximum.at(found, predator, alive[prey])
+            probability = edge_weight / np.where(total > 0, total, 1.0)[predator]
+            available = np.minimum(1.0, np.maximum(energy[prey], 0.0) / HUNTING)
+            eaten = wake[predator] * HUNTING * available * probability
+            d_energy -= np.bincount(prey, eaten, minlength=size)
+            d_energy += np.bincount(predator, eaten, minlength=size)
+            d_energy[carnivores] -= hunting * (1 - found[carnivores])
+
+        # Reproducción en temporada con energía suficiente
+        season = self.season_masks[self.simulation.get_current_season(int(t))]
+        breeding = wake * season * _ramp(energy - self.reproduction_threshold)
+        np.multiply(breeding * self.birth_log, quantity, out=d_quantity)
+        d_energy -= breeding * self.reproduction_threshold
+
+        # Muerte: siempre con energía <= 0; devuelve 0.2 de la energía al ambiente
+        dying = wake * (self.death_rate + (1 - self.death_rate) * (1 - alive))
+        d_quantity -= dying
+        dead = dying > 0
+        d_resources += 0.2 * float(np.dot(dying[dead], energy[dead]))
+        f[-1] = d_resources
+        return f
+
+    def _error_norm(self, y, y_new, error):
+        scale = self.atol + self.rtol * np.maximum(np.abs(y), np.abs(y_new))
+        ratio = error / scale
+        # La energía de las plantas puede crecer sin límite: los valores infinitos no se controlan
+        ratio = ratio[np.isfinite(ratio)]
+        return float(np.sqrt(np.mean(ratio ** 2))) if ratio.size else 0.0
+
+    def _step(self, t, y, f0, h):
+        """Un paso de Dormand-Prince: (y nuevo, f en el punto nuevo, norma del error)."""
+        k = [f0]
+        for stage in range(1, 7):
+            increment = sum(a * k_j for a, k_j in zip(_A[stage], k) if a)
+            k.append(self.derivatives(t + _C[stage] * h, self._saturate(y + h * increment)))
+        y_new = self._saturate(y + h * sum(a * k_j for a, k_j in zip(_A[6], k) if a))
+        error = h * sum(e * k_j for e, k_j in zip(_E, k) if e)
+        return y_new, k[-1], self._error_norm(y, y_new, error)
+
+    @staticmethod
+    def _saturate(y):
+        """Como en los otros motores, la energía que se desborda queda en infinito (inf - inf no es NaN)."""
+        y[np.isnan(y)] = np.inf
+        return y
+
+    def _initial_step(self, t, y, f0, until):
+        scale = self.atol + self.rtol * np.abs(y)
+        d0 = np.sqrt(np.mean(np.nan_to_num(y / scale) ** 2))
+        d1 = np.sqrt(np.mean(np.nan_to_num(f0 / scale) ** 2))
+        h = 0.01 * d0 / d1 if d0 > 1e-5 and d1 > 1e-5 else 1e-3
+        return min(h, until - t)
+
+    def _below_threshold(self):
+        quantity = self.y[:self.size]
+        living = quantity >= 0.5
+        return bool(np.any(quantity[living] < self.hybrid_threshold))
+
+    def advance(self, until):
+        """Integra hasta el día `until` (o pasa al motor estocástico si una población es chica)."""
+        if self.stochastic is None and self.hybrid_threshold is not None and self._below_threshold():
+            self._switch()
+        if self.stochastic is None:
+            self._integrate(until)
+        if self.stochastic is not None:
+            self.stochastic.advance(until)
+        self.now = until
+
+    def _integrate(self, until):
+        # La energía de las plantas y los recursos se retroalimentan y pueden desbordarse
+        with np.errstate(over="ignore", invalid="ignore"):
+            self._integrate_steps(until)
+        if self.hybrid_threshold is not None and self._below_threshold():
+            self._switch()
+
+    def _integrate_steps(self, until):
+        t = float(self.now)
+        y = self.y
+        f0 = self.derivatives(t, y)
+        end = until
+        if self.step_size is None:
+            self.step_size = self._initial_step(t, y, f0, until)
+        hybrid = self.hybrid_threshold is not None
+        while t < end:
+            h = min(self.step_size, end - t)
+            y_new, f_new, error = self._step(t, y, f0, h)
+            if error <= 1.0:
+                t = end if h == end - t else t + h
+                y = y_new
+                f0 = f_new
+                self.steps += 1
+                extinct = y[:self.size] < 0.5
+                if extinct.any():
+                    y[:self.size][extinct] = 0.0
+                    f0 = self.derivatives(t, y)
+                self.y = y
+                if hybrid and end == until and self._below_threshold():
+                    # El motor estocástico avanza por días: se integra hasta el próximo día entero
+                    end = min(until, math.ceil(t))
+            else:
+                self.rejected += 1
+            # Control de paso estándar (orden 5), con límites de crecimiento y reducción
+            factor = 0.9 * error ** -0.2 if error > 0 else 5.0
+            h_next = h * min(5.0, max(0.2, factor))
+            if error <= 1.0 and h < self.step_size:
+                # Un paso recortado para caer en `end` no achica el siguiente
+                h_next = max(h_next, self.step_size)
+            self.step_size = h_next
+        self.now = int(round(t))
+
+    def _switch(self):
+        """Pasa la corrida al motor vectorizado desde el estado actual."""
+        self.sync_states()
+        self.stochastic = VectorizedEngine(self.simulation, now=self.now)
+        self.switched_at = self.now
+
+    def sync_states(self):
+        """Copia el estado a los registros de la simulación (individuos redondeados)."""
+        if self.stochastic is not None:
+            self.stochastic.sync_states()
+            return
+        quantity = self.quantities().tolist()
+        energy = self.y[self.size:2 * self.size].tolist()
+        for i, organism in enumerate(self.simulation.organisms):
+            organism.initial_energy = energy[i]
+            organism.quantity = quantity[i]
+        self.simulation.environment.resources = float(self.y[-1])
+
+    def stats(self):
+        return {"steps": self.steps, "rejected_steps": self.rejected, "evaluations": self.evaluations,
+                "hybrid_threshold": self.hybrid_threshold, "switched_at": self.switched_at}
@@ -0,0 +1,75 @@
+"""Actualización del esquema de una base creada con una versión anterior.
+
+`create_all` crea las tablas que faltan pero no toca las que ya existen, así que las
+columnas agregadas después a una tabla existente se agregan acá con ALTER TABLE (junto
+con sus índices). Solo se listan columnas que admiten NULL: las filas viejas quedan sin
+valor.
+
+La API lo corre al arrancar; también se puede correr a mano antes de actualizar:
+
+    DATABASE=postgresql://... python -m ecosistemsimulator.migrations
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from .database import Base, engine as default_engine
+from .models import Lifecycle, PopulationHistory
+
+logger = logging.getLogger(__name__)
+
+# Columnas agregadas a tablas que ya existían, en el orden en que se agregaron
+ADDED_COLUMNS = [
+    PopulationHistory.__table__.c.run_id,
+    PopulationHistory.__table__.c.sim_time,
+    Lifecycle.__table__.c.run_id,
+]
+
+
+def missing_columns(engine):
+    """Columnas de ADDED_COLUMNS que faltan en las tablas existentes de la base."""
+    inspector = inspect(engine)
+    existing = {}
+    missing = []
+    for column in ADDED_COLUMNS:
+        table = column.table.name
+        if table not in existing:
+            existing[table] = ({c["name"] for c in inspector.get_columns(table)}
+                               if inspector.has_table(table) else None)
+        # Una tabla que no existe la crea create_all con todas sus columnas
+        if existing[table] is not None and column.name not in existing[table]:
+            missing.append(column)
+    return missing
+
+
+def add_column_sql(column, dialect):
+    """ALTER TABLE que agrega `column` (con su clave foránea) a su tabla."""
+    preparer = dialect.identifier_preparer
+    sql = f"ALTER TABLE {preparer.format_table(column.table)} ADD COLUMN {CreateColumn(column).compile(dialect=dialect)}"
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        sql += f" REFERENCES {preparer.format_table(target.table)} ({preparer.format_column(target)})"
+    return sql
+
+
+def upgrade_schema(engine=None):
+    """Crea las tablas que faltan y agrega las columnas nuevas; devuelve las agregadas."""
+    engine = engine or default_engine
+    Base.metadata.create_all(bind=engine)
+    added = missing_columns(engine)
+    with engine.begin() as connection:
+        for column in added:
+            connection.execute(text(add_column_sql(column, engine.dialect)))
+            for index in column.table.indexes:
+                if column.name in index.columns:
+                    index.create(connection, checkfirst=True)
+            logger.info("Columna %s.%s agregada", column.table.name, column.name)
+    return [f"{column.table.name}.{column.name}" for column in added]
+
+
+if __name__ == "__main__":
+    from .logs import configure_logging
+
+    configure_logging()
+    print("\n".join(upgrade_schema()) or "El esquema ya está al día")
@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float,DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Float,DateTime,BigInteger,LargeBinary,Index
 from sqlalchemy.orm import relationship
 from .database import Base  # Asegúrate de que esta ruta es correcta
+from .logs import EVENTS_LOGGER
 from datetime import datetime
+import logging
+
+event_logger = logging.getLogger(EVENTS_LOGGER)
 # Tabla de Entornos (Environment)
 class Environment(Base):
     __tablename__ = "environments"  # Nombre de la tabla en plural
@@ -29,6 +33,7 @@ class Lifecycle(Base):
     energy=Column(Float, nullable=False)
     quantity=Column(Integer, nullable=False)
     timestamp = Column(Float, nullable=False)  # Tiempo del evento en la simulación
+    run_id = Column(Integer, ForeignKey('simulation_runs.id'), nullable=True, index=True)  # Corrida que generó el evento
 
     # Relación con la tabla Organisms
     organism = relationship("Organisms", back_populates="lifecycle_events")
@@ -44,7 +49,7 @@ class Organisms(Base):
     death_rate = Column(Float, nullable=False)  # Tasa de mortalidad por individuo/año
     initial_energy = Column(Float, nullable=False)  # Energía inicial por individuo
     quantity = Column(Integer, nullable=False)  # Cantidad de individuos en la población inicial
-    environment_id = Column(Integer, ForeignKey('environments.id'), nullable=True)  # Relación con el entorno
+    environment_id = Column(Integer, ForeignKey('environments.id'), nullable=True, index=True)  # Relación con el entorno
     growth_rate = Column(Float, nullable=True)  # Tasa de crecimiento en función de los recursos disponibles
     energy_consumption_rate = Column(Float, nullable=True)  # Energía consumida por día por cada individuo
     reproduction_season = Column(String, nullable=True)  # Temporada de reproducción (Ej: primavera, todo el año)
@@ -68,7 +73,7 @@ class Organisms(Base):
         self.initial_energy -= amount
         if self.initial_energy < self.min_energy_for_health:
             self.is_sick = True
-            print(f"{self.name} se ha enfermado por falta de energía.")
+            event_logger.debug("%s se ha enfermado por falta de energía.", self.name, extra={"organism_id": self.id})
         if self.initial_energy <= 0:
             return True  # El organismo ha muerto
         return False
@@ -81,6 +86,8 @@ class PopulationHistory(Base):
     plant_population = Column(Integer, nullable=False)  # Cantidad de plantas
     herbivore_population = Column(Integer, nullable=False)  # Cantidad de herbívoros
     predator_population = Column(Integer, nullable=False)  # Cantidad de depredadores
+    run_id = Column(Integer, ForeignKey('simulation_runs.id'), nullable=True, index=True)  # Corrida que generó el punto
+    sim_time = Column(Float, nullable=True)  # Día simulado del punto
     
     # Relación con el entorno
     environment = relationship("Environment", back_populates="population_history")
@@ -92,11 +99,51 @@ class Interactions(Base):
     __tablename__ = "interactions"
     
     id = Column(Integer, primary_key=True, index=True)
-    prey_id = Column(Integer, ForeignKey('organisms.id'), nullable=False)     # Presa
-    predator_id = Column(Integer, ForeignKey('organisms.id'), nullable=False) # Depredador
+    prey_id = Column(Integer, ForeignKey('organisms.id'), nullable=False, index=True)     # Presa
+    predator_id = Column(Integer, ForeignKey('organisms.id'), nullable=False, index=True) # Depredador
     interaction_type = Column(String, index=True, nullable=False)  # Ej: Depredación, Competencia, Simbiosis
     interaction_rate = Column(Float, nullable=False)               # Tasa de interacción
 
     # Relaciones con Organisms
     prey = relationship("Organisms", foreign_keys=[prey_id], back_populates="interactions_as_prey")
     predator = relationship("Organisms", foreign_keys=[predator_id], back_populates="interactions_as_predator")
+
+
+class SimulationRun(Base):
+    __tablename__ = "simulation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    environment_id = Column(Integer, ForeignKey('environments.id'), nullable=False, index=True)
+    engine = Column(String, nullable=False)  # "simpy" o "vectorized"
+    seed = Column(BigInteger, nullable=False)  # Semilla de los flujos aleatorios de la corrida
+    start_time = Column(Float, nullable=False)  # Reloj simulado al empezar (distinto de 0 si se reanudó)
+    simulation_time = Column(Float, nullable=False)  # Día simulado hasta el que se corrió
+    status = Column(String, nullable=False)  # running, completed, failed o cancelled
+    initial_state = Column(LargeBinary, nullable=False)  # Organismos y entorno al empezar (JSON comprimido)
+    initial_snapshot = Column(LargeBinary, nullable=True)  # Checkpoint desde el que se reanudó, si corresponde
+    digest = Column(String, nullable=True)  # SHA-256 del estado final y la trayectoria
+    events = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class PopulationRollup(Base):
+    """Resumen de la historia de una corrida en intervalos de `resolution` días."""
+    __tablename__ = "population_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey('simulation_runs.id'), nullable=False)
+    resolution = Column(Integer, nullable=False)  # Días por intervalo (10, 100, ...)
+    bucket_start = Column(Float, nullable=False)  # Primer día del intervalo
+    points = Column(Integer, nullable=False)  # Días registrados en el intervalo
+    plant_min = Column(Integer, nullable=False)
+    plant_max = Column(Integer, nullable=False)
+    plant_mean = Column(Float, nullable=False)
+    herbivore_min = Column(Integer, nullable=False)
+    herbivore_max = Column(Integer, nullable=False)
+    herbivore_mean = Column(Float, nullable=False)
+    predator_min = Column(Integer, nullable=False)
+    predator_max = Column(Integer, nullable=False)
+    predator_mean = Column(Float, nullable=False)
+
+    __table_args__ = (Index("ix_population_rollups_run_resolution_start", "run_id", "resolution", "bucket_start"),)
@@ -0,0 +1,281 @@
+"""Instrumentación del bucle de simulación y métricas en formato Prometheus.
+
+Con `EcosystemSimulation(..., profile=True)` cada corrida mide el tiempo exclusivo de
+cada fase (scheduling, growth, grazing, predation, metabolism, reproduction, death,
+event_logging, history, callbacks, checkpoint, save_state y db), cuenta los eventos
+por tipo y arma un histograma de latencia de las sentencias SQL. Sin `profile` la
+simulación usa NullProfiler, cuyos métodos no hacen nada.
+"""
+import cProfile
+import os
+import pstats
+import threading
+import time
+from collections import Counter, defaultdict
+from sqlalchemy import event
+
+# Límites superiores (en segundos) del histograma de latencia de la base
+DB_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+# Funciones que se listan del perfil de cProfile
+CAPTURE_TOP_FUNCTIONS = 15
+
+
+class LatencyHistogram:
+    """Histograma acumulable de latencias con los límites de DB_LATENCY_BUCKETS."""
+
+    def __init__(self, buckets=DB_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # el último es +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, data):
+        """Suma un histograma exportado con to_dict()."""
+        for i, count in enumerate(data["counts"]):
+            self.counts[i] += count
+        self.count += data["count"]
+        self.sum += data["sum"]
+
+    def to_dict(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "count": self.count,
+                "sum": round(self.sum, 6)}
+
+
+class NullProfiler:
+    """Profiler deshabilitado: la simulación lo llama igual, pero no mide nada."""
+
+    enabled = False
+
+    def enter(self, phase):
+        pass
+
+    def exit(self):
+        pass
+
+    def count_events(self, event_type, count=1):
+        pass
+
+    def start(self, db_session=None):
+        pass
+
+    def stop(self):
+        pass
+
+    def summary(self):
+        return None
+
+
+class SimulationProfiler(NullProfiler):
+    """Tiempos exclusivos por fase, eventos por tipo y latencia de la base de una corrida.
+
+    Las fases se anidan en una pila: al entrar en una fase el tiempo transcurrido se
+    carga a la fase que estaba activa, así cada segundo se cuenta una sola vez (por
+    ejemplo, el registro de eventos dentro de la caza no se suma a "predation").
+    La fase "db" es el tiempo dentro del driver; se mide con los eventos del motor de
+    SQLAlchemy y solo cuenta las sentencias del hilo de la simulación.
+    """
+
+    enabled = True
+
+    def __init__(self, capture_path=None):
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self.events = Counter()
+        self.db_latency = LatencyHistogram()
+        self.capture_path = capture_path
+        self._stack = []
+        self._mark = None
+        self._thread = None
+        self._bind = None
+        self._statement_started = []
+        self._profile = None
+        self._started = None
+        self._elapsed = None
+
+    def enter(self, phase):
+        now = time.perf_counter()
+        if self._stack:
+            self.seconds[self._stack[-1]] += now - self._mark
+        self._stack.append(phase)
+        self.calls[phase] += 1
+        self._mark = now
+
+    def exit(self):
+        now = time.perf_counter()
+        self.seconds[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    def count_events(self, event_type, count=1):
+        self.events[event_type] += count
+
+    def start(self, db_session=None):
+        """Empieza a medir la corrida (y las sentencias de `db_session`, si hay base)."""
+        self._thread = threading.get_ident()
+        if db_session is not None:
+            self._bind = db_session.get_bind()
+            event.listen(self._bind, "before_cursor_execute", self._before_execute)
+            event.listen(self._bind, "after_cursor_execute", self._after_execute)
+            event.listen(self._bind, "handle_error", self._on_error)
+        if self.capture_path:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self._elapsed = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+            directory = os.path.dirname(self.capture_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._profile.dump_stats(self.capture_path)
+        if self._bind is not None:
+            event.remove(self._bind, "before_cursor_execute", self._before_execute)
+            event.remove(self._bind, "after_cursor_execute", self._after_execute)
+            event.remove(self._bind, "handle_error", self._on_error)
+            self._bind = None
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() != self._thread:
+            return
+        self.enter("db")
+        self._statement_started.append(self._mark)
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() != self._thread or not self._statement_started:
+            return
+        self.db_latency.observe(time.perf_counter() - self._statement_started.pop())
+        self.exit()
+
+    def _on_error(self, context):
+        if threading.get_ident() == self._thread and self._statement_started:
+            self._statement_started.pop()
+            self.exit()
+
+    def _capture_summary(self):
+        stats = pstats.Stats(self.capture_path)
+        top = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:CAPTURE_TOP_FUNCTIONS]:
+            top.append({"function": f"{os.path.basename(filename)}:{line}({function})", "calls": calls,
+                        "own_seconds": round(own, 6), "cumulative_seconds": round(cumulative, 6)})
+        return {"path": self.capture_path, "top": top}
+
+    def summary(self):
+        """Resumen de la corrida que se agrega al resultado (clave "profile")."""
+        measured = sum(self.seconds.values())
+        elapsed = self._elapsed if self._elapsed is not None else measured
+        return {
+            "elapsed_seconds": round(elapsed, 6),
+            "phases": {
+                phase: {"seconds": round(seconds, 6), "calls": self.calls[phase],
+                        "share": round(seconds / elapsed, 4) if elapsed else None}
+                for phase, seconds in sorted(self.seconds.items(), key=lambda item: item[1], reverse=True)
+            },
+            "unattributed_seconds": round(max(elapsed - measured, 0.0), 6),
+            "events_by_type": dict(self.events),
+            "db_latency": self.db_latency.to_dict(),
+            "capture": self._capture_summary() if self._profile is not None else None,
+        }
+
+
+class SimulationMetrics:
+    """Acumula los resúmenes de las corridas del proceso para el endpoint /metrics."""
+
+    def __init__(self):
+        self.runs = Counter()
+        self.events = Counter()
+        self.phase_seconds = defaultdict(float)
+        self.phase_calls = Counter()
+        self.db_latency = LatencyHistogram()
+        self.simulated_days = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, summary, status="completed"):
+        """Suma el resumen de una corrida (con o sin "profile")."""
+        with self._lock:
+            self.runs[(summary.get("engine", "unknown"), status)] += 1
+            self.simulated_days += summary.get("simulation_time", 0) or 0
+            profile = summary.get("profile")
+            if not profile:
+                self.events["all"] += summary.get("events", 0) or 0
+                return
+            for event_type, count in profile["events_by_type"].items():
+                self.events[event_type] += count
+            for phase, data in profile["phases"].items():
+                self.phase_seconds[phase] += data["seconds"]
+                self.phase_calls[phase] += data["calls"]
+            self.db_latency.merge(profile["db_latency"])
+
+    def render(self, pool_stats=(), job_stats=None, read_cache_stats=None):
+        """Texto en el formato de exposición de Prometheus."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{value_}"' for key, value_ in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self._lock:
+            metric("ecosim_runs_total", "counter", "Corridas terminadas por motor y estado",
+                   [({"engine": engine, "status": status}, count) for (engine, status), count in self.runs.items()])
+            metric("ecosim_simulated_days_total", "counter", "Días simulados", [({}, self.simulated_days)])
+            metric("ecosim_events_total", "counter", "Eventos del ciclo de vida por tipo",
+                   [({"type": event_type}, count) for event_type, count in self.events.items()])
+            metric("ecosim_phase_seconds_total", "counter", "Tiempo exclusivo por fase de la simulación",
+                   [({"phase": phase}, round(seconds, 6)) for phase, seconds in self.phase_seconds.items()])
+            metric("ecosim_phase_calls_total", "counter", "Veces que se entró a cada fase",
+                   [({"phase": phase}, count) for phase, count in self.phase_calls.items()])
+            histogram = self.db_latency
+            cumulative = 0
+            samples = []
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                samples.append(({"le": bound}, cumulative))
+            metric("ecosim_db_statement_seconds_bucket", "histogram",
+                   "Latencia de las sentencias SQL de las simulaciones perfiladas", samples)
+            lines.append(f"ecosim_db_statement_seconds_sum {round(histogram.sum, 6)}")
+            lines.append(f"ecosim_db_statement_seconds_count {histogram.count}")
+
+        pools = list(pool_stats)
+        metric("ecosim_db_pool_checked_out", "gauge", "Conexiones en uso por pool",
+               [({"pool": p["pool"]}, p["checked_out"]) for p in pools if p["checked_out"] is not None])
+        metric("ecosim_db_pool_checkouts_total", "counter", "Checkouts por pool",
+               [({"pool": p["pool"]}, p["checkouts"]) for p in pools])
+        metric("ecosim_db_pool_timeouts_total", "counter", "Esperas de conexión agotadas por pool",
+               [({"pool": p["pool"]}, p["timeouts"]) for p in pools])
+        metric("ecosim_db_pool_wait_seconds_max", "gauge", "Mayor espera por una conexión",
+               [({"pool": p["pool"]}, p["max_wait_ms"] / 1000) for p in pools])
+        if job_stats is not None:
+            metric("ecosim_jobs", "gauge", "Trabajos de simulación por estado",
+                   [({"status": status}, count) for status, count in job_stats["jobs"].items()])
+            metric("ecosim_job_worker_utilization", "gauge", "Workers ocupados / workers",
+                   [({}, job_stats["worker_utilization"])])
+        if read_cache_stats is not None:
+            metric("ecosim_read_cache_lookups_total", "counter", "Búsquedas en la caché de lecturas por resultado",
+                   [({"result": "hit"}, read_cache_stats["hits"]), ({"result": "miss"}, read_cache_stats["misses"])])
+            metric("ecosim_read_cache_not_modified_total", "counter", "Respuestas 304 por If-None-Match",
+                   [({}, read_cache_stats["not_modified"])])
+            metric("ecosim_read_cache_evictions_total", "counter", "Respuestas desalojadas por el tope de tamaño",
+                   [({}, read_cache_stats["evictions"])])
+            metric("ecosim_read_cache_entries", "gauge", "Respuestas guardadas en la caché de lecturas",
+                   [({}, read_cache_stats["entries"])])
+            metric("ecosim_read_cache_bytes", "gauge", "Bytes de las respuestas guardadas en la caché de lecturas",
+                   [({}, read_cache_stats["size_bytes"])])
+        return "\n".join(lines) + "\n"
+
+
+# Métricas de las corridas de este proceso (las de los workers llegan con el resultado del trabajo)
+simulation_metrics = SimulationMetrics()
@@ -0,0 +1,153 @@
+"""Caché en memoria de las respuestas de lectura de entornos y organismos.
+
+Guarda el JSON ya serializado de `GET /environments/{id}`, `GET /environments/{id}/organisms/`
+y `GET /organisms/{id}` junto con su ETag (hash del cuerpo). Cada entrada vive
+READ_CACHE_TTL segundos y, al superar READ_CACHE_MAX_BYTES, se desalojan las usadas
+hace más tiempo (LRU).
+
+Las entradas quedan asociadas al entorno de la respuesta: las escrituras de la API y
+las simulaciones que guardan su estado borran las de los entornos que tocan con
+`invalidate_environment`. Una lectura que empezó antes de una invalidación no guarda su
+resultado (`token`), así una respuesta vieja no vuelve a entrar a la caché.
+
+Variables de entorno:
+
+    READ_CACHE_TTL         segundos que vive una entrada (5 por defecto)
+    READ_CACHE_MAX_BYTES   tamaño máximo de las respuestas guardadas (16 MiB por defecto; 0 la desactiva)
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", 5))
+READ_CACHE_MAX_BYTES = int(os.getenv("READ_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+
+def etag(body):
+    """ETag fuerte de un cuerpo de respuesta."""
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+class CachedResponse:
+    """Cuerpo serializado de una respuesta con su ETag y sus cabeceras."""
+
+    def __init__(self, body, environment_id, headers=None, expires=None):
+        self.body = body
+        self.etag = etag(body)
+        self.environment_id = environment_id
+        self.headers = dict(headers or {}, ETag=self.etag)
+        self.expires = expires
+        self.size = len(body) + sum(len(name) + len(value) for name, value in self.headers.items())
+
+    def matches(self, if_none_match):
+        """Si la cabecera If-None-Match del cliente incluye esta versión."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # Comparación débil (RFC 9110): W/"x" y "x" son la misma versión
+        return any(tag.strip().removeprefix("W/") == self.etag for tag in if_none_match.split(","))
+
+
+class ReadCache:
+    """Respuestas serializadas por clave, con TTL, tope de tamaño y desalojo LRU."""
+
+    def __init__(self, ttl=None, max_bytes=None):
+        self.ttl = READ_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = READ_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._by_environment = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.size_bytes -= entry.size
+        keys = self._by_environment.get(entry.environment_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_environment[entry.environment_id]
+
+    def get(self, key):
+        """Respuesta vigente guardada con `key`, o None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def token(self):
+        """Marca a pasar a `put`: si hubo invalidaciones en el medio, la respuesta no se guarda."""
+        return self.invalidations
+
+    def put(self, key, environment_id, body, headers=None, token=None):
+        """Guarda `body` (bytes) y devuelve la entrada, se haya guardado o no."""
+        entry = CachedResponse(body, environment_id, headers, time.monotonic() + self.ttl)
+        if not self.enabled or entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            if token is not None and token != self.invalidations:
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._by_environment.setdefault(environment_id, set()).add(key)
+            self.size_bytes += entry.size
+            while self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def revalidated(self):
+        """Cuenta una respuesta 304 (el cliente ya tenía la versión vigente)."""
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate_environment(self, environment_id):
+        """Borra las respuestas de un entorno y de sus organismos; devuelve cuántas se borraron."""
+        with self._lock:
+            self.invalidations += 1
+            keys = list(self._by_environment.get(environment_id, ()))
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += 1
+            self._entries.clear()
+            self._by_environment.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "size_bytes": self.size_bytes, "max_bytes": self.max_bytes,
+                    "ttl": self.ttl, "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                    "not_modified": self.not_modified, "evictions": self.evictions,
+                    "expirations": self.expirations, "invalidations": self.invalidations}
+
+
+# Caché del proceso de la API (los workers de simulación no sirven lecturas)
+read_cache = ReadCache()
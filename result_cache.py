@@ -0,0 +1,237 @@
+"""Caché en disco de resultados de simulación direccionada por contenido.
+
+La clave es el SHA-256 de todo lo que determina una corrida: parámetros del entorno y
+de cada organismo, red trófica, días simulados, semilla, motor, superficie por celda,
+intervalo de muestreo, clases de edad y umbral del modo híbrido de campo medio (el
+modo de avance del tiempo no cambia el resultado).
+Dos pedidos con la misma clave dan el mismo resultado bit a bit, así que el segundo
+se responde desde el disco sin ejecutar EcosystemSimulation.
+
+Cada entrada es un archivo `<environment_id>_<clave>.json.z` (JSON comprimido) con el
+resumen, la trayectoria diaria y el estado final. Leer una entrada actualiza su mtime
+y al superar RESULT_CACHE_MAX_BYTES se borran las de mtime más viejo (LRU).
+
+Cambiar el entorno, un organismo o una interacción cambia la clave, así que una
+entrada nunca responde por entradas distintas y las escrituras no la borran: si la API
+restaura el estado de antes (por ejemplo, para repetir una corrida), la entrada vuelve
+a servir. Solo al borrar un entorno se borran sus entradas con `invalidate_environment`.
+
+Variables de entorno:
+
+    RESULT_CACHE_DIR         directorio de la caché ("result_cache" por defecto)
+    RESULT_CACHE_MAX_BYTES   tamaño máximo en bytes (256 MiB por defecto; 0 la desactiva)
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from operator import itemgetter
+from .state import ORGANISM_FIELDS
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "result_cache")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Cambia cuando cambian las reglas de la simulación o el formato de las entradas
+CACHE_VERSION = 2
+SUFFIX = ".json.z"
+
+
+def cache_key(organisms, environment, interactions, simulation_time, seed, engine="simpy", cell_area=None,
+              sample_every=1, age_bins=None, hybrid_threshold=None):
+    """SHA-256 (hex) de las entradas de una corrida; `interactions` son aristas [predator_id, prey_id, rate]."""
+    # Los organismos van como filas en el orden de ORGANISM_FIELDS: con miles de
+    # poblaciones armar y ordenar un dict por fila duplica el costo de la clave
+    rows = sorted(([getattr(organism, name) for name in ORGANISM_FIELDS] for organism in organisms),
+                  key=itemgetter(ORGANISM_FIELDS.index("id")))
+    data = {
+        "version": CACHE_VERSION,
+        "environment": environment.to_dict(),
+        "organism_fields": ORGANISM_FIELDS,
+        "organisms": rows,
+        "interactions": sorted(list(edge) for edge in interactions),
+        "simulation_time": simulation_time,
+        "seed": seed,
+        "engine": engine,
+        "cell_area": cell_area,
+        "sample_every": sample_every,
+        "age_bins": age_bins,
+        "hybrid_threshold": hybrid_threshold,
+    }
+    # repr de los float es exacto: la misma entrada da siempre el mismo texto
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def simulation_key(simulation, simulation_time):
+    """Clave de una simulación todavía sin correr (con su red trófica ya leída)."""
+    return cache_key(simulation.organisms, simulation.environment, simulation.food_web.to_list(),
+                     simulation_time, simulation.seed, simulation.engine, simulation.cell_area,
+                     simulation.sample_every, simulation.age_bins,
+                     simulation.hybrid_threshold)
+
+
+def _json_default(value):
+    # Escalares de NumPy de los motores vectorizado y espacial
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"No se puede guardar en la caché: {type(value).__name__}")
+
+
+class ResultCache:
+    """Resultados de corridas en archivos de `directory`, con tope de tamaño y desalojo LRU."""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or RESULT_CACHE_DIR
+        self.max_bytes = RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _entries(self):
+        """(ruta, tamaño, mtime) de cada entrada."""
+        try:
+            scan = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+        entries = []
+        for entry in scan:
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Otro proceso la borró
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def path(self, key, environment_id):
+        return os.path.join(self.directory, f"{environment_id}_{key}{SUFFIX}")
+
+    def get(self, key, environment_id):
+        """Resultado guardado con `key`, o None si no está."""
+        if not self.enabled:
+            return None
+        path = self.path(key, environment_id)
+        try:
+            with open(path, "rb") as handle:
+                result = json.loads(zlib.decompress(handle.read()))
+            # El mtime marca el último uso para el desalojo
+            os.utime(path)
+        except (OSError, ValueError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key, environment_id, result):
+        """Guarda `result` (serializable a JSON) de forma atómica y desaloja lo que sobre."""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key, environment_id)
+        data = zlib.compress(json.dumps(result, default=_json_default).encode(), 6)
+        if len(data) > self.max_bytes:
+            return
+        # Nombre temporal por proceso: varios workers pueden guardar la misma clave a la vez
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as handle:
+            handle.write(data)
+        os.replace(temporary, path)
+        self.evict()
+
+    def evict(self):
+        """Borra las entradas usadas hace más tiempo hasta quedar bajo `max_bytes`."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def invalidate_environment(self, environment_id):
+        """Borra las entradas de un entorno; devuelve cuántas se borraron."""
+        removed = 0
+        for path, _, _ in self._entries():
+            if os.path.basename(path).startswith(f"{environment_id}_"):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        if removed:
+            logger.info("Caché de resultados: %s entradas invalidadas", removed,
+                        extra={"environment_id": environment_id})
+        return removed
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        entries = self._entries()
+        return {"directory": self.directory, "entries": len(entries),
+                "size_bytes": sum(size for _, size, _ in entries), "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def run_cached(simulation, simulation_time, cache, cacheable=True):
+    """Corre `simulation` o devuelve el resultado guardado para sus mismas entradas.
+
+    Con acierto el estado final guardado se escribe en la base (como lo haría la
+    corrida) y se devuelve el resumen original con "cached": True y la trayectoria
+    diaria. `cacheable` es False para corridas que no se pueden repetir (sin semilla
+    explícita, perfiladas, con checkpoints o con salida a archivos).
+    """
+    if cache is None or not cache.enabled or not cacheable:
+        return simulation.run(simulation_time)
+    simulation.refresh_food_web()
+    key = simulation_key(simulation, simulation_time)
+    cached = cache.get(key, simulation.environment_id)
+    if cached is not None:
+        apply_final_state(simulation, cached["final_state"])
+        logger.info("Resultado del entorno %s leído de la caché", simulation.environment_id,
+                    extra={"environment_id": simulation.environment_id, "run_id": cached["summary"]["run_id"]})
+        return dict(cached["summary"], cached=True, cache_key=key, trajectory=cached["trajectory"])
+    summary = simulation.run(simulation_time)
+    cache.put(key, simulation.environment_id, {
+        "summary": summary,
+        "trajectory": {"sim_time": simulation.sample_times, "population": simulation.trajectory},
+        "final_state": {"organisms": [[organism.id, organism.initial_energy, organism.quantity]
+                                      for organism in simulation.organisms],
+                        "resources": simulation.environment.resources},
+    })
+    return dict(summary, cached=False, cache_key=key)
+
+
+def apply_final_state(simulation, final_state):
+    """Deja a la simulación (y a la base, si tiene) en el estado final de una entrada."""
+    by_id = {organism.id: organism for organism in simulation.organisms}
+    for organism_id, energy, quantity in final_state["organisms"]:
+        organism = by_id[organism_id]
+        organism.initial_energy = energy
+        organism.quantity = quantity
+    simulation.environment.resources = final_state["resources"]
+    if simulation.db_session is not None:
+        simulation.save_state()
+
+
+# Caché de los procesos de esta instalación (la API y los workers comparten el directorio)
+result_cache = ResultCache()
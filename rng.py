@@ -0,0 +1,89 @@
+import secrets
+import numpy as np
+
+# Constantes de SplitMix64
+MASK64 = (1 << 64) - 1
+GAMMA = 0x9E3779B97F4A7C15
+MIX1 = 0xBF58476D1CE4E5B9
+MIX2 = 0x94D049BB133111EB
+# 2**-53: convierte los 53 bits altos en un float en [0, 1)
+UNIT = 1.0 / (1 << 53)
+
+
+def new_seed():
+    """Semilla aleatoria para una simulación a la que no se le indicó una (63 bits)."""
+    return secrets.randbits(63)
+
+
+def mix64(value):
+    """Función de mezcla de SplitMix64 sobre un entero de 64 bits."""
+    z = value & MASK64
+    z = ((z ^ (z >> 30)) * MIX1) & MASK64
+    z = ((z ^ (z >> 27)) * MIX2) & MASK64
+    return z ^ (z >> 31)
+
+
+def stream_key(seed, organism_id):
+    """Clave del flujo de una población: depende solo de la semilla y del id."""
+    return mix64(mix64(seed) + organism_id)
+
+
+def stream_keys(seed, organism_ids):
+    """`stream_key` para un arreglo de ids (uint64)."""
+    return np.array([stream_key(seed, organism_id) for organism_id in organism_ids], dtype=np.uint64)
+
+
+class PopulationStream:
+    """Generador propio de una población.
+
+    El n-ésimo número del flujo es `mix64(clave + n * GAMMA)`, así que el estado se
+    reduce a la cantidad de números ya usados (`draws`). Los dos motores obtienen la
+    misma secuencia para cada población sin importar en qué orden se procesen, y un
+    checkpoint solo necesita guardar `draws`.
+    """
+
+    __slots__ = ("key", "draws")
+
+    def __init__(self, key, draws=0):
+        self.key = key
+        self.draws = draws
+
+    def random(self):
+        self.draws += 1
+        z = (self.key + self.draws * GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * MIX1) & MASK64
+        z = ((z ^ (z >> 27)) * MIX2) & MASK64
+        return ((z ^ (z >> 31)) >> 11) * UNIT
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def randint(self, a, b):
+        """Entero en [a, b], ambos incluidos."""
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, sequence):
+        return sequence[int(self.random() * len(sequence))]
+
+
+def stream_values(keys, draws):
+    """Número `draws` de cada flujo (arreglos uint64), igual al de PopulationStream.random()."""
+    # Operaciones en el lugar: con millones de flujos (motor espacial) evita los temporales
+    z = keys + draws * np.uint64(GAMMA)
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(MIX1)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(MIX2)
+    z ^= z >> np.uint64(31)
+    z >>= np.uint64(11)
+    values = z.astype(np.float64)
+    values *= UNIT
+    return values
+
+
+def mix64_array(values):
+    """`mix64` sobre un arreglo uint64."""
+    z = values.astype(np.uint64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(MIX1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(MIX2)
+    return z ^ (z >> np.uint64(31))
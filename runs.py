@@ -0,0 +1,81 @@
+import json
+import zlib
+import hashlib
+from datetime import datetime
+import numpy as np
+from sqlalchemy import update
+from .models import SimulationRun
+from .state import EnvironmentState, OrganismState
+
+RUN_STATUSES = ("running", "completed", "failed", "cancelled")
+# Columnas de SimulationRun que se devuelven en la API (sin los estados binarios)
+RUN_FIELDS = ("id", "environment_id", "engine", "seed", "start_time", "simulation_time", "status",
+              "digest", "events", "created_at", "finished_at")
+
+
+def encode_initial_state(organisms, environment, interactions=(), settings=None):
+    """Registros con los que empieza una corrida, comprimidos para guardarlos en SimulationRun.
+
+    `interactions` son las aristas de la red trófica como [predator_id, prey_id, rate] y
+    `settings` las opciones que cambian el digest además de motor y semilla (`sample_every`,
+    `age_bins`, `hybrid_threshold`).
+    """
+    data = {"environment": environment.to_dict(), "organisms": [organism.to_dict() for organism in organisms],
+            "interactions": list(interactions), "settings": settings or {}}
+    return zlib.compress(json.dumps(data).encode(), 6)
+
+
+def decode_initial_state(data):
+    """Devuelve (organismos, entorno, aristas de la red trófica, opciones) a partir de `encode_initial_state`."""
+    data = json.loads(zlib.decompress(data))
+    return ([OrganismState(**organism) for organism in data["organisms"]], EnvironmentState(**data["environment"]),
+            data.get("interactions", []), data.get("settings", {}))
+
+
+def state_digest(organisms, environment, trajectory, now):
+    """SHA-256 del estado final y de la trayectoria diaria.
+
+    Dos corridas dan el mismo digest solo si coinciden bit a bit.
+    """
+    digest = hashlib.sha256()
+    digest.update(np.array([organism.id for organism in organisms], dtype=np.int64).tobytes())
+    digest.update(np.array([organism.initial_energy for organism in organisms], dtype=np.float64).tobytes())
+    digest.update(np.array([organism.quantity for organism in organisms], dtype=np.int64).tobytes())
+    digest.update(np.array([environment.resources, now], dtype=np.float64).tobytes())
+    digest.update(np.array(trajectory, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def start_run(db_session, simulation, simulation_time):
+    """Registra el comienzo de una corrida con su semilla y su estado inicial; devuelve el id."""
+    snapshot = simulation.restored_snapshot
+    run = SimulationRun(
+        environment_id=simulation.environment_id,
+        engine=simulation.engine,
+        seed=simulation.seed,
+        start_time=simulation.env.now,
+        simulation_time=simulation_time,
+        status="running",
+        initial_state=encode_initial_state(simulation.organisms, simulation.environment,
+                                           simulation.food_web.to_list(),
+                                           {"sample_every": simulation.sample_every, "age_bins": simulation.age_bins,
+                                            "hybrid_threshold": simulation.hybrid_threshold}),
+        initial_snapshot=snapshot.to_bytes() if snapshot is not None else None,
+    )
+    db_session.add(run)
+    db_session.commit()
+    return run.id
+
+
+def finish_run(db_session, run_id, status, digest=None, events=None):
+    """Guarda el estado final de una corrida (completed, failed o cancelled)."""
+    db_session.execute(
+        update(SimulationRun)
+        .where(SimulationRun.id == run_id)
+        .values(status=status, digest=digest, events=events, finished_at=datetime.utcnow())
+    )
+    db_session.commit()
+
+
+def run_to_dict(run):
+    return {name: getattr(run, name) for name in RUN_FIELDS}
@@ -28,3 +28,17 @@ class EnvironimentoCreate(BaseModel):
     humidity: float
     resources:float
     surface_area: float  # Superficie en km²
+
+
+class SweepCreate(BaseModel):
+    simulation_time: int  # Días simulados por corrida
+    grid: dict[str, list] | None = None  # Valores por parámetro; se combinan todos con todos
+    configurations: list[dict] | None = None  # Lista explícita de sobrescrituras (en lugar de grid)
+    seeds: list[int] | None = None  # Semillas de las réplicas
+    replicates: int = 1  # Réplicas con semillas 0..N-1 si no se indican seeds
+    engine: str = "simpy"
+    percentiles: list[float] = [10, 50, 90]
+
+
+class OrganismBulkUpdate(OrganismCreate):
+    id: int  # Organismo a modificar
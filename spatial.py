@@ -0,0 +1,442 @@
+"""Motor espacial: el entorno dividido en una grilla de celdas.
+
+La superficie del entorno (`surface_area`) se parte en celdas de `cell_area`. Cada
+celda tiene sus recursos y un grupo de cada población (cantidad de individuos y su
+energía). Por día, cada grupo despierta con probabilidad WAKE_PROBABILITY (en promedio
+cada 3 días, como el randint(1, 5) de los otros motores) y aplica las mismas reglas:
+las plantas crecen con los recursos de su celda, los herbívoros pastan en su celda,
+los carnívoros cazan en su vecindario de 3x3 celdas, y después vienen el metabolismo,
+la reproducción y la muerte. Al cerrar el día los animales migran a celdas vecinas y
+los recursos se difunden.
+
+El estado son arreglos (poblaciones x filas x columnas) y la propia grilla hace de
+índice espacial: el vecindario se resuelve sumando ventanas desplazadas, sin buscar
+presas en todo el entorno.
+
+Los números aleatorios dependen solo de la semilla, la población, la celda y el día.
+Por eso la grilla se puede repartir en franjas de filas entre procesos: cada franja
+avanza varios días con un margen de filas vecinas (ver halo_per_day) y el
+resultado es idéntico al de un solo proceso.
+"""
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .cohorts import check_individuals, offspring
+from .profiler import NullProfiler
+from .rng import mix64_array, stream_key, stream_values
+from .vectorized_engine import CARNIVORE, HERBIVORE, PLANT, TYPE_CODES
+
+# Superficie de cada celda, en las mismas unidades que Environment.surface_area
+CELL_AREA = float(os.getenv("SPATIAL_CELL_AREA", 1.0))
+# Procesos entre los que se reparte la grilla (1: todo en el proceso de la simulación)
+SPATIAL_WORKERS = int(os.getenv("SPATIAL_WORKERS", 1))
+# Fracción de los animales de una celda que migra por día y fracción de la diferencia
+# de recursos entre celdas vecinas que se difunde por día
+MIGRATION_RATE = float(os.getenv("SPATIAL_MIGRATION_RATE", 0.05))
+RESOURCE_DIFFUSION = 0.1
+WAKE_PROBABILITY = 1 / 3
+# Días que avanza cada franja entre intercambios de bordes cuando hay varios procesos
+DAYS_PER_EXCHANGE = 8
+# Números aleatorios por grupo y día
+SLOT_WAKE, SLOT_ACTION, SLOT_METABOLISM, SLOT_DEATH, SLOT_MIGRATION = range(5)
+DRAW_SLOTS = 5
+
+
+def grid_shape(surface_area, cell_area=CELL_AREA):
+    """(filas, columnas) de la grilla más cuadrada con al menos surface_area / cell_area celdas."""
+    if cell_area <= 0:
+        raise ValueError("cell_area debe ser mayor que 0")
+    cells = max(1, math.ceil((surface_area or 0) / cell_area))
+    rows = math.ceil(math.sqrt(cells))
+    return rows, math.ceil(cells / rows)
+
+
+def spread(quantity, cells):
+    """Reparte `quantity` individuos en `cells` celdas lo más parejo posible (sin azar)."""
+    c = np.arange(cells, dtype=np.int64)
+    return ((c + 1) * quantity) // cells - (c * quantity) // cells
+
+
+def cell_keys(seed, organism_ids, columns, row_start, row_stop):
+    """Clave del flujo de cada (población, celda) para las filas [row_start, row_stop)."""
+    cells = np.arange(row_start * columns, row_stop * columns, dtype=np.uint64).reshape(-1, columns)
+    return np.stack([mix64_array(np.uint64(stream_key(seed, organism_id)) + cells)
+                     for organism_id in organism_ids]) if organism_ids else np.zeros((0,) + cells.shape, np.uint64)
+
+
+def box_sum(values):
+    """Suma de cada celda con sus 8 vecinas (fuera de la grilla cuenta 0)."""
+    rows = values.copy()
+    rows[..., 1:, :] += values[..., :-1, :]
+    rows[..., :-1, :] += values[..., 1:, :]
+    total = rows.copy()
+    total[..., :, 1:] += rows[..., :, :-1]
+    total[..., :, :-1] += rows[..., :, 1:]
+    return total
+
+
+def _divide(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+class SpeciesParameters:
+    """Parámetros de las poblaciones como arreglos con forma (poblaciones, 1, 1)."""
+
+    def __init__(self, organisms, migration_rate=MIGRATION_RATE, prey=None):
+        def column(values):
+            return np.array(values, dtype=np.float64).reshape(-1, 1, 1)
+
+        self.types = np.array([TYPE_CODES.get(org.organism_type, -1) for org in organisms], dtype=np.int8)
+        self.growth_rate = column([org.growth_rate or 0.0 for org in organisms])
+        self.birth_rate = column([org.birth_rate for org in organisms])
+        self.death_rate = column([org.death_rate for org in organisms])
+        self.reproduction_threshold = column([org.reproduction_energy_threshold for org in organisms])
+        self.seasons = [org.reproduction_season for org in organisms]
+        # Las plantas no migran
+        self.migration_rate = column([0.0 if org.organism_type == "Plant" else migration_rate for org in organisms])
+        # Presas de cada población (posiciones): las de la red trófica o, sin red, todos los herbívoros
+        herbivores = self.of_type(HERBIVORE)
+        self.prey = prey if prey is not None else [
+            herbivores if code == CARNIVORE else [] for code in self.types.tolist()
+        ]
+
+    def halo_per_day(self):
+        """Celdas que puede recorrer un efecto en un día.
+
+        Cada especie de depredador caza por turno y su caza mira 3 vecindarios seguidos
+        (presas, presión, reparto); la migración y la difusión suman uno más.
+        """
+        hunters = sum(1 for s in self.of_type(CARNIVORE) if self.prey[s])
+        return 3 * max(hunters, 1) + 1
+
+    def of_type(self, code):
+        return np.flatnonzero(self.types == code).tolist()
+
+    def breeding(self, season):
+        return np.array([s in ("all_year", season) for s in self.seasons], dtype=bool).reshape(-1, 1, 1)
+
+
+class SpatialGrid:
+    """Recursos, cantidad y energía por celda de una grilla o de una franja de filas."""
+
+    def __init__(self, params, resources, quantity, energy, keys):
+        self.params = params
+        self.resources = resources
+        self.quantity = quantity
+        self.energy = energy
+        self.keys = keys
+        self.plants = params.of_type(PLANT)
+        self.herbivores = params.of_type(HERBIVORE)
+        self.carnivores = params.of_type(CARNIVORE)
+
+    def _random(self, slot, day, idx):
+        """Número del día para los grupos `idx` (índices planos de poblaciones x filas x columnas)."""
+        # El número de sorteo va como arreglo: NumPy solo avisa del desborde (esperado) en escalares
+        return stream_values(self.keys.reshape(-1)[idx], np.array([day * DRAW_SLOTS + slot + 1], dtype=np.uint64))
+
+    def step(self, day, season, profiler=NullProfiler()):
+        """Avanza un día; devuelve nacimientos y muertes por población y fila.
+
+        Los pasos que solo afectan a los grupos despiertos trabajan sobre sus índices
+        planos en lugar de recorrer toda la grilla.
+        """
+        q, e, resources = self.quantity, self.energy, self.resources
+        flat_q, flat_e = q.reshape(-1), e.reshape(-1)
+        rows = q.shape[0] * q.shape[1]
+        cells = q[0].size if q.shape[0] else 0
+        occupied = np.flatnonzero(flat_q > 0)
+        idx = occupied[self._random(SLOT_WAKE, day, occupied) < WAKE_PROBABILITY]
+        species = idx // cells if cells else idx
+        awake = np.zeros(q.shape, dtype=bool)
+        awake.reshape(-1)[idx] = True
+        action = np.zeros(q.shape)
+        action.reshape(-1)[idx] = self._random(SLOT_ACTION, day, idx)
+
+        profiler.enter("growth")
+        for s in self.plants:
+            e[s] += np.where(awake[s], resources * 0.1 * self.params.growth_rate[s], 0.0)
+        profiler.exit()
+
+        profiler.enter("grazing")
+        if self.herbivores:
+            has_plants = np.zeros(resources.shape, dtype=bool)
+            for s in self.plants:
+                has_plants |= (q[s] > 0) & (e[s] > 0)
+            for s in self.herbivores:
+                # Cada grupo come de los recursos de su celda, en el orden de las poblaciones
+                eating = awake[s] & has_plants
+                consumed = np.where(eating, np.minimum(resources, 0.5 + 1.5 * action[s]), 0.0)
+                e[s] += consumed
+                resources -= consumed
+                e[s] -= np.where(awake[s] & ~has_plants, 0.5, 0.0)  # Sin plantas en la celda
+        profiler.exit()
+
+        profiler.enter("predation")
+        if self.carnivores:
+            self._hunt(awake, action)
+        profiler.exit()
+
+        # Pérdida de energía por metabolismo
+        profiler.enter("metabolism")
+        flat_e[idx] -= 0.1 + 0.9 * self._random(SLOT_METABOLISM, day, idx)
+        profiler.exit()
+
+        profiler.enter("reproduction")
+        threshold = self.params.reproduction_threshold.reshape(-1)
+        breeding = self.params.breeding(season).reshape(-1)[species] & (flat_e[idx] >= threshold[species])
+        born, born_species = idx[breeding], species[breeding]
+        births = offspring(flat_q[born], self.params.birth_rate.reshape(-1)[born_species])
+        flat_q[born] += births
+        flat_e[born] -= threshold[born_species]
+        births = np.bincount(born // q.shape[2], births, rows).astype(np.int64) if rows else births
+        profiler.exit()
+
+        profiler.enter("death")
+        dying = flat_e[idx] <= 0
+        dying |= self._random(SLOT_DEATH, day, idx) < self.params.death_rate.reshape(-1)[species]
+        # La caza pudo dejar el grupo sin individuos en este mismo paso
+        dead = idx[dying & (flat_q[idx] > 0)]
+        flat_q[dead] -= 1
+        # Retorna energía al ambiente
+        resources += np.bincount(dead % cells, flat_e[dead] * 0.2, cells).reshape(resources.shape) if cells else 0.0
+        deaths = np.bincount(dead // q.shape[2], minlength=rows) if rows else dead
+        profiler.exit()
+
+        profiler.enter("migration")
+        self._migrate(day)
+        self._diffuse()
+        profiler.exit()
+        return births.reshape(q.shape[:2]), deaths.reshape(q.shape[:2])
+
+    def _hunt(self, awake, action):
+        """Caza en el vecindario de 3x3 celdas, una especie de depredador por vez.
+
+        La demanda de cada celda con depredadores se reparte entre las presas de su
+        vecindario en proporción a su energía; si a una celda de presas le piden más de
+        lo que tiene, todas las demandas sobre ella se reducen en la misma proporción.
+        La energía que pierden las presas es exactamente la que ganan los depredadores.
+        """
+        q, e = self.quantity, self.energy
+        for s in self.carnivores:
+            prey = self.params.prey[s]
+            if not prey:
+                e[s] -= np.where(awake[s], 1.0, 0.0)  # Sin presas en la red trófica
+                continue
+            prey_alive = (q[prey] > 0) & (e[prey] > 0)
+            prey_energy = np.where(prey_alive, e[prey], 0.0).sum(axis=0)
+            available = box_sum(prey_energy)
+            wanted = np.where(awake[s] & (available > 0), 1.0 + 2.0 * action[s], 0.0)
+            e[s] -= np.where(awake[s] & (available <= 0), 1.0, 0.0)  # Sin presas en el vecindario
+            share = _divide(wanted, available)
+            pressure = box_sum(share)
+            taken = np.minimum(pressure, 1.0)
+            e[s] += share * box_sum(prey_energy * _divide(taken, pressure))
+            for k, p in enumerate(prey):
+                e[p] -= np.where(prey_alive[k], e[p] * taken, 0.0)
+                q[p] -= prey_alive[k] & (e[p] <= 0)
+
+    def _migrate(self, day):
+        """Cada grupo de animales manda una parte de sus individuos a una celda vecina al azar.
+
+        Los que llegan traen su energía y la de la celda de destino pasa a ser el promedio.
+        """
+        rows, columns = self.resources.shape
+        cells = rows * columns
+        # Desplazamiento en índices planos hacia arriba, abajo, izquierda y derecha
+        offsets = np.array([-columns, columns, -1, 1], dtype=np.int64)
+        for s in np.flatnonzero(self.params.migration_rate.reshape(-1)).tolist():
+            flat_q, flat_e = self.quantity[s].reshape(-1), self.energy[s].reshape(-1)
+            source = np.flatnonzero(flat_q > 0)
+            draw = self._random(SLOT_MIGRATION, day, source + s * cells) * 4
+            direction = draw.astype(np.int64)
+            draw -= direction
+            moving = (flat_q[source] * self.params.migration_rate[s, 0, 0] + draw).astype(np.int64)
+            leaving = np.flatnonzero(moving)
+            source, moving, direction = source[leaving], moving[leaving], direction[leaving]
+            # En los bordes de la grilla no se sale
+            row, column = np.divmod(source, columns)
+            inside = ~(((direction == 0) & (row == 0)) | ((direction == 1) & (row == rows - 1)) |
+                       ((direction == 2) & (column == 0)) | ((direction == 3) & (column == columns - 1)))
+            if not inside.any():
+                continue
+            source, moving, direction = source[inside], moving[inside], direction[inside]
+            target = source + offsets[direction]
+            arrived = np.bincount(target, moving, cells)
+            arrived_mass = np.bincount(target, flat_e[source] * moving, cells)
+            flat_q[source] -= moving
+            target = np.flatnonzero(arrived)
+            check_individuals(flat_q[target] + arrived[target])
+            mass = flat_e[target] * flat_q[target] + arrived_mass[target]
+            flat_q[target] += arrived[target].astype(np.int64)
+            flat_e[target] = mass / flat_q[target]
+
+    def _diffuse(self):
+        resources = self.resources
+        flow = RESOURCE_DIFFUSION * (resources[:, 1:] - resources[:, :-1])
+        resources[:, :-1] += flow
+        resources[:, 1:] -= flow
+        flow = RESOURCE_DIFFUSION * (resources[1:, :] - resources[:-1, :])
+        resources[:-1, :] += flow
+        resources[1:, :] -= flow
+
+    def totals(self, rows=np.s_[:]):
+        """Cantidades por población, masa de energía por población y fila, y recursos por fila."""
+        q = self.quantity[:, rows]
+        # Cada celda cabe en int64, pero la suma de todas puede no caber
+        check_individuals(q.sum(axis=(1, 2), dtype=np.float64))
+        return q.sum(axis=(1, 2)), (self.energy[:, rows] * q).sum(axis=2), self.resources[rows].sum(axis=1)
+
+
+def advance_stripe(params, seed, organism_ids, columns, row_start, row_stop, interior, resources, quantity,
+                   energy, first_day, seasons):
+    """Avanza una franja (con su margen) len(seasons) días en un proceso worker.
+
+    Devuelve el estado de las filas propias (`interior`, relativo a la franja) y las
+    estadísticas de esas filas para cada día.
+    """
+    grid = SpatialGrid(params, resources, quantity, energy, cell_keys(seed, organism_ids, columns, row_start, row_stop))
+    days = []
+    for offset, season in enumerate(seasons):
+        births, deaths = grid.step(first_day + offset, season)
+        days.append((births[:, interior].sum(axis=1), deaths[:, interior].sum(axis=1)) + grid.totals(interior))
+    return grid.resources[interior], grid.quantity[:, interior], grid.energy[:, interior], days
+
+
+class SpatialEngine:
+    """Motor de la grilla para EcosystemSimulation (engine="spatial").
+
+    Con un solo proceso avanza la grilla día por día. Con `workers` > 1 reparte franjas
+    de filas en un pool de procesos que avanzan hasta DAYS_PER_EXCHANGE días por vez;
+    las estadísticas de esos días se entregan a la simulación de a uno.
+    """
+
+    def __init__(self, simulation, cell_area=None, workers=None, migration_rate=MIGRATION_RATE):
+        self.simulation = simulation
+        organisms = simulation.organisms
+        environment = simulation.environment
+        self.names = [org.name for org in organisms]
+        self.ids = np.array([org.id for org in organisms], dtype=np.int64)
+        web = simulation.food_web
+        self.params = SpeciesParameters(organisms, migration_rate, None if web.empty else web.prey_lists())
+        self.shape = grid_shape(environment.surface_area, cell_area or CELL_AREA)
+        cells = self.shape[0] * self.shape[1]
+        resources = np.full(self.shape, float(environment.resources) / cells)
+        quantity = np.array([spread(org.quantity, cells) for org in organisms], dtype=np.int64)
+        # Todos los grupos empiezan con la energía de la población
+        energy = np.array([np.full(cells, float(org.initial_energy)) for org in organisms], dtype=np.float64)
+        self.grid = SpatialGrid(self.params, resources, quantity.reshape((-1,) + self.shape),
+                                energy.reshape((-1,) + self.shape),
+                                cell_keys(simulation.seed, self.ids.tolist(), self.shape[1], 0, self.shape[0]))
+        self.workers = max(1, min(workers or SPATIAL_WORKERS, self.shape[0]))
+        self.now = int(simulation.env.now)
+        # Último día hasta el que se puede calcular por adelantado (lo fija la simulación)
+        self.horizon = None
+        self.quantities = quantity.sum(axis=1)
+        self.resources = float(environment.resources)
+        self.keep_events = simulation.event_sink.keeps_events
+        self.keep_descriptions = simulation.event_sink.keeps_descriptions
+        self.profiler = simulation.profiler
+        self._days = deque()
+        self._executor = None
+
+    @property
+    def cells(self):
+        return self.shape[0] * self.shape[1]
+
+    def population_counts(self):
+        """Devuelve (plantas, herbívoros, depredadores) sumando las cantidades por tipo."""
+        known = self.params.types >= 0
+        totals = np.bincount(self.params.types[known], weights=self.quantities[known], minlength=3)
+        return int(totals[PLANT]), int(totals[HERBIVORE]), int(totals[CARNIVORE])
+
+    def advance(self, until):
+        """Procesa los días con tiempo menor que `until`."""
+        while self.now < until:
+            if not self._days:
+                self._compute_days()
+            births, deaths, quantities, mass_rows, resource_rows = self._days.popleft()
+            self.quantities = quantities
+            self.resources = float(resource_rows.sum())
+            self._emit(self.now, births, deaths, mass_rows)
+            self.now += 1
+
+    def _compute_days(self):
+        if self.workers == 1:
+            births, deaths = self.grid.step(self.now, self.simulation.get_current_season(self.now), self.profiler)
+            self._days.append((births.sum(axis=1), deaths.sum(axis=1)) + self.grid.totals())
+            return
+        days = DAYS_PER_EXCHANGE if self.horizon is None else max(1, min(DAYS_PER_EXCHANGE, self.horizon - self.now))
+        self.profiler.enter("partitions")
+        self._advance_partitions(days)
+        self.profiler.exit()
+
+    def _advance_partitions(self, days):
+        """Avanza `days` días repartiendo la grilla en franjas con un margen de days * halo_per_day() filas."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        rows = self.shape[0]
+        halo = days * self.params.halo_per_day()
+        seasons = [self.simulation.get_current_season(self.now + offset) for offset in range(days)]
+        bounds = np.linspace(0, rows, self.workers + 1).astype(int)
+        grid = self.grid
+        futures = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            low, high = max(0, start - halo), min(rows, stop + halo)
+            futures.append(self._executor.submit(
+                advance_stripe, self.params, self.simulation.seed, self.ids.tolist(), self.shape[1], low, high,
+                np.s_[start - low:stop - low], grid.resources[low:high].copy(), grid.quantity[:, low:high].copy(),
+                grid.energy[:, low:high].copy(), self.now, seasons
+            ))
+        stripes = []
+        for (start, stop), future in zip(zip(bounds[:-1], bounds[1:]), futures):
+            resources, quantity, energy, stats = future.result()
+            grid.resources[start:stop] = resources
+            grid.quantity[:, start:stop] = quantity
+            grid.energy[:, start:stop] = energy
+            stripes.append(stats)
+        for day in zip(*stripes):
+            births, deaths, quantities, mass_rows, resource_rows = zip(*day)
+            self._days.append((sum(births), sum(deaths), sum(quantities), np.concatenate(mass_rows, axis=1),
+                               np.concatenate(resource_rows)))
+
+    def _emit(self, day, births, deaths, mass_rows):
+        """Un evento por población y día con los nacimientos y las muertes de todas sus celdas.
+
+        La energía del evento es el promedio de la población ponderado por la cantidad de cada celda.
+        """
+        rows = []
+        for event_type, counts, template in (("reproduction", births, "%s: %d nacimientos en la grilla."),
+                                             ("death", deaths, "%s: %d muertes en la grilla.")):
+            idx = np.flatnonzero(counts)
+            if not idx.size:
+                continue
+            self.profiler.count_events(event_type, idx.size)
+            if not self.keep_events:
+                rows.extend([None] * idx.size)
+                continue
+            for i in idx.tolist():
+                description = template % (self.names[i], counts[i]) if self.keep_descriptions else None
+                quantity = int(self.quantities[i])
+                energy = float(mass_rows[i].sum()) / quantity if quantity else 0.0
+                rows.append((int(self.ids[i]), event_type, description, day, quantity, energy))
+        if rows:
+            self.simulation.record_events([rows])
+
+    def sync_states(self):
+        """Copia a los registros de la simulación los totales de la grilla.
+
+        La energía de cada población pasa a ser el promedio de sus celdas ponderado por cantidad.
+        """
+        quantities, mass_rows, _ = self.grid.totals()
+        for i, organism in enumerate(self.simulation.organisms):
+            organism.quantity = int(quantities[i])
+            if organism.quantity:
+                organism.initial_energy = float(mass_rows[i].sum()) / organism.quantity
+        self.simulation.environment.resources = float(self.grid.resources.sum(axis=1).sum())
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
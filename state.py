@@ -0,0 +1,97 @@
+import logging
+from sqlalchemy import bindparam, select
+from .logs import EVENTS_LOGGER
+from .models import Environment, Organisms
+from .read_cache import read_cache
+
+event_logger = logging.getLogger(EVENTS_LOGGER)
+
+ORGANISM_FIELDS = tuple(Organisms.__table__.columns.keys())
+ENVIRONMENT_FIELDS = tuple(Environment.__table__.columns.keys())
+
+
+class OrganismState:
+    """Copia liviana de una fila de Organisms con la que trabaja la simulación.
+
+    A diferencia de los objetos del ORM, leer o modificar sus atributos no pasa por la
+    instrumentación de SQLAlchemy ni ensucia la sesión; el estado se guarda en bloque
+    con `write_back_states`.
+    """
+
+    __slots__ = ORGANISM_FIELDS + ("is_sick",)
+
+    def __init__(self, **fields):
+        for name in ORGANISM_FIELDS:
+            setattr(self, name, fields.get(name))
+        self.is_sick = False
+
+    def reduce_energy(self, amount):
+        """Reduce la energía del organismo y verifica su estado de salud."""
+        self.initial_energy -= amount
+        if self.initial_energy < self.min_energy_for_health:
+            self.is_sick = True
+            event_logger.debug("%s se ha enfermado por falta de energía.", self.name, extra={"organism_id": self.id})
+        if self.initial_energy <= 0:
+            return True  # El organismo ha muerto
+        return False
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in ORGANISM_FIELDS}
+
+
+class EnvironmentState:
+    """Copia liviana de una fila de Environment."""
+
+    __slots__ = ENVIRONMENT_FIELDS
+
+    def __init__(self, **fields):
+        for name in ENVIRONMENT_FIELDS:
+            setattr(self, name, fields.get(name))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in ENVIRONMENT_FIELDS}
+
+
+def load_organism_states(db_session, environment_id):
+    """Lee los organismos de un entorno sin crear objetos del ORM."""
+    rows = db_session.execute(
+        select(Organisms.__table__).where(Organisms.environment_id == environment_id).order_by(Organisms.id)
+    ).mappings()
+    return [OrganismState(**row) for row in rows]
+
+
+def load_environment_state(db_session, environment_id):
+    """Lee un entorno sin crear objetos del ORM (None si no existe)."""
+    row = db_session.execute(
+        select(Environment.__table__).where(Environment.id == environment_id)
+    ).mappings().first()
+    return EnvironmentState(**row) if row is not None else None
+
+
+def write_back_states(db_session, organisms, environment):
+    """Guarda energía y cantidad de cada organismo y los recursos del entorno en una transacción."""
+    table = Organisms.__table__
+    if organisms:
+        db_session.execute(
+            table.update()
+            .where(table.c.id == bindparam("b_id"))
+            .values(initial_energy=bindparam("b_energy"), quantity=bindparam("b_quantity")),
+            [
+                {"b_id": organism.id, "b_energy": organism.initial_energy, "b_quantity": organism.quantity}
+                for organism in organisms
+            ]
+        )
+    if environment is not None:
+        environment_table = Environment.__table__
+        db_session.execute(
+            environment_table.update()
+            .where(environment_table.c.id == environment.id)
+            .values(resources=environment.resources)
+        )
+    db_session.commit()
+    # Las lecturas guardadas de la API dejan de servir (en un worker la caché del proceso está vacía)
+    environment_ids = {organism.environment_id for organism in organisms}
+    if environment is not None:
+        environment_ids.add(environment.id)
+    for environment_id in environment_ids:
+        read_cache.invalidate_environment(environment_id)
@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+from collections import deque
+
+# Instantáneas que conserva cada flujo; un cliente más atrasado salta a la última
+STREAM_CAPACITY = 512
+# Máximo de instantáneas que se envían juntas a un cliente antes de agruparlas
+MAX_BATCH = 64
+# Segundos que se conserva un flujo terminado sin suscriptores, para quien se conecte al final
+STREAM_TTL = float(os.getenv("STREAM_TTL", 60))
+
+
+class SimulationStream:
+    """Difunde las instantáneas diarias de una simulación a varios suscriptores.
+
+    Publicar es O(1) y nunca espera a los clientes: las instantáneas van a un buffer
+    circular y cada suscriptor lee con su propio cursor. Si un cliente lento queda
+    fuera del buffer, o acumula más de `MAX_BATCH` pendientes, recibe solo la más
+    reciente junto con el número de instantáneas omitidas.
+    """
+
+    def __init__(self, capacity=STREAM_CAPACITY):
+        self._buffer = deque(maxlen=capacity)
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.closed = False
+        self.closed_at = None
+        self.subscribers = 0
+
+    def publish(self, snapshot):
+        with self._lock:
+            self._sequence += 1
+            self._buffer.append((self._sequence, snapshot))
+
+    def close(self):
+        self.closed_at = time.monotonic()
+        self.closed = True
+
+    def read(self, cursor, max_batch=MAX_BATCH):
+        """Devuelve (instantáneas, nuevo cursor, omitidas) posteriores a `cursor`."""
+        with self._lock:
+            if self._sequence <= cursor:
+                return [], cursor, 0
+            pending = [snapshot for sequence, snapshot in self._buffer if sequence > cursor]
+            missed = self._sequence - cursor - len(pending)
+            latest = self._sequence
+        if missed or len(pending) > max_batch:
+            return [pending[-1]], latest, missed + len(pending) - 1
+        return pending, latest, 0
+
+
+class StreamRegistry:
+    """Flujos de progreso, indexados por id de trabajo.
+
+    Un flujo terminado se borra cuando se va su último suscriptor o, si nadie lo está
+    leyendo, `ttl` segundos después de cerrarse (se revisa en cada apertura o consulta).
+    """
+
+    def __init__(self, ttl=STREAM_TTL):
+        self.ttl = ttl
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._streams)
+
+    def _purge(self):
+        now = time.monotonic()
+        expired = [key for key, stream in self._streams.items()
+                   if stream.closed and not stream.subscribers and now - stream.closed_at >= self.ttl]
+        for key in expired:
+            del self._streams[key]
+
+    def open(self, key):
+        with self._lock:
+            self._purge()
+            stream = self._streams[key] = SimulationStream()
+        return stream
+
+    def get(self, key):
+        with self._lock:
+            self._purge()
+            return self._streams.get(key)
+
+    def subscribe(self, key):
+        """Flujo de `key` con un suscriptor más (None si ya no existe); se suelta con `unsubscribe`."""
+        with self._lock:
+            self._purge()
+            stream = self._streams.get(key)
+            if stream is not None:
+                stream.subscribers += 1
+            return stream
+
+    def unsubscribe(self, key, stream):
+        with self._lock:
+            stream.subscribers -= 1
+            if stream.closed and not stream.subscribers and self._streams.get(key) is stream:
+                del self._streams[key]
+
+    def close(self, key):
+        stream = self._streams.get(key)
+        if stream is not None:
+            stream.close()
+
+
+class QueuePublisher:
+    """Callback diario que envía instantáneas desde un worker hacia el proceso principal.
+
+    Acumula las instantáneas localmente y las manda en lotes por la cola como mucho
+    cada `interval` segundos, para que el streaming no frene el motor.
+    """
+
+    def __init__(self, queue, key, interval=0.05):
+        self.queue = queue
+        self.key = key
+        self.interval = interval
+        self._pending = []
+        self._last_sent = time.monotonic()
+
+    def __call__(self, simulation):
+        self._pending.append(simulation.population_snapshot())
+        if time.monotonic() - self._last_sent >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.queue.put((self.key, self._pending))
+            self._pending = []
+        self._last_sent = time.monotonic()
+
+    def close(self):
+        """Envía lo pendiente y marca el fin del flujo."""
+        self.flush()
+        self.queue.put((self.key, None))
+
+
+def pump_updates(queue, registry):
+    """Mueve a los flujos los lotes que llegan por la cola (corre en un hilo propio)."""
+    while True:
+        item = queue.get()
+        if item is None:
+            return
+        key, snapshots = item
+        stream = registry.get(key)
+        if stream is None:
+            continue
+        if snapshots is None:
+            stream.close()
+            continue
+        for snapshot in snapshots:
+            stream.publish(snapshot)
+
+
+streams = StreamRegistry()
@@ -0,0 +1,227 @@
+"""Barridos de parámetros: muchas simulaciones del mismo entorno en paralelo.
+
+Cada configuración es un diccionario de sobrescrituras sobre el entorno base:
+
+    temperature=25             campo del entorno
+    birth_rate=0.2             campo de todos los organismos
+    Lobo.death_rate=0.1        campo de los organismos con ese nombre o tipo (Carnivore.*)
+
+Uso desde la línea de comandos:
+
+    python -m ecosistemsimulator.sweep 1 --time 30 --grid resources=250,500 --grid Lobo.birth_rate=0.1,0.2 --replicates 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from . import database
+from .ecosystem_simulation import EcosystemSimulation, ENGINES
+from .event_sink import NullLifecycleSink
+from .foodweb import load_interactions
+from .jobs import SIMULATION_WORKERS
+from .logs import configure_logging
+from .state import (ENVIRONMENT_FIELDS, ORGANISM_FIELDS, EnvironmentState, OrganismState,
+                    load_environment_state, load_organism_states)
+
+DEFAULT_PERCENTILES = (10, 50, 90)
+POPULATION_KEYS = ("plant", "herbivore", "predator")
+# Campos que identifican a los registros y no se pueden sobrescribir
+PROTECTED_FIELDS = ("id", "environment_id", "name", "organism_type")
+
+# Entorno base de cada proceso worker (se carga una sola vez en _init_sweep_worker)
+_base_environment = None
+_base_organisms = None
+_base_interactions = None
+
+
+def expand_grid(grid):
+    """Producto cartesiano de {parámetro: [valores]} como lista de configuraciones."""
+    if not grid:
+        return [{}]
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def validate_overrides(overrides):
+    """Lanza ValueError si alguna sobrescritura no corresponde a un campo conocido."""
+    for key in overrides:
+        target, _, field = key.rpartition(".")
+        if field in PROTECTED_FIELDS:
+            raise ValueError(f"No se puede sobrescribir el campo {field}")
+        if target and field not in ORGANISM_FIELDS:
+            raise ValueError(f"Campo de organismo desconocido: {key}")
+        if not target and field not in ORGANISM_FIELDS and field not in ENVIRONMENT_FIELDS:
+            raise ValueError(f"Parámetro desconocido: {key}")
+
+
+def apply_overrides(organisms, environment, overrides):
+    """Aplica las sobrescrituras sobre copias de los registros y las devuelve."""
+    environment = EnvironmentState(**environment.to_dict())
+    organisms = [OrganismState(**organism.to_dict()) for organism in organisms]
+    for key, value in overrides.items():
+        target, _, field = key.rpartition(".")
+        if not target and field in ENVIRONMENT_FIELDS:
+            setattr(environment, field, value)
+            continue
+        for organism in organisms:
+            if not target or target in (organism.name, organism.organism_type):
+                setattr(organism, field, value)
+    return organisms, environment
+
+
+def _init_sweep_worker(database_url, environment_id):
+    """Carga el entorno base una vez por proceso worker."""
+    global _base_environment, _base_organisms, _base_interactions
+    # El hilo de logging del proceso padre no existe en el worker
+    configure_logging()
+    if database_url:
+        engine = create_engine(database_url)
+    else:
+        # Las conexiones heredadas del proceso padre no se pueden reutilizar
+        database.simulation_engine.dispose(close=False)
+        engine = database.simulation_engine
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        _base_environment = load_environment_state(db, environment_id)
+        _base_organisms = load_organism_states(db, environment_id)
+        _base_interactions = load_interactions(db, environment_id)
+    finally:
+        db.close()
+    if database_url:
+        engine.dispose()
+
+
+def run_sweep_case(configuration, overrides, seed, simulation_time, engine):
+    """Simula una configuración con una semilla y devuelve su trayectoria diaria."""
+    organisms, environment = apply_overrides(_base_organisms, _base_environment, overrides)
+    simulation = EcosystemSimulation.from_states(organisms, environment, event_sink=NullLifecycleSink(),
+                                                 engine=engine, seed=seed, interactions=_base_interactions)
+    trajectory = []
+    simulation.day_callbacks.append(lambda simulation: trajectory.append(simulation.population_counts()))
+    summary = simulation.run(simulation_time)
+    return {
+        "configuration": configuration,
+        "seed": seed,
+        "trajectory": np.array(trajectory, dtype=np.int64).reshape(-1, len(POPULATION_KEYS)),
+        "events": summary["events"],
+        "elapsed_seconds": summary["elapsed_seconds"],
+    }
+
+
+def iter_sweep_results(environment_id, simulation_time, configurations, seeds, engine="simpy",
+                       max_workers=None, database_url=None):
+    """Reparte (configuración, semilla) en un pool de procesos y entrega cada resultado al terminar."""
+    if engine not in ENGINES:
+        raise ValueError(f"Motor de simulación desconocido: {engine}")
+    if not configurations or not seeds:
+        raise ValueError("El barrido necesita al menos una configuración y una semilla")
+    for overrides in configurations:
+        validate_overrides(overrides)
+    cases = [(i, overrides, seed) for i, overrides in enumerate(configurations) for seed in seeds]
+    workers = max(1, min(max_workers or SIMULATION_WORKERS, len(cases)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                             initargs=(database_url, environment_id)) as executor:
+        futures = [
+            executor.submit(run_sweep_case, i, overrides, seed, simulation_time, engine)
+            for i, overrides, seed in cases
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def aggregate_trajectories(trajectories, percentiles=DEFAULT_PERCENTILES):
+    """Media y percentiles por día de un conjunto de trayectorias (réplicas x días x tipos)."""
+    days = min(len(trajectory) for trajectory in trajectories)
+    stacked = np.stack([trajectory[:days] for trajectory in trajectories]).astype(np.float64)
+    mean = stacked.mean(axis=0)
+    bands = np.percentile(stacked, percentiles, axis=0)
+    population = {}
+    final = {}
+    for column, key in enumerate(POPULATION_KEYS):
+        population[key] = {"mean": mean[:, column].round(4).tolist()}
+        final[key] = {"mean": round(float(mean[-1, column]), 4) if days else None}
+        for p, band in zip(percentiles, bands):
+            population[key][f"p{p:g}"] = band[:, column].round(4).tolist()
+            final[key][f"p{p:g}"] = round(float(band[-1, column]), 4) if days else None
+    return {"days": list(range(1, days + 1)), "population": population, "final": final}
+
+
+def run_sweep(environment_id, simulation_time, configurations, seeds, engine="simpy",
+              percentiles=DEFAULT_PERCENTILES, max_workers=None, database_url=None):
+    """Ejecuta el barrido completo y devuelve una tabla agregada por configuración."""
+    started = time.perf_counter()
+    runs = {i: [] for i in range(len(configurations))}
+    events = 0
+    for result in iter_sweep_results(environment_id, simulation_time, configurations, seeds,
+                                     engine, max_workers, database_url):
+        runs[result["configuration"]].append(result)
+        events += result["events"]
+    table = []
+    for i, overrides in enumerate(configurations):
+        results = sorted(runs[i], key=lambda result: result["seed"])
+        table.append(dict(
+            configuration=i,
+            overrides=overrides,
+            seeds=[result["seed"] for result in results],
+            **aggregate_trajectories([result["trajectory"] for result in results], percentiles)
+        ))
+    elapsed = time.perf_counter() - started
+    return {
+        "environment_id": environment_id,
+        "simulation_time": simulation_time,
+        "engine": engine,
+        "runs": sum(len(results) for results in runs.values()),
+        "events": events,
+        "elapsed_seconds": round(elapsed, 6),
+        "configurations": table,
+    }
+
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido de parámetros sobre un entorno")
+    parser.add_argument("environment_id", type=int)
+    parser.add_argument("--time", type=int, required=True, help="Días simulados por corrida")
+    parser.add_argument("--grid", action="append", default=[], metavar="PARAM=V1,V2",
+                        help="Valores de un parámetro; varios --grid forman el producto cartesiano")
+    parser.add_argument("--configurations", help="Lista JSON de sobrescrituras (en lugar de --grid)")
+    parser.add_argument("--seeds", type=int, nargs="+", help="Semillas de las réplicas")
+    parser.add_argument("--replicates", type=int, default=1, help="Réplicas con semillas 0..N-1")
+    parser.add_argument("--engine", default="simpy")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--percentiles", type=float, nargs="+", default=list(DEFAULT_PERCENTILES))
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.configurations:
+        configurations = json.loads(args.configurations)
+    else:
+        grid = {}
+        for item in args.grid:
+            name, _, values = item.partition("=")
+            grid[name] = [_parse_value(value) for value in values.split(",")]
+        configurations = expand_grid(grid)
+    seeds = args.seeds or list(range(args.replicates))
+    try:
+        result = run_sweep(args.environment_id, args.time, configurations, seeds, args.engine,
+                           args.percentiles, args.workers, os.getenv("DATABASE"))
+    except ValueError as e:
+        parser.exit(2, f"{e}\n")
+    json.dump(result, sys.stdout)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# test_checkpoint.py
+
+import pytest
+
+from .checkpoint import read_snapshot
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .models import Organisms
+
+
+def organism_state(db_session, environment):
+    return sorted(
+        (o.id, o.initial_energy, o.quantity)
+        for o in db_session.query(Organisms).filter(Organisms.environment_id == environment.id)
+    )
+
+
+def save_state(db_session, environment):
+    return organism_state(db_session, environment), environment.resources
+
+
+def load_state(db_session, environment, state):
+    rows, resources = state
+    for organism_id, energy, quantity in rows:
+        organism = db_session.get(Organisms, organism_id)
+        organism.initial_energy = energy
+        organism.quantity = quantity
+    environment.resources = resources
+    db_session.commit()
+
+
+@pytest.mark.parametrize("engine", ["simpy", "vectorized"])
+def test_resumed_run_matches_uninterrupted_run(db_session, environment, tmp_path, engine):
+    for organism in db_session.query(Organisms):
+        organism.reproduction_season = "all_year"
+    db_session.commit()
+    initial = save_state(db_session, environment)
+
+    EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), engine=engine, seed=3).run(40)
+    expected = save_state(db_session, environment)
+
+    load_state(db_session, environment, initial)
+    path = str(tmp_path / "run.ecosnap")
+    first = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), engine=engine, seed=3)
+    summary = first.run(25, checkpoint_every=10, checkpoint_path=path)
+    assert summary["checkpoints"]["written"] == 2
+    assert summary["checkpoints"]["size_bytes"] > 0
+
+    # Se pierde el estado posterior al checkpoint del día 20 y se reanuda desde ahí
+    resumed = EcosystemSimulation.from_checkpoint(db_session, environment.id, path, event_sink=NullLifecycleSink())
+    assert resumed.env.now == 20
+    summary = resumed.run(40)
+    assert summary["checkpoints"]["read_size_bytes"] > 0
+    assert save_state(db_session, environment) == expected
+
+
+def test_snapshot_round_trip(db_session, environment, tmp_path):
+    path = str(tmp_path / "run.ecosnap")
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink())
+    simulation.run(5, checkpoint_every=5, checkpoint_path=path)
+    snapshot, size, _ = read_snapshot(path)
+    assert snapshot.engine == "simpy"
+    assert snapshot.now == 5
+    assert snapshot.resources == simulation.environment.resources
+    assert sorted(zip(snapshot.ids.tolist(), snapshot.quantity.tolist())) == [
+        (o.id, o.quantity) for o in sorted(simulation.organisms, key=lambda o: o.id)
+    ]
@@ -0,0 +1,54 @@
+# test_cohorts.py
+
+import numpy as np
+import pytest
+
+from .cohorts import CohortStore
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .models import SimulationRun
+
+
+def test_memory_does_not_depend_on_population_size():
+    small = CohortStore([50], [100.0], [1.0], bins=8)
+    large = CohortStore([10_000_000], [100.0], [1.0], bins=8)
+    assert small.counts.nbytes + small.relative.nbytes == large.counts.nbytes + large.relative.nbytes
+    assert large.totals().tolist() == [10_000_000]
+
+
+def test_aging_removes_oldest_cohort_and_reproduction_is_per_cohort():
+    # Vida de 4 días en 4 clases: cada día las cohortes pasan a la clase siguiente
+    store = CohortStore([8], [10.0], [4.0], bins=4, lifespan_days=1)
+    assert store.counts.tolist() == [[2, 2, 2, 2]]
+    rows, dead, _ = store.age(1)
+    assert rows.tolist() == [0] and dead.tolist() == [2]
+    assert store.counts.tolist() == [[0, 2, 2, 2]]
+
+    # Las muertes se llevan primero a los más viejos
+    store.remove(np.array([0]), np.array([3]))
+    assert store.counts.tolist() == [[0, 2, 1, 0]]
+
+    # La primera clase no es madura: solo se reproducen las clases 1 y 2
+    births, reproduced = store.reproduce(np.array([0]), np.array([4.0]), np.array([1.0]))
+    assert births.tolist() == [3] and reproduced.tolist() == [True]
+    assert store.counts.tolist() == [[3, 2, 1, 0]]
+    assert store.mean_energy(np.array([0]), np.array([0.0])).tolist() == [6.0]
+
+
+def test_vectorized_run_with_cohorts(db_session, environment):
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=5,
+                                     engine="vectorized", age_bins=4)
+    summary = simulation.run(60)
+    assert summary["age_bins"] == 4
+    assert simulation.vectorized.cohorts.totals().tolist() == simulation.vectorized.quantity.tolist()
+
+    run = db_session.get(SimulationRun, summary["run_id"])
+    replay = EcosystemSimulation.from_run(run, event_sink=NullLifecycleSink()).run(run.simulation_time)
+    assert replay["digest"] == summary["digest"]
+
+
+def test_invalid_age_bins(db_session, environment):
+    with pytest.raises(ValueError):
+        EcosystemSimulation(db_session, environment.id, age_bins=4)
+    with pytest.raises(ValueError):
+        EcosystemSimulation(db_session, environment.id, engine="vectorized", age_bins=0)
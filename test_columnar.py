@@ -0,0 +1,50 @@
+# test_columnar.py
+
+import pytest
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import BufferedLifecycleSink
+from .models import Lifecycle, PopulationHistory
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+from .columnar import ColumnarLifecycleSink, ColumnarPopulationWriter, export_run  # noqa: E402
+
+
+@pytest.mark.parametrize("engine", ["simpy", "vectorized"])
+def test_simulation_writes_events_and_population_to_parquet(db_session, environment, tmp_path, engine):
+    sink = ColumnarLifecycleSink(str(tmp_path / "lifecycle.parquet"), capacity=100)
+    population = ColumnarPopulationWriter(str(tmp_path / "population.parquet"))
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=sink, engine=engine, seed=3)
+    simulation.day_callbacks.append(population)
+    summary = simulation.run(20)
+    population.close()
+
+    events = pq.read_table(tmp_path / "lifecycle.parquet")
+    assert events.num_rows == summary["events"] > 0
+    assert "description" not in events.column_names
+    assert pa.types.is_dictionary(events.schema.field("event_type").type)
+    assert set(events.column("run_id").to_pylist()) == {summary["run_id"]}
+    assert db_session.query(Lifecycle).count() == 0
+
+    points = pq.read_table(tmp_path / "population.parquet").to_pylist()
+    assert [point["sim_time"] for point in points] == list(range(1, 21))
+    assert (points[-1]["plant"], points[-1]["herbivore"], points[-1]["predator"]) == tuple(
+        summary["population"][key] for key in ("plant", "herbivore", "predator"))
+
+
+def test_export_run_copies_tables_in_chunks(db_session, environment, tmp_path):
+    summary = EcosystemSimulation(db_session, environment.id, event_sink=BufferedLifecycleSink(db_session),
+                                  seed=5).run(15)
+    run_id = summary["run_id"]
+    export = export_run(db_session, run_id, "lifecycle", str(tmp_path / "events.arrow"), "arrow", chunk=7,
+                        include_description=True)
+    assert export["rows"] == db_session.query(Lifecycle).filter(Lifecycle.run_id == run_id).count() > 0
+    with pa.OSFile(str(tmp_path / "events.arrow"), "rb") as source:
+        table = pa.ipc.open_file(source).read_all()
+    first = db_session.query(Lifecycle).order_by(Lifecycle.id).first()
+    assert table.slice(0, 1).to_pylist()[0]["description"] == first.description
+
+    export = export_run(db_session, run_id, "population", str(tmp_path / "population.parquet"), chunk=4)
+    assert export["rows"] == db_session.query(PopulationHistory).count() == 15
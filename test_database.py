@@ -0,0 +1,120 @@
+# test_database.py
+
+import json
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from .conftest import FIXTURE_ORGANISMS
+from .database import POOL_METRICS, engine_options
+from .listing import MAX_PAGE_SIZE
+
+
+def test_async_crud_endpoints(client):
+    environment = client.post("/environments/", json={
+        "name": "Bosque", "temperature": 18.0, "humidity": 0.6, "resources": 500.0, "surface_area": 10.0
+    }).json()
+    organism = client.post("/organisms/", json={
+        "name": "Ciervo", "organism_type": "Herbivore", "birth_rate": 0.3, "death_rate": 0.1,
+        "initial_energy": 100.0, "quantity": 50, "environment_id": environment["id"], "growth_rate": 1.05,
+        "energy_consumption_rate": 10.0, "reproduction_season": "Primavera", "lifespan": 15.0,
+        "reproduction_energy_threshold": 20.0, "min_energy_for_health": 15.0
+    }).json()
+    assert organism["environment_id"] == environment["id"]
+
+    updated = client.put(f"/environments/{environment['id']}", json={
+        "name": "Selva", "temperature": 25.0, "humidity": 0.9, "resources": 800.0, "surface_area": 12.0
+    }).json()
+    assert updated["name"] == "Selva" and updated["resources"] == 800.0
+    assert [o["name"] for o in client.get(f"/environments/{environment['id']}/organisms/").json()] == ["Ciervo"]
+    assert client.get("/organisms/999").status_code == 404
+    assert client.delete(f"/organisms/{organism['id']}").json() == {"detail": "Organism deleted"}
+    assert client.get("/organisms/").json() == []
+
+
+def test_pool_metrics_track_checkout_wait_and_saturation(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **engine_options(url, "test_pool", 1, 0, 0, pool_timeout=0.5))
+    metrics = POOL_METRICS.pop("test_pool")
+    try:
+        connection = engine.connect()
+        assert metrics.stats()["saturation"] == 1.0
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        released = threading.Timer(0.05, connection.close)
+        released.start()
+        with engine.connect():
+            pass
+        stats = metrics.stats()
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["max_wait_ms"] >= 40
+        assert stats["capacity"] == 1 and stats["checked_out"] == 0
+    finally:
+        engine.dispose()
+
+
+def test_bulk_organisms_and_interactions(client):
+    environment = client.post("/environments/", json={
+        "name": "Bosque", "temperature": 18.0, "humidity": 0.6, "resources": 500.0, "surface_area": 10.0
+    }).json()
+    organisms = [dict(data, environment_id=environment["id"]) for data in FIXTURE_ORGANISMS * 100]
+    created = client.post("/organisms/bulk", json=organisms).json()
+    assert created["created"] == 300 and len(set(created["ids"])) == 300
+
+    lines = "\n".join(json.dumps({"predator_id": created["ids"][1], "prey_id": prey}) for prey in created["ids"][::3])
+    response = client.post("/interactions/bulk", content=lines, headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["created"] == 100
+
+    update = [dict(organisms[0], id=created["ids"][0], quantity=7)]
+    assert client.put("/organisms/bulk", json=update).json() == {"updated": 1}
+    assert client.get(f"/organisms/{created['ids'][0]}").json()["quantity"] == 7
+
+    # Una clave foránea inexistente rechaza toda la carga
+    response = client.post("/interactions/bulk", json=[{"predator_id": created["ids"][1], "prey_id": 99999}])
+    assert response.status_code == 404 and "99999" in response.json()["detail"]
+    assert len(client.get("/interactions/", params={"limit": 1000}).json()) == 100
+    bad = client.post("/organisms/bulk", content='{"name": "x"}\n', headers={"Content-Type": "application/x-ndjson"})
+    assert bad.status_code == 422 and bad.json()["detail"].startswith("Línea 1")
+
+
+def test_keyset_pagination_projection_and_stream(client):
+    environment = client.post("/environments/", json={
+        "name": "Bosque", "temperature": 18.0, "humidity": 0.6, "resources": 500.0, "surface_area": 10.0
+    }).json()
+    organisms = [dict(data, environment_id=environment["id"]) for data in FIXTURE_ORGANISMS * 10]
+    ids = client.post("/organisms/bulk", json=organisms).json()["ids"]
+
+    seen = []
+    params = {"limit": 7, "fields": "name,quantity"}
+    while True:
+        response = client.get("/organisms/", params=params)
+        page = response.json()
+        assert all(set(row) == {"id", "name", "quantity"} for row in page)
+        seen.extend(row["id"] for row in page)
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after_id"] = response.headers["X-Next-Cursor"]
+    assert seen == ids
+
+    plants = client.get("/organisms/", params={"organism_type": "Plant", "limit": 100, "fields": "organism_type"}).json()
+    assert len(plants) == 10 and {row["organism_type"] for row in plants} == {"Plant"}
+    streamed = client.get(f"/environments/{environment['id']}/organisms/", params={"stream": True, "fields": "id"})
+    assert [row["id"] for row in streamed.json()] == ids
+    assert client.get("/organisms/", params={"fields": "password"}).status_code == 400
+    assert client.get("/organisms/", params={"limit": 5000}).status_code == 400
+
+
+def test_environment_organisms_stream_is_not_limited_to_a_page(client):
+    environment = client.post("/environments/", json={
+        "name": "Bosque", "temperature": 18.0, "humidity": 0.6, "resources": 500.0, "surface_area": 10.0
+    }).json()
+    organisms = [dict(data, environment_id=environment["id"]) for data in FIXTURE_ORGANISMS * 500]
+    client.post("/organisms/bulk", json=organisms)
+    url = f"/environments/{environment['id']}/organisms/"
+    assert len(client.get(url, params={"stream": True, "fields": "id"}).json()) == len(organisms) > MAX_PAGE_SIZE
+    assert len(client.get(url, params={"stream": True, "fields": "id", "limit": 10}).json()) == 10
+    page = client.get(url, params={"fields": "id"})
+    assert len(page.json()) == MAX_PAGE_SIZE and "X-Next-Cursor" in page.headers
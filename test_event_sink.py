@@ -0,0 +1,64 @@
+# test_event_sink.py
+
+import pytest
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import BufferedLifecycleSink, DirectLifecycleSink
+from .models import Lifecycle
+from .state import load_environment_state, load_organism_states, write_back_states
+
+
+def test_buffered_sink_flushes_on_capacity(db_session, environment):
+    sink = BufferedLifecycleSink(db_session, capacity=3)
+    for i in range(7):
+        sink.record(1, "growth", "crecimiento", float(i), 10, 5.0)
+    assert db_session.query(Lifecycle).count() == 6
+    sink.close()
+    assert db_session.query(Lifecycle).count() == 7
+    assert sink.stats()["flushes"] == 3
+
+
+def test_buffered_sink_flushes_on_sim_time(db_session, environment):
+    sink = BufferedLifecycleSink(db_session, capacity=100, flush_interval=5)
+    sink.record(1, "growth", "crecimiento", 0.0, 10, 5.0)
+    sink.record(1, "growth", "crecimiento", 4.0, 10, 5.0)
+    assert db_session.query(Lifecycle).count() == 0
+    sink.record(1, "growth", "crecimiento", 5.0, 10, 5.0)
+    assert db_session.query(Lifecycle).count() == 3
+
+
+def persisted_events(db_session):
+    columns = (Lifecycle.organism_id, Lifecycle.event_type, Lifecycle.timestamp, Lifecycle.quantity, Lifecycle.energy)
+    return db_session.query(*columns).order_by(Lifecycle.id).all()
+
+
+def test_simulation_writes_same_events_as_direct_sink(db_session, environment):
+    organisms = load_organism_states(db_session, environment.id)
+    initial_environment = load_environment_state(db_session, environment.id)
+    simulation = EcosystemSimulation(db_session, environment.id, seed=7,
+                                     event_sink=BufferedLifecycleSink(db_session, capacity=50))
+    summary = simulation.run(simulation_time=20)
+    buffered = persisted_events(db_session)
+    assert summary["events"] == len(buffered) > 0
+    assert summary["event_sink"]["events_written"] == summary["events"]
+
+    # Misma semilla y mismo estado inicial: la corrida directa debe guardar exactamente los mismos eventos
+    db_session.query(Lifecycle).delete()
+    write_back_states(db_session, organisms, initial_environment)
+    direct = EcosystemSimulation(db_session, environment.id, seed=7, event_sink=DirectLifecycleSink(db_session))
+    summary = direct.run(simulation_time=20)
+    assert summary["event_sink"]["flushes"] == summary["events"]
+    assert persisted_events(db_session) == buffered
+
+
+def test_final_flush_on_error(db_session, environment):
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=BufferedLifecycleSink(db_session))
+
+    def failing_history():
+        if simulation.env.now >= 6:
+            raise RuntimeError("fallo")
+
+    simulation.update_population_history = failing_history
+    with pytest.raises(RuntimeError, match="fallo"):
+        simulation.run(simulation_time=10)
+    assert db_session.query(Lifecycle).count() == simulation.events_logged > 0
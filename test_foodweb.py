@@ -0,0 +1,71 @@
+# test_foodweb.py
+
+import numpy as np
+
+from .conftest import FIXTURE_ORGANISMS
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .foodweb import FoodWeb
+from .models import Interactions, Organisms, SimulationRun
+from .rng import PopulationStream
+from .state import EnvironmentState, OrganismState
+from .vectorized_engine import VectorizedEngine
+
+
+def test_food_web_compiles_to_csr_and_grows_incrementally():
+    web = FoodWeb([10, 20, 30, 40], [(1, 30, 10, 0.5), (2, 40, 20, 1.0), (3, 30, 20, 0.25), (4, 30, 99, 1.0)])
+    assert web.indptr.tolist() == [0, 0, 0, 2, 3]
+    assert web.row(2) == [(0, 0.5), (1, 0.25)]
+    assert web.last_interaction_id == 4
+
+    assert web.add([(5, 40, 10, 2.0), (6, 10, 20, 0.0), (7, 20, 10, 1.0)]) == 2
+    assert web.indptr.tolist() == [0, 0, 1, 3, 5]
+    assert web.row(3) == [(1, 1.0), (0, 2.0)]
+    assert web.to_list() == [[20, 10, 1.0], [30, 10, 0.5], [30, 20, 0.25], [40, 20, 1.0], [40, 10, 2.0]]
+    assert web.last_interaction_id == 7
+
+
+def two_herbivore_simulation(engine):
+    """Ciervo, Lobo, Helecho y un segundo herbívoro que el lobo no come."""
+    data = FIXTURE_ORGANISMS + [dict(FIXTURE_ORGANISMS[0], name="Liebre")]
+    organisms = [OrganismState(id=i + 1, environment_id=1, **d) for i, d in enumerate(data)]
+    environment = EnvironmentState(id=1, name="Bosque", temperature=18.0, humidity=0.6, resources=500.0,
+                                   surface_area=10.0)
+    return EcosystemSimulation.from_states(organisms, environment, engine=engine, seed=1,
+                                           event_sink=NullLifecycleSink(), interactions=[(1, 2, 1, 1.0)])
+
+
+def test_predators_only_choose_prey_from_the_food_web():
+    simulation = two_herbivore_simulation("simpy")
+    wolf = simulation.organisms[1]
+    rng = PopulationStream(123)
+    assert {simulation.choose_prey(wolf, rng).name for _ in range(50)} == {"Ciervo"}
+    simulation.organisms[0].initial_energy = 0.0
+    assert simulation.choose_prey(wolf, rng) is None
+
+    simulation = two_herbivore_simulation("vectorized")
+    engine = VectorizedEngine(simulation)
+    assert engine._choose_prey(np.array([1, 1, 1])).tolist() == [0, 0, 0]
+    engine.energy[0] = 0.0
+    assert engine._choose_prey(np.array([1])).tolist() == [-1]
+
+
+def test_new_interactions_are_picked_up_and_replayed(db_session, environment):
+    ids = {o.name: o.id for o in db_session.query(Organisms)}
+    db_session.add(Interactions(predator_id=ids["Lobo"], prey_id=ids["Ciervo"], interaction_type="Depredacion",
+                                interaction_rate=0.5))
+    db_session.commit()
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(),
+                                     engine="vectorized", seed=4)
+    summary = simulation.run(10)
+    assert simulation.food_web.to_list() == [[ids["Lobo"], ids["Ciervo"], 0.5]]
+
+    db_session.add(Interactions(predator_id=ids["Lobo"], prey_id=ids["Helecho"], interaction_type="Depredacion",
+                                interaction_rate=0.5))
+    db_session.commit()
+    assert simulation.refresh_food_web() == 1
+    assert simulation.food_web.row(simulation.food_web.positions[ids["Lobo"]])[-1][1] == 0.5
+
+    run = db_session.get(SimulationRun, summary["run_id"])
+    replay = EcosystemSimulation.from_run(run, event_sink=NullLifecycleSink()).run(run.simulation_time)
+    assert replay["digest"] == run.digest
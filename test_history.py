@@ -0,0 +1,43 @@
+# test_history.py
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .history import HistoryRecorder, choose_resolution, query_history
+from .models import PopulationHistory, PopulationRollup, SimulationRun
+
+
+def test_rollups_summarize_daily_points(db_session, environment):
+    run = SimulationRun(environment_id=environment.id, engine="simpy", seed=1, start_time=0, simulation_time=25,
+                        status="running", initial_state=b"")
+    db_session.add(run)
+    db_session.commit()
+    recorder = HistoryRecorder(db_session, environment.id, run.id, capacity=7)
+    for day in range(1, 26):
+        recorder.record(float(day), day, 2 * day, 100 - day)
+    assert db_session.query(PopulationHistory).count() == 21  # tres volcados por capacidad
+    recorder.close()
+    assert db_session.query(PopulationHistory).count() == 25
+
+    tens = db_session.query(PopulationRollup).filter(PopulationRollup.resolution == 10).order_by(
+        PopulationRollup.bucket_start).all()
+    assert [(r.bucket_start, r.points) for r in tens] == [(0.0, 9), (10.0, 10), (20.0, 6)]
+    assert (tens[1].plant_min, tens[1].plant_max, tens[1].plant_mean) == (10, 19, 14.5)
+    assert (tens[1].predator_min, tens[1].predator_max) == (81, 90)
+    hundreds = db_session.query(PopulationRollup).filter(PopulationRollup.resolution == 100).all()
+    assert [(r.bucket_start, r.points, r.herbivore_max) for r in hundreds] == [(0.0, 25, 50)]
+
+
+def test_run_history_is_queried_from_rollups(db_session, environment):
+    summary = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=4).run(60)
+    run_id = summary["run_id"]
+    assert summary["history"]["points_written"] == 60
+    assert db_session.query(PopulationHistory).filter(PopulationHistory.run_id == run_id).count() == 60
+
+    daily = query_history(db_session, run_id, 11, 30, 1)
+    assert [point["sim_time"] for point in daily] == list(range(11, 31))
+    tens = query_history(db_session, run_id, 15, 30, 10)
+    assert [point["bucket_start"] for point in tens] == [10.0, 20.0, 30.0]
+    assert tens[0]["plant_min"] <= tens[0]["plant_mean"] <= tens[0]["plant_max"]
+
+    assert choose_resolution(1, 60, 500) == 1
+    assert choose_resolution(1, 50000, 500) == 100
@@ -0,0 +1,70 @@
+# test_jobs.py
+
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from .conftest import FIXTURE_ORGANISMS
+from .database import Base
+from .jobs import SimulationJob, SimulationJobManager
+from .models import Environment, Organisms, PopulationHistory
+
+
+def wait_for(job_manager, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = job_manager.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.05)
+    raise AssertionError("El trabajo no terminó a tiempo")
+
+
+def test_simulation_runs_in_process_pool(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    environment = Environment(name="Bosque", temperature=18.0, humidity=0.6, resources=500.0, surface_area=10.0)
+    session.add(environment)
+    session.commit()
+    for data in FIXTURE_ORGANISMS:
+        session.add(Organisms(environment_id=environment.id, **data))
+    session.commit()
+
+    job_manager = SimulationJobManager(max_workers=1, database_url=database_url)
+    try:
+        job = job_manager.submit(environment.id, 10, engine="vectorized", seed=1)
+        assert job.status in ("queued", "running")
+        job = wait_for(job_manager, job.id)
+        assert job.status == "completed"
+        assert job.result["simulation_time"] == 10
+        assert job.sim_time == 10
+        assert session.query(PopulationHistory).count() == 10
+
+        stats = job_manager.stats()
+        assert stats["jobs"]["completed"] == 1
+        assert stats["queue_depth"] == 0
+        assert stats["wall_times"][job.id] >= 0
+    finally:
+        job_manager.shutdown()
+        session.close()
+        engine.dispose()
+
+
+def test_finished_jobs_are_evicted():
+    job_manager = SimulationJobManager(max_workers=1, retention=3600, max_finished=2)
+    jobs = [SimulationJob(1, 10, {}) for _ in range(4)]
+    for index, job in enumerate(jobs):
+        job_manager._jobs[job.id] = job
+        if index < 3:
+            job.status = "completed"
+            job.finished_at = time.time() - 10 + index
+    # Solo se conservan los dos terminados más recientes; el que sigue en cola no se toca
+    assert {job.id for job in job_manager.list()} == {job.id for job in jobs[1:]}
+    assert job_manager.evicted(jobs[0].id) and not job_manager.evicted(jobs[3].id)
+
+    job_manager.retention = 0
+    assert job_manager.get(jobs[2].id) is None and job_manager.evicted(jobs[2].id)
+    assert job_manager.get(jobs[3].id) is jobs[3]
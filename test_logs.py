@@ -0,0 +1,45 @@
+# test_logs.py
+
+import io
+import json
+import logging
+import queue
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .logs import EVENTS_LOGGER, NonBlockingQueueHandler, configure_logging, shutdown_logging
+
+
+def _run_and_collect(environment, db_session, **levels):
+    output = io.StringIO()
+    configure_logging(stream=output, **levels)
+    try:
+        summary = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=1).run(10)
+    finally:
+        shutdown_logging()
+        configure_logging()
+    return summary, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_event_messages_are_off_by_default(db_session, environment):
+    summary, records = _run_and_collect(environment, db_session)
+    assert len(records) == 2
+    assert records[0]["msg"].startswith("Iniciando simulación") and records[1]["msg"].startswith("Simulación terminada")
+    assert records[0]["run_id"] == summary["run_id"] and records[0]["level"] == "INFO"
+
+
+def test_event_messages_are_structured_when_enabled(db_session, environment):
+    summary, records = _run_and_collect(environment, db_session, event_level="DEBUG")
+    events = [record for record in records if "event_type" in record]
+    assert len(events) == summary["events"]
+    assert {"ts", "level", "logger", "msg", "organism_id", "sim_time", "run_id"} <= set(events[0])
+    assert events[0]["logger"] == EVENTS_LOGGER
+
+
+def test_queue_handler_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "mensaje %s", ("uno",), None)
+    handler.emit(record)
+    handler.emit(record)
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().getMessage() == "mensaje uno"
@@ -0,0 +1,74 @@
+# test_meanfield.py
+
+import pytest
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .meanfield import WAKE_RATE, MeanFieldEngine
+from .models import Organisms, PopulationHistory, SimulationRun
+
+
+def test_meanfield_is_deterministic_and_writes_history(db_session, environment):
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=1,
+                                     engine="meanfield", sample_every=10)
+    summary = simulation.run(60)
+    assert summary["events"] == 0 and summary["meanfield"]["steps"] > 0
+    days = [point.sim_time for point in db_session.query(PopulationHistory).order_by(PopulationHistory.sim_time)]
+    assert days == [10, 20, 30, 40, 50, 60]
+
+    # La semilla no cambia el resultado; la repetición da el mismo digest
+    run = db_session.get(SimulationRun, summary["run_id"])
+    replay = EcosystemSimulation.from_run(run, event_sink=NullLifecycleSink()).run(run.simulation_time)
+    assert replay["digest"] == summary["digest"]
+
+
+def test_expected_rates(db_session, environment):
+    simulation = EcosystemSimulation(db_session, environment.id, engine="meanfield")
+    engine = MeanFieldEngine(simulation)
+    derivatives = engine.derivatives(0.0, engine.y.copy())
+    size = engine.size
+    for i, organism in enumerate(simulation.organisms):
+        # Nadie está en temporada: con energía positiva solo muere un individuo con probabilidad death_rate
+        assert derivatives[i] == pytest.approx(-WAKE_RATE * organism.death_rate)
+        if organism.organism_type == "Plant":
+            growth = 0.1 * simulation.environment.resources * organism.growth_rate
+            assert derivatives[size + i] == pytest.approx(WAKE_RATE * (growth - 0.55))
+
+
+def test_hybrid_switches_to_stochastic_engine(db_session, environment):
+    # El lobo empieza con 15 individuos: con umbral 20 la corrida es estocástica desde el principio
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=2,
+                                     engine="meanfield", hybrid_threshold=20)
+    summary = simulation.run(30)
+    assert summary["meanfield"]["switched_at"] == 0 and summary["events"] > 0
+
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=2,
+                                     engine="meanfield", hybrid_threshold=14)
+    summary = simulation.run(400)
+    assert 0 < summary["meanfield"]["switched_at"] < 400
+    run = db_session.get(SimulationRun, summary["run_id"])
+    replay = EcosystemSimulation.from_run(run, event_sink=NullLifecycleSink()).run(run.simulation_time)
+    assert replay["digest"] == summary["digest"]
+
+
+def test_invalid_options(db_session, environment):
+    with pytest.raises(ValueError):
+        EcosystemSimulation(db_session, environment.id, hybrid_threshold=10)
+    with pytest.raises(ValueError):
+        EcosystemSimulation(db_session, environment.id, engine="meanfield", hybrid_threshold=0)
+    simulation = EcosystemSimulation(db_session, environment.id, engine="meanfield")
+    with pytest.raises(ValueError):
+        simulation.run(30, checkpoint_every=10, checkpoint_path="unused.ecosnap")
+
+
+def test_overflowing_population_fails_instead_of_saving_garbage(db_session, environment):
+    # Con temporada todo el año las plantas crecen hasta infinito
+    for organism in db_session.query(Organisms):
+        organism.reproduction_season = "all_year"
+    db_session.commit()
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), engine="meanfield")
+    with pytest.raises(OverflowError):
+        simulation.run(200)
+    db_session.expire_all()
+    assert all(organism.quantity >= 0 for organism in db_session.query(Organisms))
+    assert all(point.plant_population >= 0 for point in db_session.query(PopulationHistory))
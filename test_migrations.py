@@ -0,0 +1,67 @@
+# test_migrations.py
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from .database import Base
+from .event_sink import BufferedLifecycleSink
+from .migrations import upgrade_schema
+from .models import Lifecycle, PopulationHistory
+
+
+def old_schema_engine(tmp_path):
+    """Base creada antes de agregar las columnas de ADDED_COLUMNS."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    tables = [table for table in Base.metadata.sorted_tables if table.name not in ("population_history", "lifecycle")]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO environments (id, name, temperature, humidity, resources) "
+                                "VALUES (1, 'Bosque', 18.0, 0.6, 500.0)"))
+        connection.execute(text(
+            "CREATE TABLE population_history (id INTEGER PRIMARY KEY, environment_id INTEGER NOT NULL, "
+            "timestamp DATETIME NOT NULL, plant_population INTEGER NOT NULL, "
+            "herbivore_population INTEGER NOT NULL, predator_population INTEGER NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO population_history VALUES (1, 1, '2024-01-01 00:00:00', 10, 5, 1)"))
+        connection.execute(text(
+            "CREATE TABLE lifecycle (id INTEGER PRIMARY KEY, organism_id INTEGER NOT NULL, event_type VARCHAR NOT NULL, "
+            "description VARCHAR, energy FLOAT NOT NULL, quantity INTEGER NOT NULL, timestamp FLOAT NOT NULL)"
+        ))
+    return engine
+
+
+def test_upgrade_adds_new_columns(tmp_path):
+    engine = old_schema_engine(tmp_path)
+    assert upgrade_schema(engine) == ["population_history.run_id", "population_history.sim_time", "lifecycle.run_id"]
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("population_history")}
+    assert {"run_id", "sim_time"} <= columns
+    assert "ix_population_history_run_id" in {index["name"] for index in inspector.get_indexes("population_history")}
+
+    with engine.connect() as connection:
+        row = connection.execute(PopulationHistory.__table__.select()).one()
+    assert (row.plant_population, row.run_id, row.sim_time) == (10, None, None)
+    # Una segunda vez no hay nada que agregar
+    assert upgrade_schema(engine) == []
+    engine.dispose()
+
+
+def test_sinks_write_run_id_after_upgrade(tmp_path):
+    engine = old_schema_engine(tmp_path)
+    upgrade_schema(engine)
+    assert "ix_lifecycle_run_id" in {index["name"] for index in inspect(engine).get_indexes("lifecycle")}
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO organisms (id, name, organism_type, birth_rate, death_rate, "
+                                "initial_energy, quantity, reproduction_energy_threshold, min_energy_for_health) "
+                                "VALUES (1, 'Ciervo', 'Herbivore', 0.3, 0.1, 100.0, 50, 20.0, 15.0)"))
+        connection.execute(text("INSERT INTO simulation_runs (id, environment_id, engine, seed, start_time, "
+                                "simulation_time, status, initial_state, created_at) "
+                                "VALUES (7, 1, 'simpy', 1, 0, 1, 'completed', x'00', '2024-01-01 00:00:00')"))
+    session = sessionmaker(bind=engine)()
+    sink = BufferedLifecycleSink(session)
+    sink.run_id = 7
+    sink.record(1, "death", "Murió un ciervo", 1.0, 2, 1.0)
+    sink.close()
+    assert session.query(Lifecycle.run_id).scalar() == 7
+    session.close()
+    engine.dispose()
@@ -0,0 +1,51 @@
+# test_profiler.py
+
+import pstats
+
+import pytest
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import BufferedLifecycleSink, NullLifecycleSink
+from .models import SimulationRun
+from .profiler import SimulationMetrics, SimulationProfiler
+
+
+def test_profiler_nests_phases_exclusively():
+    profiler = SimulationProfiler()
+    profiler.enter("predation")
+    profiler.enter("event_logging")
+    profiler.exit()
+    profiler.exit()
+    assert profiler.calls == {"predation": 1, "event_logging": 1}
+    assert profiler.summary()["elapsed_seconds"] == pytest.approx(sum(profiler.seconds.values()), abs=1e-6)
+
+
+@pytest.mark.parametrize("engine", ["simpy", "vectorized"])
+def test_profiled_run_reports_phases_events_and_db_latency(db_session, environment, engine):
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=BufferedLifecycleSink(db_session),
+                                     engine=engine, seed=2, profile=True)
+    summary = simulation.run(30)
+    profile = summary["profile"]
+    assert {"scheduling", "metabolism", "event_logging", "history", "db"} <= set(profile["phases"])
+    assert sum(profile["events_by_type"].values()) == summary["events"]
+    assert profile["db_latency"]["count"] == sum(profile["db_latency"]["counts"]) > 0
+    assert profile["unattributed_seconds"] < profile["elapsed_seconds"]
+
+    # El perfilado no cambia el resultado: la repetición sin perfil da el mismo digest
+    replay = EcosystemSimulation.from_run(db_session.get(SimulationRun, summary["run_id"]),
+                                          event_sink=NullLifecycleSink()).run(30)
+    assert replay["profile"] is None and replay["digest"] == summary["digest"]
+
+    metrics = SimulationMetrics()
+    metrics.record(summary)
+    text = metrics.render([{"pool": "api", "checked_out": 1, "checkouts": 3, "timeouts": 0, "max_wait_ms": 2.0}])
+    assert f'ecosim_runs_total{{engine="{engine}",status="completed"}} 1' in text
+    assert 'ecosim_db_statement_seconds_bucket{le="+Inf"}' in text
+    assert 'ecosim_db_pool_checked_out{pool="api"} 1' in text
+
+
+def test_profile_capture_writes_cprofile_stats(environment, db_session, tmp_path):
+    path = str(tmp_path / "run.prof")
+    summary = EcosystemSimulation(db_session, environment.id, seed=1, profile_capture=path).run(5)
+    assert summary["profile"]["capture"]["path"] == path and summary["profile"]["capture"]["top"]
+    assert any(function == "organism_lifecycle" for _, _, function in pstats.Stats(path).stats)
@@ -0,0 +1,67 @@
+# test_read_cache.py
+
+from .read_cache import ReadCache, read_cache
+from .state import load_environment_state, load_organism_states, write_back_states
+
+
+def test_lru_ttl_and_token():
+    cache = ReadCache(ttl=60, max_bytes=300)
+    first = cache.put("a", 1, b"x" * 100)
+    cache.put("b", 2, b"y" * 100)
+    assert cache.get("a") is first
+    # "b" es la usada hace más tiempo: se desaloja al superar el tope
+    cache.put("c", 1, b"z" * 100)
+    assert cache.get("b") is None and cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] <= 300
+
+    assert cache.invalidate_environment(1) == 2 and cache.get("c") is None
+    # Una lectura que empezó antes de una invalidación no se guarda
+    token = cache.token()
+    cache.invalidate_environment(3)
+    cache.put("d", 3, b"viejo", token=token)
+    assert cache.get("d") is None
+
+    expired = ReadCache(ttl=-1, max_bytes=300)
+    expired.put("a", 1, b"x")
+    assert expired.get("a") is None and expired.stats()["hits"] == 0
+
+
+def test_etag_not_modified_and_invalidation(client):
+    environment = client.post("/environments/", json={
+        "name": "Bosque", "temperature": 18.0, "humidity": 0.6, "resources": 500.0, "surface_area": 10.0
+    }).json()
+    url = f"/environments/{environment['id']}"
+    first = client.get(url)
+    assert first.json() == environment
+    tag = first.headers["etag"]
+    assert client.get(url).content == first.content and read_cache.stats()["hits"] == 1
+
+    revalidated = client.get(url, headers={"If-None-Match": tag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert read_cache.stats()["not_modified"] == 1
+
+    client.put(url, json={"name": "Selva", "temperature": 25.0, "humidity": 0.9, "resources": 800.0,
+                          "surface_area": 12.0})
+    changed = client.get(url, headers={"If-None-Match": tag})
+    assert changed.status_code == 200 and changed.json()["name"] == "Selva" and changed.headers["etag"] != tag
+
+    organism = client.post("/organisms/", json={
+        "name": "Ciervo", "organism_type": "Herbivore", "birth_rate": 0.3, "death_rate": 0.1,
+        "initial_energy": 100.0, "quantity": 50, "environment_id": environment["id"], "growth_rate": 1.05,
+        "energy_consumption_rate": 10.0, "reproduction_season": "Primavera", "lifespan": 15.0,
+        "reproduction_energy_threshold": 20.0, "min_energy_for_health": 15.0
+    }).json()
+    assert [o["quantity"] for o in client.get(f"{url}/organisms/").json()] == [50]
+    assert client.get(f"/organisms/{organism['id']}").json()["quantity"] == 50
+    client.put("/organisms/bulk", json=[dict(organism, quantity=7)])
+    assert [o["quantity"] for o in client.get(f"{url}/organisms/").json()] == [7]
+    assert client.get(f"/organisms/{organism['id']}").json()["quantity"] == 7
+    assert "ecosim_read_cache_lookups_total" in client.get("/metrics").text
+
+
+def test_simulation_write_back_invalidates(db_session, environment):
+    read_cache.clear()
+    read_cache.put(("environment", environment.id), environment.id, b"{}")
+    write_back_states(db_session, load_organism_states(db_session, environment.id),
+                      load_environment_state(db_session, environment.id))
+    assert read_cache.get(("environment", environment.id)) is None
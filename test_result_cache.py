@@ -0,0 +1,86 @@
+# test_result_cache.py
+
+import os
+
+from . import main
+from .conftest import FIXTURE_ORGANISMS
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .result_cache import ResultCache, run_cached
+from .state import load_environment_state, load_organism_states
+
+
+ENVIRONMENT = {"name": "Bosque", "temperature": 18.0, "humidity": 0.6, "resources": 500.0, "surface_area": 10.0}
+
+
+def test_hit_through_the_api_after_restoring_state(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "result_cache", ResultCache(tmp_path))
+    environment_id = client.post("/environments/", json=ENVIRONMENT).json()["id"]
+    ids = client.post("/organisms/bulk", json=[dict(data, environment_id=environment_id)
+                                               for data in FIXTURE_ORGANISMS]).json()["ids"]
+    initial = [client.get(f"/organisms/{organism_id}").json() for organism_id in ids]
+
+    def simulate(seed=3):
+        response = client.post(f"/ecosystem/simulate/{environment_id}", params={"time": 20, "seed": seed})
+        return response.json()["summary"]
+
+    def restore():
+        # Lo que haría el front-end para repetir la corrida: el estado inicial con PUT
+        client.put(f"/environments/{environment_id}", json=ENVIRONMENT)
+        client.put("/organisms/bulk", json=initial)
+
+    first = simulate()
+    assert first["cached"] is False
+    final = [client.get(f"/organisms/{organism_id}").json() for organism_id in ids]
+    # Seguir desde el estado final es otra corrida
+    assert simulate()["cached"] is False
+
+    restore()
+    second = simulate()
+    assert second["cached"] is True
+    assert second["digest"] == first["digest"] and second["run_id"] == first["run_id"]
+    assert len(second["trajectory"]["population"]) == 20
+    # No se registró otra corrida, pero la base quedó como después de correr
+    assert len(client.get("/runs/", params={"environment_id": environment_id}).json()) == 2
+    assert [client.get(f"/organisms/{organism_id}").json() for organism_id in ids] == final
+
+    # Otra semilla es otra clave
+    restore()
+    other = simulate(seed=4)
+    assert other["cached"] is False and other["cache_key"] != first["cache_key"]
+
+
+def test_eviction_and_invalidation(db_session, environment, tmp_path):
+    cache = ResultCache(tmp_path)
+    paths = []
+    for seed in range(3):
+        simulation = EcosystemSimulation.from_states(load_organism_states(db_session, environment.id),
+                                                     load_environment_state(db_session, environment.id),
+                                                     event_sink=NullLifecycleSink(), seed=seed)
+        summary = run_cached(simulation, 5, cache)
+        paths.append(cache.path(summary["cache_key"], environment.id))
+        os.utime(paths[-1], (seed, seed))  # orden de uso explícito
+    assert cache.stats()["entries"] == 3
+
+    # Con lugar solo para la última usada se desalojan las otras dos
+    cache.max_bytes = os.path.getsize(paths[-1])
+    cache.evict()
+    assert cache.stats()["entries"] == 1 and cache.evictions == 2
+    assert os.path.exists(paths[-1])
+
+    assert cache.invalidate_environment(environment.id + 1) == 0
+    assert cache.invalidate_environment(environment.id) == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_sampled_run_stores_sample_times(db_session, environment, tmp_path):
+    cache = ResultCache(tmp_path)
+    for expected_cached in (False, True):
+        simulation = EcosystemSimulation.from_states(load_organism_states(db_session, environment.id),
+                                                     load_environment_state(db_session, environment.id),
+                                                     event_sink=NullLifecycleSink(), seed=3, sample_every=10)
+        summary = run_cached(simulation, 35, cache)
+        assert summary["cached"] is expected_cached
+    # Una muestra cada 10 días y otra al terminar
+    assert summary["trajectory"]["sim_time"] == [10, 20, 30, 35]
+    assert len(summary["trajectory"]["population"]) == 4
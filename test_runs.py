@@ -0,0 +1,43 @@
+# test_runs.py
+
+import pytest
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .models import Organisms, SimulationRun
+from .state import load_environment_state, load_organism_states
+
+
+def test_run_is_recorded_and_replays_bit_for_bit(db_session, environment):
+    summary = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=21).run(30)
+    run = db_session.get(SimulationRun, summary["run_id"])
+    assert run.status == "completed"
+    assert run.seed == 21 and run.engine == "simpy"
+    assert run.digest == summary["digest"]
+
+    replay = EcosystemSimulation.from_run(run, event_sink=NullLifecycleSink()).run(run.simulation_time)
+    assert replay["digest"] == run.digest
+    assert replay["population"] == summary["population"]
+
+    other = EcosystemSimulation.from_run(run, event_sink=NullLifecycleSink(), seed=22)
+    assert other.seed == 21  # from_run siempre usa la semilla registrada
+
+
+def test_seed_is_chosen_and_recorded_when_missing(db_session, environment):
+    summary = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), engine="vectorized").run(5)
+    assert db_session.get(SimulationRun, summary["run_id"]).seed == summary["seed"]
+
+
+@pytest.mark.parametrize("name", ["Helecho", "Ciervo", "Lobo"])
+def test_engines_agree_on_isolated_population(db_session, environment, name):
+    # Cada población tiene su propio flujo: sin interacciones, los dos motores coinciden bit a bit
+    db_session.query(Organisms).filter(Organisms.name != name).delete()
+    db_session.commit()
+    results = []
+    for engine in ("simpy", "vectorized"):
+        organisms = load_organism_states(db_session, environment.id)
+        base = load_environment_state(db_session, environment.id)
+        simulation = EcosystemSimulation.from_states(organisms, base, event_sink=NullLifecycleSink(),
+                                                     engine=engine, seed=5)
+        results.append(simulation.run(40)["digest"])
+    assert results[0] == results[1]
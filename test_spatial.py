@@ -0,0 +1,96 @@
+# test_spatial.py
+
+import numpy as np
+import pytest
+
+from .conftest import FIXTURE_ORGANISMS
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .models import Organisms, PopulationHistory
+from .spatial import SpatialGrid, SpeciesParameters, box_sum, cell_keys, grid_shape
+from .state import EnvironmentState, OrganismState
+
+
+def fixture_states(surface_area, scale=1):
+    organisms = [OrganismState(id=i + 1, environment_id=1, **dict(data, quantity=data["quantity"] * scale))
+                 for i, data in enumerate(FIXTURE_ORGANISMS)]
+    environment = EnvironmentState(id=1, name="Bosque", temperature=18.0, humidity=0.6,
+                                   resources=500.0 * surface_area, surface_area=surface_area)
+    return organisms, environment
+
+
+def test_grid_shape_and_neighborhood_sum():
+    assert grid_shape(1_000_000) == (1000, 1000)
+    assert grid_shape(10) == (4, 3)
+    assert grid_shape(None) == (1, 1)
+    values = np.zeros((5, 5))
+    values[0, 0] = 1.0
+    assert box_sum(values)[:2, :2].tolist() == [[1.0, 1.0], [1.0, 1.0]]
+    assert box_sum(values).sum() == 4.0
+
+
+def test_predators_only_hunt_in_their_neighborhood():
+    organisms, _ = fixture_states(1)
+    herbivore, carnivore = organisms[0], organisms[1]
+    params = SpeciesParameters([herbivore, carnivore], migration_rate=0.0)
+    quantity = np.zeros((2, 1, 7), dtype=np.int64)
+    energy = np.full((2, 1, 7), 100.0)
+    quantity[0, 0, [1, 6]] = 10  # Presas junto al depredador y lejos de él
+    quantity[1, 0, 0] = 3
+    grid = SpatialGrid(params, np.zeros((1, 7)), quantity, energy, cell_keys(5, [1, 2], 7, 0, 1))
+    awake = quantity > 0
+    action = np.full(awake.shape, 0.5)
+    grid._hunt(awake, action)
+    # La presa vecina pierde lo que gana el depredador; la lejana no se toca
+    assert energy[1, 0, 0] - 100.0 == 100.0 - energy[0, 0, 1] == 2.0
+    assert energy[0, 0, 6] == 100.0
+
+
+def test_partitioned_grid_matches_single_process():
+    summaries = []
+    for workers in (1, 3):
+        organisms, environment = fixture_states(400, scale=40)
+        simulation = EcosystemSimulation.from_states(organisms, environment, engine="spatial", seed=7,
+                                                     event_sink=NullLifecycleSink(), spatial_workers=workers)
+        summaries.append(simulation.run(20))
+    assert summaries[0]["digest"] == summaries[1]["digest"]
+    assert summaries[0]["events"] == summaries[1]["events"] > 0
+
+
+def test_spatial_engine_writes_history_and_state(db_session, environment):
+    simulation = EcosystemSimulation(db_session, environment.id, engine="spatial", seed=3)
+    summary = simulation.run(simulation_time=15)
+
+    assert simulation.spatial.shape == (4, 3)
+    assert db_session.query(PopulationHistory).count() == 15
+    stored = {o.organism_type: o.quantity for o in db_session.query(Organisms)}
+    plants, herbivores, predators = simulation.population_counts()
+    assert stored == {"Plant": plants, "Herbivore": herbivores, "Carnivore": predators}
+    assert summary["population"] == {"plant": plants, "herbivore": herbivores, "predator": predators}
+
+
+def test_hunted_groups_never_go_negative():
+    # Grupos que la caza deja sin individuos y que además mueren en la fase de muerte del mismo día
+    for seed in range(6):
+        organisms, environment = fixture_states(100)
+        for organism in organisms:
+            organism.reproduction_season = "all_year"
+        environment.resources = 500.0
+        simulation = EcosystemSimulation.from_states(organisms, environment, engine="spatial", cell_area=1.0,
+                                                     seed=seed, event_sink=NullLifecycleSink())
+        simulation.run(200)
+        assert simulation.spatial.grid.quantity.min() >= 0
+        assert min(min(counts) for counts in simulation.trajectory) >= 0
+        assert all(organism.quantity >= 0 for organism in simulation.organisms)
+
+
+def test_population_overflow_fails_instead_of_wrapping():
+    # Una sola celda con temporada todo el año: las plantas pasan el máximo de int64 como en los otros motores
+    organisms, environment = fixture_states(1)
+    for organism in organisms:
+        organism.reproduction_season = "all_year"
+    environment.resources = 500.0
+    simulation = EcosystemSimulation.from_states(organisms, environment, engine="spatial", seed=0,
+                                                 event_sink=NullLifecycleSink())
+    with pytest.raises(OverflowError):
+        simulation.run(400)
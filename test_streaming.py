@@ -0,0 +1,55 @@
+# test_streaming.py
+
+import random
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .streaming import SimulationStream, StreamRegistry
+
+
+def test_stream_delivers_snapshots_in_order():
+    stream = SimulationStream(capacity=10)
+    for day in range(1, 4):
+        stream.publish({"sim_time": day})
+    snapshots, cursor, skipped = stream.read(0)
+    assert [s["sim_time"] for s in snapshots] == [1, 2, 3]
+    assert (cursor, skipped) == (3, 0)
+    assert stream.read(cursor) == ([], 3, 0)
+
+
+def test_slow_subscriber_is_coalesced_to_latest():
+    stream = SimulationStream(capacity=5)
+    for day in range(1, 21):
+        stream.publish({"sim_time": day})
+    snapshots, cursor, skipped = stream.read(0)
+    assert snapshots == [{"sim_time": 20}]
+    assert (cursor, skipped) == (20, 19)
+
+
+def test_registry_drops_finished_streams():
+    registry = StreamRegistry(ttl=3600)
+    registry.open("a")
+    stream = registry.subscribe("a")
+    registry.close("a")
+    # Cerrado pero con un suscriptor leyendo: se conserva
+    assert registry.get("a") is stream
+    registry.unsubscribe("a", stream)
+    assert registry.get("a") is None and len(registry) == 0
+
+    # Cerrado y sin suscriptores: vive hasta el TTL
+    registry.open("b")
+    registry.close("b")
+    assert registry.get("b") is not None
+    registry.ttl = 0
+    assert registry.get("b") is None and registry.subscribe("b") is None
+
+
+def test_simulation_publishes_one_snapshot_per_day(db_session, environment):
+    stream = SimulationStream()
+    random.seed(1)
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink())
+    simulation.day_callbacks.append(lambda sim: stream.publish(sim.population_snapshot()))
+    simulation.run(simulation_time=30)
+    snapshots, _, _ = stream.read(0, max_batch=100)
+    assert [s["sim_time"] for s in snapshots] == list(range(1, 31))
+    assert snapshots[-1]["herbivore"] == simulation.population_counts()[1]
@@ -0,0 +1,60 @@
+# test_sweep.py
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from .conftest import FIXTURE_ORGANISMS
+from .database import Base
+from .models import Environment, Organisms, PopulationHistory
+from .state import load_environment_state, load_organism_states
+from .sweep import apply_overrides, expand_grid, run_sweep, validate_overrides
+
+
+def test_overrides_apply_to_copies(db_session, environment):
+    organisms = load_organism_states(db_session, environment.id)
+    base = load_environment_state(db_session, environment.id)
+    overrides = {"resources": 50.0, "death_rate": 0.3, "Lobo.birth_rate": 0.5, "Plant.growth_rate": 2.0}
+    copies, copy = apply_overrides(organisms, base, overrides)
+    by_name = {organism.name: organism for organism in copies}
+    assert copy.resources == 50.0 and base.resources == 500.0
+    assert all(organism.death_rate == 0.3 for organism in copies)
+    assert by_name["Lobo"].birth_rate == 0.5 and by_name["Ciervo"].birth_rate == 0.3
+    assert by_name["Helecho"].growth_rate == 2.0
+    assert {organism.name: organism.death_rate for organism in organisms}["Lobo"] == 0.05
+
+    with pytest.raises(ValueError):
+        validate_overrides({"Lobo.color": 1})
+    with pytest.raises(ValueError):
+        validate_overrides({"id": 3})
+
+
+def test_sweep_aggregates_replicates(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'sweep.db'}"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    environment = Environment(name="Bosque", temperature=18.0, humidity=0.6, resources=500.0, surface_area=10.0)
+    session.add(environment)
+    session.commit()
+    for data in FIXTURE_ORGANISMS:
+        session.add(Organisms(environment_id=environment.id, **data))
+    session.commit()
+    try:
+        configurations = expand_grid({"resources": [100.0, 500.0], "Lobo.death_rate": [0.05]})
+        result = run_sweep(environment.id, 10, configurations, seeds=[0, 1, 2], engine="vectorized",
+                           max_workers=2, database_url=database_url)
+        assert result["runs"] == 6
+        assert [row["overrides"]["resources"] for row in result["configurations"]] == [100.0, 500.0]
+        for row in result["configurations"]:
+            assert row["seeds"] == [0, 1, 2]
+            assert row["days"] == list(range(1, 11))
+            bands = row["population"]["plant"]
+            assert len(bands["mean"]) == 10
+            assert all(low <= mid <= high for low, mid, high in zip(bands["p10"], bands["p50"], bands["p90"]))
+        # Las corridas del barrido no escriben en la base
+        assert session.query(PopulationHistory).count() == 0
+        assert session.get(Environment, environment.id).resources == 500.0
+    finally:
+        session.close()
+        engine.dispose()
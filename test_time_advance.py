@@ -0,0 +1,60 @@
+# test_time_advance.py
+
+import pytest
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .models import Organisms, PopulationHistory, SimulationRun
+from .state import load_environment_state, load_organism_states
+
+
+def run_in_memory(db_session, environment, days, **kwargs):
+    simulation = EcosystemSimulation.from_states(load_organism_states(db_session, environment.id),
+                                                 load_environment_state(db_session, environment.id),
+                                                 event_sink=NullLifecycleSink(), seed=11, **kwargs)
+    return simulation, simulation.run(days)
+
+
+def test_fixed_step_matches_discrete_events(db_session, environment, tmp_path):
+    for organism in db_session.query(Organisms):
+        organism.reproduction_season = "all_year"
+    db_session.commit()
+    expected, discrete = run_in_memory(db_session, environment, 60)
+    _, fixed = run_in_memory(db_session, environment, 60, time_advance="fixed")
+    assert fixed["digest"] == discrete["digest"] and fixed["events"] == discrete["events"]
+
+    # Un checkpoint del modo discreto se reanuda en el modo de paso fijo
+    path = str(tmp_path / "run.ecosnap")
+    EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=11).run(
+        30, checkpoint_every=30, checkpoint_path=path)
+    resumed = EcosystemSimulation.from_checkpoint(db_session, environment.id, path, event_sink=NullLifecycleSink(),
+                                                  time_advance="fixed")
+    resumed.run(60)
+    assert [(o.id, o.initial_energy, o.quantity) for o in resumed.organisms] == \
+        [(o.id, o.initial_energy, o.quantity) for o in expected.organisms]
+
+
+@pytest.mark.parametrize("time_advance", ["discrete", "fixed"])
+def test_sampling_interval(db_session, environment, time_advance):
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=4,
+                                     time_advance=time_advance, sample_every=7)
+    summary = simulation.run(30)
+    # Muestras en los días 7, 14, 21, 28 y al terminar
+    assert len(simulation.trajectory) == 5
+    days = [point.sim_time for point in db_session.query(PopulationHistory).order_by(PopulationHistory.sim_time)]
+    assert days == [7, 14, 21, 28, 30]
+
+    # La repetición usa el mismo intervalo, guardado con la corrida
+    run = db_session.get(SimulationRun, summary["run_id"])
+    replay = EcosystemSimulation.from_run(run, event_sink=NullLifecycleSink()).run(run.simulation_time)
+    assert replay["digest"] == summary["digest"]
+
+
+def test_invalid_options(db_session, environment):
+    with pytest.raises(ValueError):
+        EcosystemSimulation(db_session, environment.id, time_advance="hourly")
+    with pytest.raises(ValueError):
+        EcosystemSimulation(db_session, environment.id, sample_every=0)
+    simulation = EcosystemSimulation(db_session, environment.id, sample_every=7)
+    with pytest.raises(ValueError):
+        simulation.run(30, checkpoint_every=10, checkpoint_path="unused.ecosnap")
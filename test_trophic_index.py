@@ -0,0 +1,36 @@
+# test_trophic_index.py
+
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .models import Organisms
+from .trophic_index import TrophicIndex
+
+
+def test_index_matches_full_scan_after_run(db_session, environment):
+    for _ in range(5):
+        for organism in db_session.query(Organisms).filter(Organisms.environment_id == environment.id).all():
+            db_session.add(Organisms(**{c.name: getattr(organism, c.name) for c in Organisms.__table__.columns if c.name != "id"}))
+    db_session.commit()
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(), seed=5)
+    simulation.run(simulation_time=60)
+
+    organisms = simulation.organisms
+    index = simulation.index
+    assert index.alive_plants == {o for o in organisms if o.organism_type == "Plant" and o.initial_energy > 0}
+    assert set(index.alive_herbivores) == {o for o in organisms if o.organism_type == "Herbivore" and o.initial_energy > 0}
+    assert len(index.alive_herbivores) == len(set(index.alive_herbivores))
+    assert index.population_counts() == tuple(
+        sum(o.quantity for o in organisms if o.organism_type == kind) for kind in ("Plant", "Herbivore", "Carnivore")
+    )
+
+
+def test_herbivore_removal_keeps_positions():
+    herbivores = [Organisms(name=f"Ciervo {i}", organism_type="Herbivore", initial_energy=1.0, quantity=1)
+                  for i in range(4)]
+    index = TrophicIndex(herbivores)
+    herbivores[1].initial_energy = 0
+    index.energy_changed(herbivores[1], 1.0)
+    assert sorted(o.name for o in index.alive_herbivores) == ["Ciervo 0", "Ciervo 2", "Ciervo 3"]
+    herbivores[1].initial_energy = 2.0
+    index.energy_changed(herbivores[1], 0)
+    assert len(index.alive_herbivores) == 4
@@ -0,0 +1,69 @@
+# test_vectorized_engine.py
+
+import numpy as np
+import pytest
+
+from .conftest import FIXTURE_ORGANISMS
+from .ecosystem_simulation import EcosystemSimulation
+from .event_sink import NullLifecycleSink
+from .models import Environment, Lifecycle, Organisms, PopulationHistory
+
+
+def reset_environment(db_session, environment):
+    """Devuelve el entorno y sus organismos al estado inicial (todo el año en temporada)."""
+    environment.resources = 500.0
+    for organism in db_session.query(Organisms).filter(Organisms.environment_id == environment.id):
+        data = next(d for d in FIXTURE_ORGANISMS if d["name"] == organism.name)
+        organism.initial_energy = data["initial_energy"]
+        organism.quantity = data["quantity"]
+        organism.reproduction_season = "all_year"
+    db_session.commit()
+
+
+def final_state(db_session, environment, engine, seed):
+    reset_environment(db_session, environment)
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(),
+                                     engine=engine, seed=seed)
+    simulation.run(simulation_time=40)
+    _, herbivores, predators = simulation.population_counts()
+    return herbivores, predators, simulation.environment.resources
+
+
+def test_vectorized_engine_is_statistically_equivalent(db_session, environment):
+    seeds = range(20)
+    simpy_runs = np.array([final_state(db_session, environment, "simpy", seed) for seed in seeds])
+    vectorized_runs = np.array([final_state(db_session, environment, "vectorized", seed) for seed in seeds])
+    standard_error = np.sqrt(simpy_runs.var(axis=0) / len(seeds) + vectorized_runs.var(axis=0) / len(seeds))
+    difference = np.abs(simpy_runs.mean(axis=0) - vectorized_runs.mean(axis=0))
+    assert np.all(difference <= 4 * standard_error + 1.0)
+
+
+def test_vectorized_engine_writes_history_lifecycle_and_state(db_session, environment):
+    simulation = EcosystemSimulation(db_session, environment.id, engine="vectorized", seed=3)
+    summary = simulation.run(simulation_time=15)
+
+    assert db_session.query(PopulationHistory).count() == 15
+    assert db_session.query(Lifecycle).count() == summary["events"] > 0
+    plants, herbivores, predators = simulation.population_counts()
+    stored = {o.organism_type: o.quantity for o in db_session.query(Organisms)}
+    assert stored == {"Plant": plants, "Herbivore": herbivores, "Carnivore": predators}
+    db_session.expire_all()
+    assert db_session.get(Environment, environment.id).resources == simulation.vectorized.resources
+
+
+def test_vectorized_engine_is_reproducible_with_seed(db_session, environment):
+    first = final_state(db_session, environment, "vectorized", 11)
+    second = final_state(db_session, environment, "vectorized", 11)
+    assert first == second
+
+
+def test_population_overflow_fails_instead_of_wrapping(db_session, environment):
+    # Con temporada todo el año las plantas crecen sin tope: como el motor SimPy, la corrida falla
+    reset_environment(db_session, environment)
+    simulation = EcosystemSimulation(db_session, environment.id, event_sink=NullLifecycleSink(),
+                                     engine="vectorized", seed=0)
+    with pytest.raises(OverflowError):
+        simulation.run(simulation_time=200)
+    db_session.expire_all()
+    assert all(organism.quantity >= 0 for organism in db_session.query(Organisms))
+    assert all(point.plant_population >= 0 for point in db_session.query(PopulationHistory))
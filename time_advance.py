@@ -0,0 +1,82 @@
+"""Avance del tiempo del motor SimPy.
+
+Hay dos modos, y los dos dan el mismo resultado bit a bit:
+
+- "discrete": un proceso SimPy por población y otro que toma las muestras de la
+  historia cada `sample_every` días; `run()` entra una sola vez al planificador.
+- "fixed": sin procesos SimPy. Los despertares pendientes quedan en un heap ordenado
+  como la cola de SimPy (tiempo y orden de programación) y se procesan de a un día,
+  todas las poblaciones que despiertan ese día en un lote.
+"""
+import heapq
+import simpy
+from simpy.events import URGENT
+
+TIME_ADVANCE_MODES = ("discrete", "fixed")
+
+
+class UrgentTimeout(simpy.Timeout):
+    """Timeout que se procesa antes que los despertares (prioridad normal) del mismo instante.
+
+    Así la muestra del día `t` ve el estado al cerrar el día anterior, igual que
+    cuando se avanzaba con `env.run(until=t)`.
+    """
+
+    def __init__(self, env, delay, value=None):
+        if delay < 0:
+            raise ValueError(f"Negative delay {delay}")
+        self.env = env
+        self.callbacks = []
+        self._value = value
+        self._delay = delay
+        self._ok = True
+        env.schedule(self, URGENT, delay)
+
+
+class FixedStepScheduler:
+    """Despertares de las poblaciones de una simulación SimPy procesados por día, sin generadores.
+
+    Tiene la misma interfaz que VectorizedEngine (`advance`) y mantiene
+    `simulation.pending_wakes`, así los checkpoints son los del modo "discrete".
+    """
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.heap = []
+        if simulation.restored_snapshot is None:
+            for organism in simulation.organisms:
+                if organism.quantity > 0:
+                    self.schedule(organism)
+        else:
+            # Los pendientes del checkpoint mantienen su tiempo y su orden
+            by_id = {organism.id: organism for organism in simulation.organisms}
+            for organism_id, (wake_time, order) in simulation.pending_wakes.items():
+                self.heap.append((wake_time, order, by_id[organism_id]))
+            heapq.heapify(self.heap)
+
+    def schedule(self, organism):
+        """Programa el próximo despertar de `organism` (mismos números que organism_lifecycle)."""
+        simulation = self.simulation
+        wake_time = simulation.env.now + simulation.streams[organism.id].randint(1, 5)
+        simulation._wake_counter += 1
+        simulation.pending_wakes[organism.id] = (wake_time, simulation._wake_counter)
+        heapq.heappush(self.heap, (wake_time, simulation._wake_counter, organism))
+
+    def advance(self, until):
+        """Procesa todos los despertares con tiempo menor que `until`, un día por lote."""
+        simulation = self.simulation
+        env = simulation.env
+        heap = self.heap
+        step = simulation.step_organism
+        streams = simulation.streams
+        while heap and heap[0][0] < until:
+            wake_time = heap[0][0]
+            if wake_time > env.now:
+                env.run(until=wake_time)  # Solo avanza el reloj; no hay procesos SimPy
+            while heap and heap[0][0] == wake_time:
+                organism = heapq.heappop(heap)[2]
+                step(organism, streams[organism.id])
+                if organism.quantity > 0:
+                    self.schedule(organism)
+                else:
+                    simulation.pending_wakes.pop(organism.id, None)
@@ -0,0 +1,59 @@
+class TrophicIndex:
+    """Índices incrementales del padrón de organismos por tipo trófico.
+
+    Mantiene el conjunto de plantas vivas, la lista de herbívoros vivos (para elegir
+    una presa al azar en O(1)) y el total de individuos por tipo. "Vivo" sigue el
+    criterio del motor: energía mayor que cero. La simulación avisa cada cambio de
+    energía o de cantidad, así ninguna consulta recorre todo el padrón.
+    """
+
+    def __init__(self, organisms):
+        self.alive_plants = set()
+        self.alive_herbivores = []
+        self._herbivore_positions = {}
+        self.totals = {"Plant": 0, "Herbivore": 0, "Carnivore": 0}
+        for organism in organisms:
+            self.add(organism)
+
+    def add(self, organism):
+        """Incorpora un organismo al índice con su estado actual."""
+        self.totals[organism.organism_type] = self.totals.get(organism.organism_type, 0) + organism.quantity
+        if organism.initial_energy > 0:
+            self._mark_alive(organism)
+
+    def energy_changed(self, organism, previous_energy):
+        """Actualiza los conjuntos de vivos si la energía cruzó el cero."""
+        alive_now = organism.initial_energy > 0
+        if alive_now != (previous_energy > 0):
+            if alive_now:
+                self._mark_alive(organism)
+            else:
+                self._mark_dead(organism)
+
+    def quantity_changed(self, organism, delta):
+        """Suma la variación de individuos al total de su tipo."""
+        self.totals[organism.organism_type] = self.totals.get(organism.organism_type, 0) + delta
+
+    def _mark_alive(self, organism):
+        if organism.organism_type == "Plant":
+            self.alive_plants.add(organism)
+        elif organism.organism_type == "Herbivore" and organism not in self._herbivore_positions:
+            self._herbivore_positions[organism] = len(self.alive_herbivores)
+            self.alive_herbivores.append(organism)
+
+    def _mark_dead(self, organism):
+        if organism.organism_type == "Plant":
+            self.alive_plants.discard(organism)
+        elif organism.organism_type == "Herbivore":
+            position = self._herbivore_positions.pop(organism, None)
+            if position is None:
+                return
+            # Intercambia con el último para quitarlo en O(1)
+            last = self.alive_herbivores.pop()
+            if last is not organism:
+                self.alive_herbivores[position] = last
+                self._herbivore_positions[last] = position
+
+    def population_counts(self):
+        """Devuelve (plantas, herbívoros, depredadores) sin recorrer el padrón."""
+        return self.totals["Plant"], self.totals["Herbivore"], self.totals["Carnivore"]
@@ -0,0 +1,335 @@
+import numpy as np
+from .cohorts import CohortStore, offspring
+from .rng import stream_keys, stream_values
+
+# Códigos numéricos de los tipos tróficos usados en los arreglos
+PLANT, HERBIVORE, CARNIVORE = 0, 1, 2
+TYPE_CODES = {"Plant": PLANT, "Herbivore": HERBIVORE, "Carnivore": CARNIVORE}
+SEASONS = ("spring", "summer", "fall", "winter")
+
+
+class VectorizedEngine:
+    """Motor alternativo que avanza todas las poblaciones de un entorno por día con NumPy.
+
+    Reproduce las reglas de `EcosystemSimulation.organism_lifecycle`: cada población
+    despierta cada 1-5 días y, en ese día, aplica su acción (crecimiento, pastoreo o
+    caza), el metabolismo, la reproducción y la muerte. En lugar de un generador de
+    SimPy por población, todas las poblaciones que despiertan el mismo día se
+    procesan juntas con operaciones sobre arreglos.
+    """
+
+    def __init__(self, simulation, now=None):
+        self.simulation = simulation
+        organisms = simulation.organisms
+        self.names = [org.name for org in organisms]
+        self.ids = np.array([org.id for org in organisms], dtype=np.int64)
+        self.types = np.array([TYPE_CODES.get(org.organism_type, -1) for org in organisms], dtype=np.int8)
+        self.energy = np.array([org.initial_energy for org in organisms], dtype=np.float64)
+        self.quantity = np.array([org.quantity for org in organisms], dtype=np.int64)
+        self.growth_rate = np.array([org.growth_rate or 0.0 for org in organisms], dtype=np.float64)
+        self.birth_rate = np.array([org.birth_rate for org in organisms], dtype=np.float64)
+        self.death_rate = np.array([org.death_rate for org in organisms], dtype=np.float64)
+        self.reproduction_threshold = np.array(
+            [org.reproduction_energy_threshold for org in organisms], dtype=np.float64
+        )
+        # Máscara de temporada de reproducción por estación
+        self.season_masks = {
+            season: np.array([org.reproduction_season in ("all_year", season) for org in organisms], dtype=bool)
+            for season in SEASONS
+        }
+        self.resources = float(simulation.environment.resources)
+        # Poblaciones cuyo proceso sigue activo y el día en que vuelven a despertar
+        # Flujo aleatorio propio de cada población, el mismo que usa el motor SimPy
+        self.keys = stream_keys(simulation.seed, self.ids.tolist())
+        self.draws = np.zeros(len(organisms), dtype=np.uint64)
+        self.active = self.quantity > 0
+        self.next_wake = np.full(len(organisms), -1, dtype=np.int64)
+        # `now`: día desde el que sigue una corrida empezada por otro motor (ver meanfield.py)
+        self.now = int(simulation.env.now if now is None else now)
+        idx = np.flatnonzero(self.active)
+        self.next_wake[idx] = self.now + self._randint(idx, 1, 5)
+        self.keep_events = simulation.event_sink.keeps_events
+        self.keep_descriptions = simulation.event_sink.keeps_descriptions
+        self.profiler = simulation.profiler
+        # Con `age_bins` cada población tiene estructura de edades (ver cohorts.py); los arreglos
+        # `energy`/`quantity` siguen siendo el total y la media, y las cohortes se ponen al día
+        # con sus cambios en _sync_cohorts
+        self.cohorts = None
+        if simulation.age_bins:
+            self.cohorts = CohortStore(self.quantity, self.energy, [org.lifespan for org in organisms],
+                                       simulation.age_bins, now=self.now)
+            self._cohort_energy = self.energy.copy()
+            self._cohort_quantity = self.quantity.copy()
+
+    def population_counts(self):
+        """Devuelve (plantas, herbívoros, depredadores) sumando las cantidades por tipo."""
+        totals = np.bincount(self.types[self.types >= 0], weights=self.quantity[self.types >= 0], minlength=3)
+        return int(totals[PLANT]), int(totals[HERBIVORE]), int(totals[CARNIVORE])
+
+    def _random(self, idx):
+        """Siguiente número en [0, 1) del flujo de cada población en `idx`."""
+        self.draws[idx] += np.uint64(1)
+        return stream_values(self.keys[idx], self.draws[idx])
+
+    def _uniform(self, idx, low, high):
+        return low + (high - low) * self._random(idx)
+
+    def _randint(self, idx, low, high):
+        """Enteros en [low, high], como PopulationStream.randint."""
+        return low + (self._random(idx) * (high - low + 1)).astype(np.int64)
+
+    def advance(self, until):
+        """Procesa día a día todos los despertares con tiempo menor que `until`."""
+        while self.now < until:
+            if self.cohorts is not None:
+                self._age(self.now)
+            self.step(self.now)
+            self.now += 1
+
+    def step(self, day):
+        """Aplica un día de simulación a todas las poblaciones que despiertan en `day`."""
+        due = self.active & (self.next_wake == day)
+        if not due.any():
+            return
+        events = []
+        profiler = self.profiler
+        profiler.enter("growth")
+        self._plants_grow(day, due, events)
+        profiler.exit()
+        profiler.enter("grazing")
+        self._herbivores_graze(day, due, events)
+        profiler.exit()
+        profiler.enter("predation")
+        self._carnivores_hunt(day, due, events)
+        profiler.exit()
+
+        # Pérdida de energía por metabolismo
+        profiler.enter("metabolism")
+        idx = np.flatnonzero(due)
+        loss = self._uniform(idx, 0.1, 1.0)
+        self.energy[idx] -= loss
+        self._emit(events, idx, day, "energy_loss", "{name} perdió {value:.2f} de energía.", loss)
+        profiler.exit()
+
+        # Reproducción
+        profiler.enter("reproduction")
+        season = self.simulation.get_current_season(day)
+        if self.cohorts is not None:
+            idx, births = self._reproduce_cohorts(np.flatnonzero(due & self.season_masks[season]))
+        else:
+            idx = np.flatnonzero(due & self.season_masks[season] & (self.energy >= self.reproduction_threshold))
+            births = offspring(self.quantity[idx], self.birth_rate[idx])
+            self.quantity[idx] += births
+            self.energy[idx] -= self.reproduction_threshold[idx]
+        if idx.size:
+            self._emit(events, idx, day, "reproduction",
+                       "{name} se ha reproducido. Nuevos individuos: {value}", births)
+        profiler.exit()
+
+        # Muerte
+        profiler.enter("death")
+        idx = np.flatnonzero(due)
+        dies = self.energy[idx] <= 0
+        # Como en el motor SimPy, solo se sortea la muerte de las poblaciones con energía
+        alive = idx[~dies]
+        dies[~dies] = self._random(alive) < self.death_rate[alive]
+        idx = idx[dies]
+        if idx.size:
+            self.quantity[idx] -= 1
+            self.resources += float(self.energy[idx].sum() * 0.2)  # Retorna energía al ambiente
+            self._emit(events, idx, day, "death", "{name} ha muerto.")
+        profiler.exit()
+
+        # Las poblaciones extintas terminan su proceso; el resto vuelve a esperar 1-5 días
+        idx = np.flatnonzero(due)
+        self.active[idx] = self.quantity[idx] > 0
+        idx = idx[self.active[idx]]
+        self.next_wake[idx] = day + self._randint(idx, 1, 5)
+        if self.cohorts is not None:
+            self._sync_cohorts()  # Las cohortes quedan al día para las muestras y el resumen
+
+        if events:
+            self.simulation.record_events(events)
+
+    def _sync_cohorts(self, rows=None):
+        """Lleva a las cohortes los cambios de energía y las muertes desde la última sincronización.
+
+        El cambio de energía de la población se suma a todas sus cohortes; las muertes
+        (caza o muerte al azar) se quitan de las cohortes más viejas. Con `rows` solo se
+        marcan como sincronizadas esas poblaciones, que se acaban de cambiar en las cohortes.
+        """
+        store = self.cohorts
+        if rows is None:
+            changed = self.energy != self._cohort_energy
+            idx = np.flatnonzero(changed)
+            if idx.size:
+                store.add_energy(idx, self._cohort_energy[idx], self.energy[idx])
+            lost = self.quantity < self._cohort_quantity
+            idx = np.flatnonzero(lost)
+            if idx.size:
+                store.remove(idx, self._cohort_quantity[idx] - self.quantity[idx])
+                # Las cohortes viejas pueden tener otra energía: la media cambia
+                self.energy[idx] = store.mean_energy(idx, self.energy[idx])
+            rows = np.flatnonzero(changed | lost)
+        self._cohort_energy[rows] = self.energy[rows]
+        self._cohort_quantity[rows] = self.quantity[rows]
+
+    def _age(self, day):
+        """Envejece las cohortes cuyo plazo se cumple en `day` y registra las muertes por edad."""
+        rows, dead, dead_energy = self.cohorts.age(day)
+        if not rows.size:
+            return
+        self.quantity[rows] -= dead
+        self.energy[rows] = self.cohorts.mean_energy(rows, self.energy[rows])
+        self._sync_cohorts(rows)
+        died = dead > 0
+        if died.any():
+            # Como una muerte del motor SimPy, cada evento devuelve energía al ambiente
+            self.resources += float(dead_energy[died].sum() * 0.2)
+            self.profiler.enter("death")
+            events = []
+            self._emit(events, rows[died], day, "death", "{name} perdió {value} individuos por edad.", dead[died])
+            self.profiler.exit()
+            self.simulation.record_events(events)
+
+    def _reproduce_cohorts(self, idx):
+        """Reproducción por cohorte de las poblaciones `idx`; devuelve (poblaciones que se reprodujeron, crías)."""
+        self._sync_cohorts()
+        births, reproduced = self.cohorts.reproduce(idx, self.reproduction_threshold[idx], self.birth_rate[idx])
+        self.quantity[idx] += births
+        self.energy[idx] = self.cohorts.mean_energy(idx, self.energy[idx])
+        self._sync_cohorts(idx)
+        return idx[reproduced], births[reproduced]
+
+    def _plants_grow(self, day, due, events):
+        idx = np.flatnonzero(due & (self.types == PLANT))
+        if idx.size:
+            growth = self.resources * 0.1 * self.growth_rate[idx]
+            self.energy[idx] += growth
+            self._emit(events, idx, day, "growth", "{name} ha crecido en {value:.2f} energía.", growth)
+
+    def _herbivores_graze(self, day, due, events):
+        idx = np.flatnonzero(due & (self.types == HERBIVORE))
+        if not idx.size:
+            return
+        if np.any((self.types == PLANT) & (self.energy > 0)):
+            # Los herbívoros consumen en orden del recurso compartido hasta agotarlo
+            wanted = self._uniform(idx, 0.5, 2.0)
+            before = np.cumsum(wanted) - wanted
+            consumed = np.minimum(wanted, np.maximum(self.resources - before, 0.0))
+            if self.resources < 0:
+                consumed[0] = self.resources
+            self.energy[idx] += consumed
+            self.resources -= float(consumed.sum())
+            self._emit(events, idx, day, "consume", "{name} consumió {value:.2f} de energía.", consumed)
+        else:
+            self._emit(events, idx, day, "energy_loss", "{name} no encontró plantas y perdió energía.")
+            self.energy[idx] -= 0.5  # Pérdida de energía por falta de alimento
+
+    def _carnivores_hunt(self, day, due, events):
+        idx = np.flatnonzero(due & (self.types == CARNIVORE))
+        if not idx.size:
+            return
+        if self.simulation.food_web.empty:
+            herbivores = np.flatnonzero((self.types == HERBIVORE) & (self.energy > 0))
+            if not herbivores.size:
+                self._emit(events, idx, day, "energy_loss", "{name} no encontró presas y perdió energía.")
+                self.energy[idx] -= 1.0  # Pérdida de energía por falta de presas
+                return
+            prey = herbivores[(self._random(idx) * herbivores.size).astype(np.int64)]
+        else:
+            prey = self._choose_prey(idx)
+            starving = idx[prey < 0]
+            if starving.size:
+                self._emit(events, starving, day, "energy_loss", "{name} no encontró presas y perdió energía.")
+                self.energy[starving] -= 1.0
+            idx, prey = idx[prey >= 0], prey[prey >= 0]
+            if not idx.size:
+                return
+        wanted = self._uniform(idx, 1.0, 3.0)
+        # Varios depredadores sobre la misma presa se reparten su energía en orden
+        order = np.argsort(prey, kind="stable")
+        prey_sorted, wanted_sorted = prey[order], wanted[order]
+        running = np.cumsum(wanted_sorted)
+        group_start = np.r_[True, prey_sorted[1:] != prey_sorted[:-1]]
+        offsets = np.maximum.accumulate(np.where(group_start, running - wanted_sorted, 0.0))
+        before = running - wanted_sorted - offsets
+        consumed_sorted = np.clip(self.energy[prey_sorted] - before, 0.0, wanted_sorted)
+        consumed = np.empty_like(consumed_sorted)
+        consumed[order] = consumed_sorted
+
+        hunted = np.unique(prey)
+        hunted_energy = self.energy[hunted]
+        np.subtract.at(self.energy, prey, consumed)
+        self.energy[idx] += consumed
+        killed = hunted[(hunted_energy > 0) & (self.energy[hunted] <= 0)]
+        if killed.size:
+            self.quantity[killed] -= 1
+            self._emit(events, killed, day, "death", "{name} ha muerto.")
+        self._emit(events, idx, day, "consume", "{name} cazó y consumió {value:.2f} de energía.", consumed)
+
+    def _choose_prey(self, idx):
+        """Presa de cada depredador de `idx` según la red trófica (-1 si no tiene presas vivas).
+
+        Solo se recorren las aristas de esos depredadores: se elige una presa viva con
+        probabilidad proporcional a su tasa, con un número del flujo por depredador.
+        """
+        web = self.simulation.food_web
+        starts = web.indptr[idx]
+        degrees = web.indptr[idx + 1] - starts
+        ends = np.cumsum(degrees)
+        # Posiciones en web.prey de las aristas de cada depredador, una fila tras otra
+        edges = np.repeat(starts - (ends - degrees), degrees) + np.arange(ends[-1] if ends.size else 0)
+        prey = web.prey[edges]
+        weights = np.where(self.energy[prey] > 0, web.rate[edges], 0.0)
+        cumulative = np.r_[0.0, np.cumsum(weights)]
+        low, high = cumulative[ends - degrees], cumulative[ends]
+        has_prey = high > low
+        # Como en el motor SimPy, solo usa un número del flujo quien tiene presas
+        draw = np.zeros(idx.size)
+        draw[has_prey] = self._random(idx[has_prey])
+        target = low + draw * (high - low)
+        chosen = np.clip(np.searchsorted(cumulative, target, side="right") - 1, ends - degrees,
+                         np.maximum(ends - 1, 0))
+        return np.where(has_prey, prey[np.minimum(chosen, prey.size - 1)] if prey.size else -1, -1)
+
+    def _emit(self, events, idx, day, event_type, template, values=None):
+        """Agrega al lote del día una fila de Lifecycle por población en `idx`."""
+        self.profiler.count_events(event_type, idx.size)
+        if not self.keep_events:
+            # Solo se cuentan: evita formatear descripciones que nadie guardará
+            events.append([None] * idx.size)
+            return
+        quantity = self.quantity[idx].tolist()
+        energy = self.energy[idx].tolist()
+        ids = self.ids[idx].tolist()
+        if not self.keep_descriptions:
+            events.append([(ids[k], event_type, None, day, quantity[k], energy[k]) for k in range(idx.size)])
+            return
+        names = [self.names[i] for i in idx.tolist()]
+        values = values.tolist() if values is not None else [None] * idx.size
+        events.append([
+            (ids[k], event_type, template.format(name=names[k], value=values[k]), day, quantity[k], energy[k])
+            for k in range(idx.size)
+        ])
+
+    def restore(self, snapshot):
+        """Copia a los arreglos el estado de un checkpoint (incluidos los flujos aleatorios)."""
+        position = {organism_id: i for i, organism_id in enumerate(self.ids.tolist())}
+        order = np.array([position[organism_id] for organism_id in snapshot.ids.tolist()], dtype=np.int64)
+        self.energy[order] = snapshot.energy
+        self.quantity[order] = snapshot.quantity
+        self.active[order] = ~np.isnan(snapshot.next_wake)
+        self.next_wake[order] = np.where(np.isnan(snapshot.next_wake), -1, snapshot.next_wake).astype(np.int64)
+        self.resources = float(snapshot.resources)
+        self.now = int(snapshot.now)
+        self.draws[order] = snapshot.draws
+
+    def sync_states(self):
+        """Copia el estado de los arreglos a los registros de la simulación."""
+        energy = self.energy.tolist()
+        quantity = self.quantity.tolist()
+        for i, organism in enumerate(self.simulation.organisms):
+            organism.initial_energy = energy[i]
+            organism.quantity = quantity[i]
+        self.simulation.environment.resources = self.resources